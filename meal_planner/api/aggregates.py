@@ -0,0 +1,346 @@
+"""
+Materialized aggregates for the meal planner.
+- recipe_vectors: kcal/protein/carbs/fat/cost per recipe x person
+- daily_person_totals: kcal/protein/carbs/fat/cost per date x person
+- Incremental refresh of only the recipes/days a write can affect
+- Dependency fan-out from recipes/ingredients to the days that use them
+- Daily costs use the price in effect on each day (prices.py); recipe
+  vector costs use today's price
+"""
+
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+from collections import defaultdict
+
+from database import (
+    WeekPlan, RecipePortion, Ingredient, SnackLog, Snack,
+    RecipeVector, DailyPersonTotals
+)
+import prices
+
+
+# Ingredient fields that feed into the totals (name/unit edits don't)
+INGREDIENT_TOTAL_FIELDS = {
+    "cost_per_unit", "kcal_per_unit", "protein_per_unit", "carbs_per_unit", "fat_per_unit"
+}
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+TOTAL_COLUMNS = ("kcal", "protein", "carbs", "fat", "cost")
+
+NUTRIENT_COLUMNS = TOTAL_COLUMNS[:4]
+
+
+def _chunks(values: List, size: int = CHUNK_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _sums(qty):
+    """SUM(...) of each total column for qty units of the joined Ingredient"""
+    return (
+        func.sum(Ingredient.kcal_per_unit * qty),
+        func.sum(Ingredient.protein_per_unit * qty),
+        func.sum(Ingredient.carbs_per_unit * qty),
+        func.sum(Ingredient.fat_per_unit * qty),
+        func.sum(Ingredient.cost_per_unit * qty),
+    )
+
+
+# ============================================================================
+# DEPENDENCY FAN-OUT (Which recipes/days does a change touch?)
+# ============================================================================
+
+def recipes_for_ingredients(db: Session, ingredient_ids: Iterable[int]) -> Set[int]:
+    """All recipes with a portion of any of these ingredients"""
+    ingredient_ids = list(set(ingredient_ids))
+    recipe_ids = set()
+
+    for chunk in _chunks(ingredient_ids):
+        rows = db.query(RecipePortion.recipe_id).filter(
+            RecipePortion.ingredient_id.in_(chunk)
+        ).distinct().all()
+        recipe_ids.update(row[0] for row in rows)
+
+    return recipe_ids
+
+
+def dates_for_recipes(db: Session, recipe_ids: Iterable[int]) -> Set[date]:
+    """All planned days that use any of these recipes"""
+    recipe_ids = list(set(recipe_ids))
+    dates = set()
+
+    for chunk in _chunks(recipe_ids):
+        rows = db.query(WeekPlan.date).filter(WeekPlan.recipe_id.in_(chunk)).distinct().all()
+        dates.update(row[0] for row in rows)
+
+    return dates
+
+
+def dates_for_ingredients(db: Session, ingredient_ids: Iterable[int]) -> Set[date]:
+    """All days with a planned meal or consumed snack using any of these ingredients"""
+    ingredient_ids = list(set(ingredient_ids))
+    dates = set()
+
+    for chunk in _chunks(ingredient_ids):
+        # Meals whose recipe portion uses the ingredient
+        meal_dates = db.query(WeekPlan.date).join(
+            RecipePortion,
+            and_(
+                RecipePortion.recipe_id == WeekPlan.recipe_id,
+                RecipePortion.person_id == WeekPlan.person_id
+            )
+        ).filter(RecipePortion.ingredient_id.in_(chunk)).distinct().all()
+
+        # Snacks made from the ingredient
+        snack_dates = db.query(SnackLog.date).join(
+            Snack, Snack.id == SnackLog.snack_id
+        ).filter(
+            Snack.ingredient_id.in_(chunk),
+            SnackLog.consumed == True
+        ).distinct().all()
+
+        dates.update(row[0] for row in meal_dates)
+        dates.update(row[0] for row in snack_dates)
+
+    return dates
+
+
+# ============================================================================
+# RECIPE VECTORS
+# ============================================================================
+
+def refresh_recipe_vectors(db: Session, recipe_ids: Iterable[int]):
+    """
+    Recompute recipe_vectors for the given recipes from their portions.
+    Recipes that no longer exist (or have no portions) lose their rows.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return
+
+    db.flush()
+
+    for chunk in _chunks(recipe_ids):
+        rows = db.query(
+            RecipePortion.recipe_id, RecipePortion.person_id, *_sums(RecipePortion.quantity)
+        ).join(
+            Ingredient, Ingredient.id == RecipePortion.ingredient_id
+        ).filter(
+            RecipePortion.recipe_id.in_(chunk)
+        ).group_by(RecipePortion.recipe_id, RecipePortion.person_id).all()
+
+        db.query(RecipeVector).filter(
+            RecipeVector.recipe_id.in_(chunk)
+        ).delete(synchronize_session=False)
+
+        db.bulk_insert_mappings(RecipeVector, [
+            {
+                "recipe_id": recipe_id,
+                "person_id": person_id,
+                **{key: value or 0.0 for key, value in zip(TOTAL_COLUMNS, values)}
+            }
+            for recipe_id, person_id, *values in rows
+        ])
+
+
+def get_recipe_vectors(db: Session, recipe_ids: Iterable[int]) -> Dict[Tuple[int, int], Tuple[float, ...]]:
+    """
+    Fetch vectors for many recipes at once.
+    Returns: {(recipe_id, person_id): (kcal, protein, carbs, fat, cost)}
+    """
+    recipe_ids = list(set(recipe_ids))
+    vectors = {}
+
+    for chunk in _chunks(recipe_ids):
+        rows = db.query(
+            RecipeVector.recipe_id,
+            RecipeVector.person_id,
+            *[getattr(RecipeVector, key) for key in TOTAL_COLUMNS]
+        ).filter(RecipeVector.recipe_id.in_(chunk)).all()
+
+        for recipe_id, person_id, *values in rows:
+            vectors[(recipe_id, person_id)] = tuple(values)
+
+    return vectors
+
+
+# ============================================================================
+# DATED COSTS (Each day at the prices in effect that day)
+# ============================================================================
+
+def dated_costs(db: Session, date_filter: Callable) -> List[Tuple[date, int, float]]:
+    """
+    Cost per day and person of planned meals and consumed snacks, priced
+    as of each day with one range join against the price history.
+    date_filter(column) restricts the days, e.g. lambda c: c.in_(dates).
+    Ingredients without history fall back to today's cost_per_unit.
+
+    Returns: [(date, person_id, cost), ...] (a day may appear twice)
+    """
+    ranges = prices.price_ranges()
+    unit_cost = func.coalesce(ranges.c.cost_per_unit, Ingredient.cost_per_unit)
+
+    # 1. Meals: WeekPlan ⋈ RecipePortion ⋈ price range on the day
+    meal_rows = db.query(
+        WeekPlan.date, WeekPlan.person_id, func.sum(RecipePortion.quantity * unit_cost)
+    ).join(
+        RecipePortion,
+        and_(
+            RecipePortion.recipe_id == WeekPlan.recipe_id,
+            RecipePortion.person_id == WeekPlan.person_id
+        )
+    ).join(
+        Ingredient, Ingredient.id == RecipePortion.ingredient_id
+    ).outerjoin(
+        ranges, prices.as_of(ranges, RecipePortion.ingredient_id, WeekPlan.date)
+    ).filter(
+        date_filter(WeekPlan.date)
+    ).group_by(WeekPlan.date, WeekPlan.person_id).all()
+
+    # 2. Snacks: SnackLog ⋈ Snack ⋈ price range on the day
+    snack_rows = db.query(
+        SnackLog.date, SnackLog.person_id, func.sum(Snack.default_quantity * unit_cost)
+    ).join(
+        Snack, Snack.id == SnackLog.snack_id
+    ).join(
+        Ingredient, Ingredient.id == Snack.ingredient_id
+    ).outerjoin(
+        ranges, prices.as_of(ranges, Snack.ingredient_id, SnackLog.date)
+    ).filter(
+        date_filter(SnackLog.date),
+        SnackLog.consumed == True
+    ).group_by(SnackLog.date, SnackLog.person_id).all()
+
+    return [(day_date, person_id, cost or 0.0) for day_date, person_id, cost in meal_rows + snack_rows]
+
+
+# ============================================================================
+# DAILY TOTALS
+# ============================================================================
+
+def _compute_totals(db: Session, dates: List[date]) -> Dict[Tuple[date, int], Dict[str, float]]:
+    """Grouped recompute of totals for the given days (meal vectors + snacks, dated costs)"""
+    totals = defaultdict(lambda: dict.fromkeys(TOTAL_COLUMNS, 0.0))
+
+    # 1. Meals: WeekPlan ⋈ RecipeVector
+    meal_rows = db.query(
+        WeekPlan.date,
+        WeekPlan.person_id,
+        *[func.sum(getattr(RecipeVector, key)) for key in NUTRIENT_COLUMNS]
+    ).join(
+        RecipeVector,
+        and_(
+            RecipeVector.recipe_id == WeekPlan.recipe_id,
+            RecipeVector.person_id == WeekPlan.person_id
+        )
+    ).filter(
+        WeekPlan.date.in_(dates)
+    ).group_by(WeekPlan.date, WeekPlan.person_id).all()
+
+    # 2. Snacks: SnackLog ⋈ Snack ⋈ Ingredient
+    snack_rows = db.query(
+        SnackLog.date, SnackLog.person_id, *_sums(Snack.default_quantity)[:4]
+    ).join(
+        Snack, Snack.id == SnackLog.snack_id
+    ).join(
+        Ingredient, Ingredient.id == Snack.ingredient_id
+    ).filter(
+        SnackLog.date.in_(dates),
+        SnackLog.consumed == True
+    ).group_by(SnackLog.date, SnackLog.person_id).all()
+
+    for day_date, person_id, *values in meal_rows + snack_rows:
+        row = totals[(day_date, person_id)]
+        for key, value in zip(NUTRIENT_COLUMNS, values):
+            row[key] += value or 0.0
+
+    # 3. Costs at the prices of each day
+    for day_date, person_id, cost in dated_costs(db, lambda column: column.in_(dates)):
+        totals[(day_date, person_id)]["cost"] += cost
+
+    return totals
+
+
+def refresh_daily_totals(db: Session, dates: Iterable[date]):
+    """
+    Recompute daily_person_totals for the given days.
+    Runs inside the caller's transaction - call after flushing the write
+    and before committing, so the aggregate commits atomically with it.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return
+
+    db.flush()
+
+    for chunk in _chunks(dates):
+        totals = _compute_totals(db, chunk)
+
+        db.query(DailyPersonTotals).filter(
+            DailyPersonTotals.date.in_(chunk)
+        ).delete(synchronize_session=False)
+
+        db.bulk_insert_mappings(DailyPersonTotals, [
+            {"date": day_date, "person_id": person_id, **values}
+            for (day_date, person_id), values in totals.items()
+        ])
+
+
+# ============================================================================
+# WRITE HOOKS (Call before commit)
+# ============================================================================
+
+def refresh_for_recipes(db: Session, recipe_ids: Iterable[int]):
+    """A recipe or its portions changed: re-vector it, then re-total its days"""
+    recipe_ids = set(recipe_ids)
+    refresh_recipe_vectors(db, recipe_ids)
+    refresh_daily_totals(db, dates_for_recipes(db, recipe_ids))
+
+
+def refresh_for_ingredients(db: Session, ingredient_ids: Iterable[int], since: date = None):
+    """
+    An ingredient changed: re-vector every recipe using it, then re-total
+    affected days. For a price change pass since (its effective_from) -
+    earlier days keep the price they had.
+    """
+    ingredient_ids = set(ingredient_ids)
+    refresh_recipe_vectors(db, recipes_for_ingredients(db, ingredient_ids))
+
+    dates = dates_for_ingredients(db, ingredient_ids)
+    if since is not None:
+        dates = {day for day in dates if day >= since}
+    refresh_daily_totals(db, dates)
+
+
+def rebuild_aggregates(db: Session):
+    """Rebuild recipe vectors and daily totals from source data (migration 4 / repair)"""
+    recipe_ids = db.query(RecipePortion.recipe_id).distinct().all()
+    plan_dates = db.query(WeekPlan.date).distinct().all()
+    snack_dates = db.query(SnackLog.date).distinct().all()
+
+    db.query(RecipeVector).delete(synchronize_session=False)
+    db.query(DailyPersonTotals).delete(synchronize_session=False)
+
+    refresh_recipe_vectors(db, [row[0] for row in recipe_ids])
+    refresh_daily_totals(db, [row[0] for row in plan_dates + snack_dates])
+
+
+# ============================================================================
+# READS
+# ============================================================================
+
+def load_daily_totals(db: Session, start: date, end: date, extra_dates: List[date] = ()) -> List[DailyPersonTotals]:
+    """Indexed range scan over daily_person_totals (plus any extra days)"""
+    condition = DailyPersonTotals.date.between(start, end)
+
+    extra_dates = [d for d in extra_dates if not start <= d <= end]
+    if extra_dates:
+        condition = condition | DailyPersonTotals.date.in_(extra_dates)
+
+    return db.query(DailyPersonTotals).filter(condition).order_by(
+        DailyPersonTotals.date, DailyPersonTotals.person_id
+    ).all()
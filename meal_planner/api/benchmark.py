@@ -0,0 +1,1291 @@
+"""
+Benchmarks for the meal planner API.
+Seeds throwaway SQLite databases with synthetic households and times the
+hot paths. Never touches the real mealplanner.db.
+
+Usage:
+    python benchmark.py indexes [--years 1 2 5 10]
+    python benchmark.py concurrency [--readers 8] [--seconds 10]
+    python benchmark.py modes [--readers 8] [--seconds 10]
+    python benchmark.py summary [--years 1 5 10]
+    python benchmark.py import [--recipes 1000 5000]
+    python benchmark.py kernel [--people 3 12] [--weeks 52 260]
+    python benchmark.py planner [--recipes 100 300 1000]
+    python benchmark.py listing [--recipes 100 1000 5000]
+    python benchmark.py serialize [--recipes 1000] [--weeks 52]
+    python benchmark.py households [--households 20] [--busy-clients 64]
+    python benchmark.py suite [--scales small medium large] [--compare baseline.json]
+
+The endpoint benchmarks drive the ASGI app in-process and need httpx
+(pip install httpx); it isn't a runtime dependency of the add-on.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+import aggregates
+import cache
+import calculations
+import database
+import metrics
+import models
+from database import Base, Person, Ingredient, IngredientPrice, Recipe, RecipePortion, WeekPlan, Snack, SnackLog
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner"]
+
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def make_engine(path: str, profile: str = None):
+    """Engine for a throwaway benchmark database"""
+    return database.create_db_engine(path, profile)
+
+
+def create_schema(bind):
+    """Create tables and apply migrations, exactly as init_db() does"""
+    Base.metadata.create_all(bind=bind)
+    database.run_migrations(bind)
+
+
+def seed_database(
+    bind,
+    people: int = 3,
+    ingredients: int = 200,
+    recipes: int = 100,
+    snacks: int = 10,
+    weeks: int = 52,
+    seed: int = 42
+) -> date:
+    """
+    Fill an empty database with a synthetic household, aggregates included.
+    History ends with the current week. Returns the first Monday seeded.
+    """
+    rnd = random.Random(seed)
+    first_monday = date.today() - timedelta(days=date.today().weekday(), weeks=weeks - 1)
+
+    with bind.begin() as conn:
+        conn.execute(insert(Person), [
+            {"id": i + 1, "name": f"Person {i + 1}"} for i in range(people)
+        ])
+
+        conn.execute(insert(Ingredient), [
+            {
+                "id": i + 1,
+                "name": f"Ingredient {i + 1}",
+                "unit": rnd.choice(["g", "ml", "item"]),
+                "cost_per_unit": round(rnd.uniform(0.001, 0.02), 4),
+                "kcal_per_unit": round(rnd.uniform(0.1, 9.0), 2),
+                "protein_per_unit": round(rnd.uniform(0.0, 0.3), 3),
+                "carbs_per_unit": round(rnd.uniform(0.0, 0.8), 3),
+                "fat_per_unit": round(rnd.uniform(0.0, 0.5), 3),
+                "pack_size": rnd.choice([None, 250.0, 500.0, 1000.0]),
+                "pack_cost": rnd.choice([None, 1.5, 3.0, 4.5]),
+            }
+            for i in range(ingredients)
+        ])
+
+        conn.execute(insert(Recipe), [
+            {"id": i + 1, "name": f"Recipe {i + 1}", "meal_type": MEAL_TYPES[i % 3]}
+            for i in range(recipes)
+        ])
+
+        conn.execute(insert(RecipePortion), [
+            {
+                "recipe_id": recipe_id,
+                "ingredient_id": ingredient_id,
+                "person_id": person_id,
+                "quantity": float(rnd.choice([1, 50, 100, 150, 250])),
+            }
+            for recipe_id in range(1, recipes + 1)
+            for ingredient_id in rnd.sample(range(1, ingredients + 1), min(6, ingredients))
+            for person_id in range(1, people + 1)
+        ])
+
+        conn.execute(insert(Snack), [
+            {
+                "id": i + 1,
+                "name": f"Snack {i + 1}",
+                "ingredient_id": rnd.randint(1, ingredients),
+                "default_quantity": float(rnd.choice([1, 30, 100])),
+            }
+            for i in range(snacks)
+        ])
+
+        days = [first_monday + timedelta(days=n) for n in range(weeks * 7)]
+        recipes_by_type = {
+            meal_type: list(range(offset + 1, recipes + 1, 3))
+            for offset, meal_type in enumerate(MEAL_TYPES)
+        }
+
+        conn.execute(insert(WeekPlan), [
+            {
+                "date": day,
+                "person_id": person_id,
+                "meal_type": meal_type,
+                "recipe_id": rnd.choice(recipes_by_type[meal_type] or [None]),
+            }
+            for day in days
+            for person_id in range(1, people + 1)
+            for meal_type in MEAL_TYPES
+        ])
+
+        conn.execute(insert(SnackLog), [
+            {
+                "date": day,
+                "person_id": person_id,
+                "snack_id": snack_id,
+                "consumed": rnd.random() < 0.5,
+            }
+            for day in days
+            for person_id in range(1, people + 1)
+            for snack_id in range(1, snacks + 1)
+        ])
+
+    # Rows went in behind the API's back, so materialize what it would have kept
+    db = sessionmaker(bind=bind)()
+    try:
+        aggregates.rebuild_aggregates(db)
+        db.commit()
+    finally:
+        db.close()
+
+    return first_monday
+
+
+def seed_price_changes(bind, first_monday: date, weeks: int, share: float = 0.3, seed: int = 42) -> date:
+    """
+    Give every ingredient a price history, with a share of them changing
+    price halfway through, and re-materialize the aggregates.
+    Returns the day the new prices took effect.
+    """
+    rnd = random.Random(seed)
+    changed_on = first_monday + timedelta(weeks=weeks // 2, days=3)
+
+    with bind.begin() as conn:
+        costs = conn.execute(select(Ingredient.id, Ingredient.cost_per_unit)).all()
+        new_costs = {
+            ingredient_id: round(cost * rnd.uniform(0.5, 2.0), 4)
+            for ingredient_id, cost in costs if rnd.random() < share
+        }
+
+        conn.execute(insert(IngredientPrice), [
+            {"ingredient_id": ingredient_id, "effective_from": database.PRICE_HISTORY_START, "cost_per_unit": cost}
+            for ingredient_id, cost in costs
+        ] + [
+            {"ingredient_id": ingredient_id, "effective_from": changed_on, "cost_per_unit": cost}
+            for ingredient_id, cost in new_costs.items()
+        ])
+
+        for ingredient_id, cost in new_costs.items():
+            conn.execute(update(Ingredient).where(Ingredient.id == ingredient_id).values(cost_per_unit=cost))
+
+    db = sessionmaker(bind=bind)()
+    try:
+        aggregates.rebuild_aggregates(db)
+        db.commit()
+    finally:
+        db.close()
+
+    return changed_on
+
+
+# ============================================================================
+# TIMING
+# ============================================================================
+
+def time_calls(fn: Callable, args_list: List) -> Dict[str, float]:
+    """Call fn(*args) for each args tuple; return latency stats in microseconds"""
+    samples = []
+
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+
+    samples.sort()
+    return {
+        "mean_us": round(statistics.fmean(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p99_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 1),
+    }
+
+
+# ============================================================================
+# INDEX BENCHMARK (Lookup cost vs. years of history)
+# ============================================================================
+
+HOT_PATH_INDEXES = [
+    "uq_week_plan_slot",
+    "ix_week_plan_recipe",
+    "uq_snack_log_entry",
+    "ix_recipe_portions_recipe_person",
+    "ix_recipe_portions_ingredient",
+]
+
+
+def _time_lookups(Session, first_monday: date, weeks: int, lookups: int, rnd: random.Random) -> Dict[str, float]:
+    """Mean latency of each hot-path lookup the endpoints issue"""
+    db = Session()
+    days = weeks * 7
+
+    try:
+        def slot(day, person_id, meal_type):
+            db.query(WeekPlan).filter(
+                WeekPlan.date == day,
+                WeekPlan.person_id == person_id,
+                WeekPlan.meal_type == meal_type
+            ).first()
+
+        def week(week_start):
+            db.query(WeekPlan).filter(
+                WeekPlan.date >= week_start,
+                WeekPlan.date <= week_start + timedelta(days=6)
+            ).all()
+
+        def snack(day, person_id, snack_id):
+            db.query(SnackLog).filter(
+                SnackLog.date == day,
+                SnackLog.person_id == person_id,
+                SnackLog.snack_id == snack_id
+            ).first()
+
+        def portions(recipe_id, person_id):
+            db.query(RecipePortion).filter(
+                RecipePortion.recipe_id == recipe_id,
+                RecipePortion.person_id == person_id
+            ).all()
+
+        def random_day():
+            return first_monday + timedelta(days=rnd.randrange(days))
+
+        return {
+            "week_plan slot": time_calls(slot, [
+                (random_day(), rnd.randint(1, 3), rnd.choice(MEAL_TYPES)) for _ in range(lookups)
+            ])["mean_us"],
+            "week_plan week": time_calls(week, [
+                (first_monday + timedelta(weeks=rnd.randrange(weeks)),) for _ in range(lookups)
+            ])["mean_us"],
+            "snack_log entry": time_calls(snack, [
+                (random_day(), rnd.randint(1, 3), rnd.randint(1, 10)) for _ in range(lookups)
+            ])["mean_us"],
+            "recipe portions": time_calls(portions, [
+                (rnd.randint(1, 100), rnd.randint(1, 3)) for _ in range(lookups)
+            ])["mean_us"],
+        }
+    finally:
+        db.close()
+
+
+def bench_indexes(years_list: List[int], lookups: int = 1000):
+    """Show lookup cost staying flat with the indexes as history grows"""
+    print(f"{'years':>5}  {'lookup':<18}{'indexed µs':>12}{'no index µs':>13}")
+
+    for years in years_list:
+        weeks = years * 52
+
+        with tempfile.TemporaryDirectory() as tmp:
+            bind = make_engine(os.path.join(tmp, "bench.db"))
+            create_schema(bind)
+            first_monday = seed_database(bind, weeks=weeks)
+            Session = sessionmaker(bind=bind)
+
+            indexed = _time_lookups(Session, first_monday, weeks, lookups, random.Random(years))
+
+            with bind.begin() as conn:
+                for name in HOT_PATH_INDEXES:
+                    conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+            unindexed = _time_lookups(Session, first_monday, weeks, lookups, random.Random(years))
+            bind.dispose()
+
+        for name, value in indexed.items():
+            print(f"{years:>5}  {name:<18}{value:>12}{unindexed[name]:>13}")
+
+
+# ============================================================================
+# IN-PROCESS APP (Endpoints against a throwaway database)
+# ============================================================================
+
+def load_app(db_path: str, profile: str = None, mode: str = None):
+    """
+    Point the app at a seeded benchmark database and return main.app.
+    main initializes the database on first import, so it's imported here,
+    after use_database() has swapped the engine.
+    """
+    database.use_database(db_path, profile, mode)
+
+    import main
+    database.init_db()
+
+    # Nothing cached from a previous benchmark database may leak through
+    cache.bump_data_version()
+    for model in (Person, Recipe, Snack):
+        cache.invalidate_name_map(model)
+
+    return main.app
+
+
+def week_plan_payload(week_start: date, people: int, recipe_offset: int, recipes: int = 100) -> Dict:
+    """A full-week bulk update, shifted by recipe_offset so every save changes rows"""
+    days = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+    return {
+        "week_start": week_start.isoformat(),
+        "meals": [
+            {
+                "day": day,
+                "person": f"Person {person_id}",
+                "meal_type": meal_type,
+                "recipe_name": f"Recipe {(n + recipe_offset) % recipes + 1}",
+            }
+            for n, (day, person_id, meal_type) in enumerate(
+                (day, person_id, meal_type)
+                for day in days
+                for person_id in range(1, people + 1)
+                for meal_type in MEAL_TYPES
+            )
+        ],
+    }
+
+
+# ============================================================================
+# CONCURRENCY BENCHMARK (Readers polling while a writer bulk-updates)
+# ============================================================================
+
+async def _mixed_load(app, readers: int, seconds: float, people: int) -> Dict:
+    """N readers poll /week-totals while one writer saves the week in a loop"""
+    import httpx
+
+    week_start = date.today() - timedelta(days=date.today().weekday())
+    deadline = time.perf_counter() + seconds
+    stats = {"latencies": [], "read_errors": 0, "writes": 0, "write_errors": 0}
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def reader():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get("/week-totals")
+                stats["latencies"].append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    stats["read_errors"] += 1
+
+        async def writer():
+            offset = 0
+            while time.perf_counter() < deadline:
+                offset += 1
+                response = await client.post(
+                    "/week-plan/bulk-update",
+                    json=week_plan_payload(week_start, people, offset)
+                )
+                stats["writes"] += 1
+                if response.status_code != 200:
+                    stats["write_errors"] += 1
+
+        await asyncio.gather(writer(), *[reader() for _ in range(readers)])
+
+    return stats
+
+
+def _run_mixed_load(readers: int, seconds: float, weeks: int, profile: str = None, mode: str = None) -> Dict:
+    """Seed a fresh database, point the app at it and run the mixed load"""
+    people = 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        bind = make_engine(path, profile)
+        create_schema(bind)
+        seed_database(bind, people=people, weeks=weeks)
+        bind.dispose()
+
+        app = load_app(path, profile, mode)
+        stats = asyncio.run(_mixed_load(app, readers, seconds, people))
+
+        database.engine.dispose()
+        if database.async_engine is not None:
+            asyncio.run(database.async_engine.dispose())
+
+    return stats
+
+
+def _print_mixed_load(label: str, stats: Dict):
+    latencies = sorted(stats["latencies"]) or [0.0]
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+    print(
+        f"{label:<8}{len(stats['latencies']):>8}{p50:>9.1f}{p99:>9.1f}"
+        f"{stats['read_errors']:>8}{stats['writes']:>8}{stats['write_errors']:>8}"
+    )
+
+
+MIXED_LOAD_HEADER = f"{'':<8}{'reads':>8}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'writes':>8}{'errors':>8}"
+
+
+def bench_concurrency(readers: int, seconds: float, weeks: int = 52, profiles: List[str] = None):
+    """Compare engine profiles under concurrent reads and bulk writes"""
+    print(MIXED_LOAD_HEADER)
+
+    for profile in profiles or ["legacy", "tuned"]:
+        _print_mixed_load(profile, _run_mixed_load(readers, seconds, weeks, profile=profile, mode="sync"))
+
+
+def bench_modes(readers: int, seconds: float, weeks: int = 52):
+    """Compare sync (threadpool) and async (aiosqlite) database modes"""
+    print(MIXED_LOAD_HEADER)
+
+    for mode in ["sync", "async"]:
+        _print_mixed_load(mode, _run_mixed_load(readers, seconds, weeks, mode=mode))
+
+
+# ============================================================================
+# RANGE SUMMARY BENCHMARK (/summary over years of history)
+# ============================================================================
+
+def bench_summary(years_list: List[int], repeat: int = 5):
+    """Time calculate_range_summary for whole-history ranges per grouping"""
+    print(f"{'years':>5}  {'group':<6}{'periods':>9}{'p50 ms':>9}{'no shop ms':>12}")
+
+    for years in years_list:
+        weeks = years * 52
+
+        with tempfile.TemporaryDirectory() as tmp:
+            bind = make_engine(os.path.join(tmp, "bench.db"))
+            create_schema(bind)
+            first_monday = seed_database(bind, weeks=weeks)
+
+            db = sessionmaker(bind=bind)()
+            try:
+                end = first_monday + timedelta(weeks=weeks) - timedelta(days=1)
+                for group in calculations.SUMMARY_GROUPS:
+                    summary = calculations.calculate_range_summary(db, first_monday, end, group)
+                    with_shopping = time_calls(
+                        calculations.calculate_range_summary,
+                        [(db, first_monday, end, group)] * repeat
+                    )
+                    without_shopping = time_calls(
+                        calculations.calculate_range_summary,
+                        [(db, first_monday, end, group, False)] * repeat
+                    )
+                    print(
+                        f"{years:>5}  {group:<6}{len(summary['periods']):>9}"
+                        f"{with_shopping['p50_us'] / 1000:>9.1f}{without_shopping['p50_us'] / 1000:>12.1f}"
+                    )
+            finally:
+                db.close()
+                bind.dispose()
+
+
+# ============================================================================
+# IMPORT BENCHMARK
+# ============================================================================
+
+def import_payload(recipes: int, ingredients: int = 500, people: int = 3, seed: int = 42) -> str:
+    """NDJSON body: ingredients, then recipes with 6 portions per person inline"""
+    rnd = random.Random(seed)
+    lines = [
+        {
+            "type": "ingredient",
+            "name": f"Ingredient {i + 1}",
+            "unit": "g",
+            "cost_per_unit": round(rnd.uniform(0.001, 0.02), 4),
+            "kcal_per_unit": round(rnd.uniform(0.1, 9.0), 2),
+        }
+        for i in range(ingredients)
+    ]
+    lines += [
+        {
+            "type": "recipe",
+            "name": f"Recipe {i + 1}",
+            "meal_type": MEAL_TYPES[i % 3],
+            "portions": [
+                {"ingredient": f"Ingredient {n}", "person": f"Person {p + 1}", "quantity": 100.0}
+                for n in rnd.sample(range(1, ingredients + 1), 6)
+                for p in range(people)
+            ],
+        }
+        for i in range(recipes)
+    ]
+    return "\n".join(json.dumps(line) for line in lines) + "\n"
+
+
+async def _post_import(app, body: str) -> Dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        response = await client.post("/import", content=body)
+        response.raise_for_status()
+        return response.json()
+
+
+def bench_import(recipes_list: List[int]):
+    """Time /import of N recipes (plus 500 ingredients) into an empty household"""
+    print(f"{'recipes':>8}{'portions':>10}{'seconds':>9}{'rows/s':>9}{'errors':>8}")
+
+    for recipes in recipes_list:
+        body = import_payload(recipes)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            bind = make_engine(path)
+            create_schema(bind)
+            with bind.begin() as conn:
+                conn.execute(insert(Person), [{"id": i + 1, "name": f"Person {i + 1}"} for i in range(3)])
+            bind.dispose()
+
+            app = load_app(path)
+            start = time.perf_counter()
+            result = asyncio.run(_post_import(app, body))
+            seconds = time.perf_counter() - start
+            database.engine.dispose()
+
+        rows = result["ingredients_created"] + result["recipes_created"] + result["portions_created"]
+        print(
+            f"{result['recipes_created']:>8}{result['portions_created']:>10}"
+            f"{seconds:>9.2f}{rows / seconds:>9.0f}{len(result['errors']):>8}"
+        )
+
+
+# ============================================================================
+# KERNEL BENCHMARK (NumPy kernel vs. the row-based calculations)
+# ============================================================================
+
+# Rounding step of each reported figure (calculations.format_person_totals;
+# a week's cost sums seven daily costs rounded to the cent)
+REPORTED_STEPS = {"kcal": 1.0, "protein": 0.1, "carbs": 0.1, "fat": 0.1, "today_cost": 0.01, "week_cost": 0.07}
+
+
+def _matches(a, b, tolerance: float = 0.011, steps: Dict[str, float] = REPORTED_STEPS) -> bool:
+    """
+    Equal up to rounding of the last reported digit (lists of people in any
+    order): sums that differ in the last float bit may round either way
+    """
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(
+            _matches(a[k], b[k], steps[k] * 1.01 if k in steps else tolerance, steps) for k in a
+        )
+    if isinstance(a, list):
+        if a and isinstance(a[0], dict) and "person" in a[0]:
+            a, b = sorted(a, key=lambda x: x["person"]), sorted(b, key=lambda x: x["person"])
+        return isinstance(b, list) and len(a) == len(b) and all(_matches(x, y, tolerance, steps) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return abs(a - b) <= max(tolerance, abs(a) * 1e-9)
+    return a == b
+
+
+def history_totals(db, dates: List[date]) -> Dict:
+    """Row-based full recompute, chunked exactly like refresh_daily_totals"""
+    totals = {}
+    for chunk in aggregates._chunks(sorted(dates)):
+        totals.update(aggregates._compute_totals(db, chunk))
+    return {key: dict(values) for key, values in totals.items()}
+
+
+def bench_kernel(people_list: List[int], weeks_list: List[int], repeat: int = 5):
+    """
+    Time the NumPy kernel against the current functions on synthetic
+    households whose prices change halfway through history
+    """
+    import kernel
+
+    print(f"{'people':>6}{'weeks':>6}  {'calculation':<26}{'current ms':>11}{'kernel ms':>10}{'match':>7}")
+
+    for people in people_list:
+        for weeks in weeks_list:
+            with tempfile.TemporaryDirectory() as tmp:
+                bind = make_engine(os.path.join(tmp, "bench.db"))
+                create_schema(bind)
+                first_monday = seed_database(
+                    bind, people=people, ingredients=2000, recipes=1000, snacks=20, weeks=weeks
+                )
+                changed_on = seed_price_changes(bind, first_monday, weeks)
+
+                db = sessionmaker(bind=bind)()
+                try:
+                    today = date.today()
+                    change_week = changed_on - timedelta(days=changed_on.weekday())
+                    dates = [first_monday + timedelta(days=n) for n in range(weeks * 7)]
+
+                    comparisons = [
+                        (
+                            "week summary (this week)",
+                            calculations.calculate_week_summary, (db, calculations.get_week_start(), today),
+                            kernel.week_summary, (db, calculations.get_week_start(), today),
+                            _matches
+                        ),
+                        (
+                            "week summary (price week)",
+                            calculations.calculate_week_summary, (db, change_week, today),
+                            kernel.week_summary, (db, change_week, today),
+                            _matches
+                        ),
+                        (
+                            "daily totals (history)",
+                            history_totals, (db, dates),
+                            kernel.daily_totals, (db,),
+                            lambda a, b: _matches(
+                                {str(key): values for key, values in a.items()},
+                                {str(key): values for key, values in b.items()},
+                                1e-6,
+                                steps={}
+                            )
+                        ),
+                    ]
+
+                    for label, current_fn, current_args, kernel_fn, kernel_args, check in comparisons:
+                        match = check(current_fn(*current_args), kernel_fn(*kernel_args))
+                        current = time_calls(current_fn, [current_args] * repeat)
+                        vectorized = time_calls(kernel_fn, [kernel_args] * repeat)
+                        print(
+                            f"{people:>6}{weeks:>6}  {label:<26}{current['p50_us'] / 1000:>11.1f}"
+                            f"{vectorized['p50_us'] / 1000:>10.1f}{'yes' if match else 'NO':>7}"
+                        )
+                finally:
+                    db.close()
+                    bind.dispose()
+
+
+# ============================================================================
+# PLANNER BENCHMARK (Auto-generate across catalogue sizes)
+# ============================================================================
+
+def bench_planner(recipes_list: List[int], people: int = 3, time_limit_ms: int = 500):
+    """Time planner.generate_week_plan for an empty week per catalogue size"""
+    import models
+    import planner
+
+    print(f"{'recipes':>8}{'slots':>7}{'ms':>8}{'on target':>11}{'cost':>9}{'in budget':>11}")
+
+    for recipes in recipes_list:
+        with tempfile.TemporaryDirectory() as tmp:
+            bind = make_engine(os.path.join(tmp, "bench.db"))
+            create_schema(bind)
+            seed_database(bind, people=people, recipes=recipes, weeks=1)
+
+            db = sessionmaker(bind=bind)()
+            try:
+                options = models.AutoPlanRequest(
+                    week_start=calculations.get_week_start() + timedelta(days=7),
+                    targets=models.MacroTargets(kcal_min=1800, kcal_max=2600, protein_min=60),
+                    max_week_cost=150.0,
+                    time_limit_ms=time_limit_ms
+                )
+
+                start = time.perf_counter()
+                plan = planner.generate_week_plan(db, options)
+                elapsed = (time.perf_counter() - start) * 1000
+
+                print(
+                    f"{recipes:>8}{len(plan['meals']):>7}{elapsed:>8.0f}"
+                    f"{plan['days_on_target']:>7}/{len(plan['days']):<3}{plan['week_cost']:>9.2f}"
+                    f"{'yes' if plan['within_budget'] else 'no':>11}"
+                )
+            finally:
+                db.close()
+                bind.dispose()
+
+
+# ============================================================================
+# LIST QUERY COUNTS (List endpoints must not grow with the catalogue)
+# ============================================================================
+
+LIST_ENDPOINTS = [
+    "/recipes",
+    "/recipes?limit=50&offset=25",
+    "/recipes?fields=id,name",
+    "/recipes/1",
+    "/week-plan",
+    "/week-plan?limit=10&fields=date,person_name,recipe_name",
+]
+
+
+async def _list_query_counts(app) -> Dict[str, int]:
+    import httpx
+
+    counts = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for url in LIST_ENDPOINTS:
+            with metrics.count_queries() as stats:
+                response = await client.get(url)
+            response.raise_for_status()
+            counts[url] = stats["queries"]
+
+    return counts
+
+
+def bench_list_queries(recipes_list: List[int]) -> bool:
+    """SQL statements per list request as the catalogue grows; True if constant"""
+    by_size = {}
+
+    for recipes in recipes_list:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            bind = make_engine(path)
+            create_schema(bind)
+            seed_database(bind, people=4, ingredients=max(200, recipes // 5), recipes=recipes, weeks=2)
+            bind.dispose()
+
+            app = load_app(path)
+            by_size[recipes] = asyncio.run(_list_query_counts(app))
+            database.engine.dispose()
+
+    print(f"{'endpoint':<56}" + "".join(f"{recipes:>8}" for recipes in recipes_list) + "  constant")
+    constant = True
+    for url in LIST_ENDPOINTS:
+        counts = [by_size[recipes][url] for recipes in recipes_list]
+        same = len(set(counts)) == 1
+        constant = constant and same
+        print(f"{url:<56}" + "".join(f"{count:>8}" for count in counts) + f"  {'yes' if same else 'NO'}")
+
+    return constant
+
+
+# ============================================================================
+# SERIALIZATION BENCHMARK (response_model validation vs. orjson fast path)
+# ============================================================================
+
+def _default_render(adapter, data) -> bytes:
+    """What FastAPI does with a response_model: validate, dump, encode"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    validated = adapter.validate_python(data)
+    return JSONResponse(jsonable_encoder(adapter.dump_python(validated, mode="json"))).body
+
+
+async def _endpoint_latency(app, urls: List[str], repeat: int) -> Dict[str, Dict]:
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for url in urls:
+            results[url] = await measure_requests(lambda i: client.get(url), repeat)
+    return results
+
+
+def bench_serialize(recipes: int = 1000, people: int = 8, weeks: int = 52, repeat: int = 10):
+    """Encode large payloads both ways, then time the hot endpoints with fast JSON off and on"""
+    from pydantic import TypeAdapter
+    import responses
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        bind = make_engine(path)
+        create_schema(bind)
+        first_monday = seed_database(bind, people=people, ingredients=1000, recipes=recipes, weeks=weeks)
+        bind.dispose()
+
+        app = load_app(path)
+        import main
+
+        db = database.SessionLocal()
+        try:
+            payloads = {
+                "week summary": (
+                    models.WeekTotalsResponse,
+                    calculations.calculate_week_summary(db, calculations.get_week_start(), date.today())
+                ),
+                f"{recipes} recipes": (
+                    List[models.Recipe],
+                    main.load_recipe_rows(db, db.query(Recipe).order_by(Recipe.id))
+                ),
+                f"{weeks} weeks by day": (
+                    models.RangeSummaryResponse,
+                    calculations.calculate_range_summary(db, first_monday, date.today(), "day", False)
+                ),
+            }
+        finally:
+            db.close()
+
+        print(f"{'payload':<20}{'KB':>8}{'model ms':>10}{'orjson ms':>11}{'speedup':>9}  same")
+        for label, (model, data) in payloads.items():
+            adapter = TypeAdapter(model)
+            default = time_calls(lambda: _default_render(adapter, data), [()] * repeat)
+            fast = time_calls(lambda: responses.ORJSONResponse(data).body, [()] * repeat)
+            same = json.loads(_default_render(adapter, data)) == json.loads(responses.ORJSONResponse(data).body)
+            size = len(responses.ORJSONResponse(data).body) / 1024
+
+            print(
+                f"{label:<20}{size:>8.0f}{default['p50_us'] / 1000:>10.2f}{fast['p50_us'] / 1000:>11.2f}"
+                f"{default['p50_us'] / fast['p50_us']:>8.1f}x  {'yes' if same else 'NO'}"
+            )
+
+        urls = ["/week-totals", "/recipes", f"/summary?start={first_monday}&group=day&shopping=false"]
+        latency = {}
+        for fast_json in (False, True):
+            responses.FAST_JSON = fast_json
+            latency[fast_json] = asyncio.run(_endpoint_latency(app, urls, repeat))
+        responses.FAST_JSON = False
+
+        print(f"\n{'endpoint (p50 ms)':<56}{'model':>9}{'fast':>9}")
+        for url in urls:
+            print(f"{url[:55]:<56}{latency[False][url]['p50_ms']:>9.2f}{latency[True][url]['p50_ms']:>9.2f}")
+
+        database.engine.dispose()
+
+
+# ============================================================================
+# HOUSEHOLDS BENCHMARK (Quiet households while one household is busy)
+# ============================================================================
+
+async def _household_load(app, quiet: List[str], busy: str, busy_clients: int, seconds: float, first_monday: date) -> Dict:
+    """One poller per quiet household reading its week plan; busy_clients hammer the busy household"""
+    import httpx
+
+    week_start = date.today() - timedelta(days=date.today().weekday())
+    deadline = time.perf_counter() + seconds
+    stats = {"quiet": [], "quiet_errors": 0, "busy": 0, "busy_errors": 0, "rejected": 0}
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def poller(household_id):
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(f"/households/{household_id}/week-plan?limit=50")
+                stats["quiet"].append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    stats["quiet_errors"] += 1
+
+        async def hammer(n):
+            offset = n
+            while time.perf_counter() < deadline:
+                offset += busy_clients
+                if offset % 4:
+                    response = await client.get(f"/households/{busy}/summary?start={first_monday}&group=week&shopping=false")
+                else:
+                    response = await client.post(
+                        f"/households/{busy}/week-plan/bulk-update",
+                        json=week_plan_payload(week_start, 3, offset)
+                    )
+                stats["busy"] += 1
+                if response.status_code == 503:
+                    stats["rejected"] += 1
+                elif response.status_code != 200:
+                    stats["busy_errors"] += 1
+
+        await asyncio.gather(
+            *[poller(household_id) for household_id in quiet],
+            *[hammer(n) for n in range(busy_clients if busy else 0)]
+        )
+
+    return stats
+
+
+async def _household_isolation(app, expected_people: Dict[str, int]) -> List[str]:
+    """Households whose /people doesn't match what was seeded into their own database"""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        mismatched = []
+        for household_id, people in expected_people.items():
+            response = await client.get(f"/households/{household_id}/people")
+            if response.status_code != 200 or len(response.json()) != people:
+                mismatched.append(household_id)
+        return mismatched
+
+
+def bench_households(households: int = 20, busy_clients: int = 64, seconds: float = 5.0, weeks: int = 52):
+    """
+    Latency of quiet households alone, next to a busy one with the
+    per-household request limit, and next to a busy one without it
+    """
+    import households as household_routing
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.HOUSEHOLDS_DIR = os.path.join(tmp, "households")
+        os.makedirs(database.HOUSEHOLDS_DIR)
+
+        path = os.path.join(tmp, "bench.db")
+        bind = make_engine(path)
+        create_schema(bind)
+        bind.dispose()
+
+        # People per household differ, so data leaking between them shows up.
+        # household-0 is the busy one; its bulk updates use Person 1-3.
+        expected_people = {}
+        for n in range(households):
+            household_id = f"household-{n}"
+            expected_people[household_id] = 3 if n == 0 else 2 + n % 4
+            bind = make_engine(database.household_path(household_id))
+            create_schema(bind)
+            first_monday = seed_database(bind, people=expected_people[household_id], weeks=weeks, seed=n)
+            bind.dispose()
+
+        app = load_app(path)
+        busy, quiet = "household-0", [f"household-{n}" for n in range(1, households)]
+
+        limit = household_routing.MAX_CONCURRENT_REQUESTS
+        runs = [
+            ("idle", None, limit),
+            ("limited", busy, limit),
+            ("no limit", busy, 10 ** 6),
+        ]
+
+        print(f"{households} households, {busy_clients} clients on {busy}, {seconds:.0f}s each\n")
+        print(f"{'':<10}{'quiet reqs':>11}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'busy reqs':>11}{'503s':>7}{'errors':>8}")
+
+        for label, busy_household, max_requests in runs:
+            household_routing.MAX_CONCURRENT_REQUESTS = max_requests
+            household_routing._limits.clear()
+            stats = asyncio.run(_household_load(app, quiet, busy_household, busy_clients, seconds, first_monday))
+
+            quiet_latency = latency_stats(stats["quiet"] or [0.0])
+            print(
+                f"{label:<10}{len(stats['quiet']):>11}{quiet_latency['p50_ms']:>9.1f}{quiet_latency['p99_ms']:>9.1f}"
+                f"{stats['quiet_errors']:>8}{stats['busy']:>11}{stats['rejected']:>7}{stats['busy_errors']:>8}"
+            )
+
+        household_routing.MAX_CONCURRENT_REQUESTS = limit
+        household_routing._limits.clear()
+
+        mismatched = asyncio.run(_household_isolation(app, expected_people))
+        print(f"\nisolation: {'ok' if not mismatched else 'MISMATCH in ' + ', '.join(mismatched)}")
+
+        database.close_households()
+        database.engine.dispose()
+
+
+# ============================================================================
+# SUITE (Hot paths at several scales, saved as a JSON baseline)
+# ============================================================================
+
+SCALES = {
+    "small": {"people": 2, "ingredients": 100, "recipes": 50, "weeks": 12},
+    "medium": {"people": 4, "ingredients": 300, "recipes": 200, "weeks": 104},
+    "large": {"people": 6, "ingredients": 1000, "recipes": 1000, "weeks": 260},
+}
+
+SUITE_WARMUP = 2
+
+# A p50 this much slower than the baseline (or any extra query) is a regression
+REGRESSION_THRESHOLD = 0.2
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    """Percentiles of latency samples in milliseconds"""
+    samples = sorted(samples)
+
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))], 3)
+
+    return {
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def measure(fn: Callable, repeat: int) -> Dict:
+    """Latency percentiles and SQL statements per call of fn(i)"""
+    for i in range(SUITE_WARMUP):
+        fn(i)
+
+    samples = []
+    queries = []
+    for i in range(SUITE_WARMUP, SUITE_WARMUP + repeat):
+        with metrics.count_queries() as stats:
+            start = time.perf_counter()
+            fn(i)
+            samples.append((time.perf_counter() - start) * 1000)
+        queries.append(stats["queries"])
+
+    return {**latency_stats(samples), "queries": statistics.median(queries)}
+
+
+async def measure_requests(send: Callable, repeat: int) -> Dict:
+    """measure() for an in-process request: send(i) returns an awaitable response"""
+    for i in range(SUITE_WARMUP):
+        response = await send(i)
+        response.raise_for_status()
+
+    samples = []
+    queries = []
+    for i in range(SUITE_WARMUP, SUITE_WARMUP + repeat):
+        with metrics.count_queries() as stats:
+            start = time.perf_counter()
+            response = await send(i)
+            samples.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        queries.append(stats["queries"])
+
+    return {**latency_stats(samples), "queries": statistics.median(queries)}
+
+
+def snack_payload(week_start: date, people: int, snacks: int, flip: int) -> Dict:
+    """Every snack toggle of the week, alternating so every save changes rows"""
+    return {
+        "snacks": [
+            {
+                "date": (week_start + timedelta(days=d)).isoformat(),
+                "person": f"Person {person_id}",
+                "snack_name": f"Snack {snack_id}",
+                "consumed": (d + person_id + snack_id + flip) % 2 == 0,
+            }
+            for d in range(7)
+            for person_id in range(1, people + 1)
+            for snack_id in range(1, snacks + 1)
+        ]
+    }
+
+
+async def _suite_requests(app, scale: Dict, repeat: int) -> Dict[str, Dict]:
+    import httpx
+
+    week_start = calculations.get_week_start()
+    people = scale["people"]
+    results = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def cold_week_totals(i):
+            cache.bump_data_version()
+            return await client.get("/week-totals")
+
+        results["GET /week-totals (cold)"] = await measure_requests(cold_week_totals, repeat)
+        results["GET /week-totals (cached)"] = await measure_requests(
+            lambda i: client.get("/week-totals"), repeat
+        )
+        results["POST /week-plan/bulk-update"] = await measure_requests(
+            lambda i: client.post(
+                "/week-plan/bulk-update",
+                json=week_plan_payload(week_start, people, i, scale["recipes"])
+            ),
+            repeat
+        )
+        results["POST /snack-log/bulk-update"] = await measure_requests(
+            lambda i: client.post("/snack-log/bulk-update", json=snack_payload(week_start, people, 10, i)),
+            repeat
+        )
+
+    return results
+
+
+def run_scale(scale: Dict, repeat: int, profile: str = None, mode: str = None) -> Dict[str, Dict]:
+    """Seed one scale, then time the calculations directly and the endpoints in-process"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        bind = make_engine(path, profile)
+        create_schema(bind)
+        seed_database(
+            bind,
+            people=scale["people"],
+            ingredients=scale["ingredients"],
+            recipes=scale["recipes"],
+            weeks=scale["weeks"]
+        )
+        bind.dispose()
+
+        app = load_app(path, profile, mode)
+        week_start = calculations.get_week_start()
+        today = date.today()
+
+        db = database.SessionLocal()
+        try:
+            results = {
+                "calculate_week_summary": measure(
+                    lambda i: calculations.calculate_week_summary(db, week_start, today), repeat
+                ),
+                "generate_shopping_list (wed)": measure(
+                    lambda i: calculations.generate_shopping_list(db, week_start, "wed"), repeat
+                ),
+                "generate_shopping_list (sun)": measure(
+                    lambda i: calculations.generate_shopping_list(db, week_start, "sun"), repeat
+                ),
+            }
+        finally:
+            db.close()
+
+        results.update(asyncio.run(_suite_requests(app, scale, repeat)))
+
+        database.engine.dispose()
+        if database.async_engine is not None:
+            asyncio.run(database.async_engine.dispose())
+
+    return results
+
+
+def compare_baseline(previous: Dict, current: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Print p50 and query count changes against a previous baseline; return the regressions"""
+    regressions = []
+    print(f"\n{'scale':<8}{'case':<32}{'p50 ms':>9}{'was':>9}{'change':>9}{'queries':>9}{'was':>6}")
+
+    for scale_name, scale in current["scales"].items():
+        before = previous.get("scales", {}).get(scale_name, {}).get("results", {})
+        for case, result in scale["results"].items():
+            old = before.get(case)
+            if old is None:
+                continue
+
+            change = result["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+            slower = change > threshold
+            more_queries = result["queries"] > old["queries"]
+            if slower or more_queries:
+                regressions.append(f"{scale_name} {case}")
+
+            print(
+                f"{scale_name:<8}{case:<32}{result['p50_ms']:>9.2f}{old['p50_ms']:>9.2f}{change:>+9.0%}"
+                f"{result['queries']:>9g}{old['queries']:>6g}{'  <-- regression' if slower or more_queries else ''}"
+            )
+
+    return regressions
+
+
+def bench_suite(
+    scales: List[str],
+    repeat: int = 50,
+    output: str = "benchmark-baseline.json",
+    compare: str = None,
+    profile: str = None,
+    mode: str = None
+) -> List[str]:
+    """
+    Time the hot paths at each scale and write the results to output.
+    With compare, also report changes against an earlier baseline file.
+    Returns the regressions found (empty without compare).
+    """
+    import sqlalchemy
+
+    baseline = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "db_profile": profile or database.DB_PROFILE,
+        "db_mode": mode or database.DB_MODE,
+        "repeat": repeat,
+        "scales": {},
+    }
+
+    print(f"{'scale':<8}{'case':<32}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for scale_name in scales:
+        scale = SCALES[scale_name]
+        results = run_scale(scale, repeat, profile, mode)
+        baseline["scales"][scale_name] = {"config": scale, "results": results}
+
+        for case, result in results.items():
+            print(
+                f"{scale_name:<8}{case:<32}{result['p50_ms']:>9.2f}{result['p90_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{result['queries']:>9g}"
+            )
+
+    regressions = []
+    if compare:
+        with open(compare) as f:
+            regressions = compare_baseline(json.load(f), baseline)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s) against {compare}")
+
+    with open(output, "w") as f:
+        json.dump(baseline, f, indent=2)
+    print(f"\n💾 Baseline written to {output}")
+
+    return regressions
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Meal planner benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    indexes = sub.add_parser("indexes", help="Hot-path lookup cost vs. years of history")
+    indexes.add_argument("--years", type=int, nargs="+", default=[1, 2, 5, 10])
+    indexes.add_argument("--lookups", type=int, default=1000)
+
+    concurrency = sub.add_parser("concurrency", help="Readers polling /week-totals during bulk writes")
+    concurrency.add_argument("--readers", type=int, default=8)
+    concurrency.add_argument("--seconds", type=float, default=10.0)
+    concurrency.add_argument("--weeks", type=int, default=52)
+    concurrency.add_argument("--profiles", nargs="+", choices=list(database.ENGINE_PROFILES))
+
+    modes = sub.add_parser("modes", help="Sync vs. async database mode under the same load")
+    modes.add_argument("--readers", type=int, default=8)
+    modes.add_argument("--seconds", type=float, default=10.0)
+    modes.add_argument("--weeks", type=int, default=52)
+
+    summary = sub.add_parser("summary", help="/summary over whole history per grouping")
+    summary.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+
+    importing = sub.add_parser("import", help="Bulk /import of recipes with portions")
+    importing.add_argument("--recipes", type=int, nargs="+", default=[1000, 5000])
+
+    kernel = sub.add_parser("kernel", help="NumPy kernel vs. current calculations (as-of prices)")
+    kernel.add_argument("--people", type=int, nargs="+", default=[3, 12])
+    kernel.add_argument("--weeks", type=int, nargs="+", default=[52, 260])
+
+    planning = sub.add_parser("planner", help="/week-plan/auto-generate across catalogue sizes")
+    planning.add_argument("--recipes", type=int, nargs="+", default=[100, 300, 1000])
+    planning.add_argument("--time-limit-ms", type=int, default=500)
+
+    listing = sub.add_parser("listing", help="SQL statements per list request vs. catalogue size")
+    listing.add_argument("--recipes", type=int, nargs="+", default=[100, 1000, 5000])
+
+    serialize = sub.add_parser("serialize", help="response_model validation vs. orjson fast path")
+    serialize.add_argument("--recipes", type=int, default=1000)
+    serialize.add_argument("--weeks", type=int, default=52)
+
+    tenants = sub.add_parser("households", help="Quiet households' latency next to a busy one")
+    tenants.add_argument("--households", type=int, default=20)
+    tenants.add_argument("--busy-clients", type=int, default=64)
+    tenants.add_argument("--seconds", type=float, default=5.0)
+    tenants.add_argument("--weeks", type=int, default=52)
+
+    suite = sub.add_parser("suite", help="Hot paths at several scales, saved as a JSON baseline")
+    suite.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"])
+    suite.add_argument("--repeat", type=int, default=50)
+    suite.add_argument("--output", default="benchmark-baseline.json")
+    suite.add_argument("--compare", help="Earlier baseline file to compare against")
+    suite.add_argument("--profile", choices=list(database.ENGINE_PROFILES))
+    suite.add_argument("--mode", choices=["sync", "async"])
+
+    args = parser.parse_args()
+
+    if args.command == "indexes":
+        bench_indexes(args.years, args.lookups)
+    elif args.command == "concurrency":
+        bench_concurrency(args.readers, args.seconds, args.weeks, args.profiles)
+    elif args.command == "modes":
+        bench_modes(args.readers, args.seconds, args.weeks)
+    elif args.command == "summary":
+        bench_summary(args.years)
+    elif args.command == "import":
+        bench_import(args.recipes)
+    elif args.command == "kernel":
+        bench_kernel(args.people, args.weeks)
+    elif args.command == "planner":
+        bench_planner(args.recipes, time_limit_ms=args.time_limit_ms)
+    elif args.command == "listing":
+        if not bench_list_queries(args.recipes):
+            raise SystemExit(1)
+    elif args.command == "serialize":
+        bench_serialize(args.recipes, weeks=args.weeks)
+    elif args.command == "households":
+        bench_households(args.households, args.busy_clients, args.seconds, args.weeks)
+    elif args.command == "suite":
+        regressions = bench_suite(args.scales, args.repeat, args.output, args.compare, args.profile, args.mode)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+In-process caches for the meal planner, kept per household.
+- A data version counter bumped by every mutating endpoint
+- Cached /week-totals summaries keyed by (week_start, today)
+- ETags so HA's REST sensor can get a cheap 304 when nothing changed
+- Name -> id lookups for people, recipes and snacks
+"""
+
+from datetime import date
+from typing import Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+import threading
+import uuid
+
+import database
+
+
+# Changes on every restart so ETags from a previous process never match
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+_lock = threading.Lock()
+
+# {household id: state}; one household's writes never touch another's entries
+#   data_version: int
+#   week_totals: {(week_start, today): (data_version, summary)}
+#   name_maps: {table name: {lowercase name: id}}
+#   name_generation: int
+_households: Dict[str, Dict] = {}
+
+# Called with the new version after every bump (see events.py), in the
+# bumping household's context (database.current_household())
+_version_listeners: List[Callable[[int], None]] = []
+
+
+def _state() -> Dict:
+    """Cache state of the current household"""
+    household_id = database.current_household()
+    state = _households.get(household_id)
+    if state is None:
+        with _lock:
+            state = _households.setdefault(household_id, {
+                "data_version": 0,
+                "week_totals": {},
+                "name_maps": {},
+                "name_generation": 0,
+            })
+    return state
+
+
+def active_households() -> List[str]:
+    """Households with cache state in this process (seen since startup)"""
+    return list(_households)
+
+
+# ============================================================================
+# DATA VERSION
+# ============================================================================
+
+def get_data_version() -> int:
+    """Current data version (increases after every committed write)"""
+    return _state()["data_version"]
+
+
+def bump_data_version() -> int:
+    """
+    Mark cached data as stale.
+    Call after any commit that changes plans, snacks, recipes or ingredients.
+    """
+    state = _state()
+    with _lock:
+        state["data_version"] += 1
+        state["week_totals"].clear()
+        version = state["data_version"]
+
+    for listener in _version_listeners:
+        listener(version)
+
+    return version
+
+
+def add_version_listener(listener: Callable[[int], None]):
+    """Call listener(version) after every bump; it must not block"""
+    _version_listeners.append(listener)
+
+
+# ============================================================================
+# WEEK TOTALS CACHE
+# ============================================================================
+
+def week_totals_etag(week_start: date, today: date, version: int = None) -> str:
+    """ETag for the /week-totals response at a given data version"""
+    if version is None:
+        version = get_data_version()
+    return f'"{_BOOT_ID}-{database.current_household()}-{version}-{week_start.isoformat()}-{today.isoformat()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against our ETag"""
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+
+    return False
+
+
+def get_week_totals(week_start: date, today: date, version: int) -> Optional[Dict]:
+    """Return the cached summary if it was computed at this data version"""
+    entry = _state()["week_totals"].get((week_start, today))
+    if entry and entry[0] == version:
+        return entry[1]
+    return None
+
+
+def store_week_totals(week_start: date, today: date, version: int, summary: Dict):
+    """
+    Cache a summary computed at the given data version.
+    Ignored if a write happened while it was being computed.
+    """
+    state = _state()
+    with _lock:
+        if version != state["data_version"]:
+            return
+
+        # Entries for previous days are never read again
+        week_totals = state["week_totals"]
+        for key in [k for k in week_totals if k[1] != today]:
+            del week_totals[key]
+
+        week_totals[(week_start, today)] = (version, summary)
+
+
+# ============================================================================
+# NAME -> ID LOOKUPS
+# ============================================================================
+
+def get_name_map(db: Session, model) -> Dict[str, int]:
+    """
+    Lowercase name -> id for a table with a unique name column
+    (Person, Recipe, Snack). Loaded once, then served from memory until
+    invalidate_name_map() is called for that table.
+    """
+    state = _state()
+    key = model.__tablename__
+    names = state["name_maps"].get(key)
+    if names is not None:
+        return names
+
+    generation = state["name_generation"]
+    names = {name.lower(): row_id for row_id, name in db.query(model.id, model.name).all()}
+
+    with _lock:
+        # Don't cache a map that was loaded while the table changed
+        if generation == state["name_generation"]:
+            state["name_maps"][key] = names
+
+    return names
+
+
+def invalidate_name_map(model):
+    """Drop a table's cached name map; call after creating/renaming/deleting rows"""
+    state = _state()
+    with _lock:
+        state["name_generation"] += 1
+        state["name_maps"].pop(model.__tablename__, None)
@@ -7,10 +7,18 @@ Core calculation logic for meal planning.
 
 from datetime import date, timedelta
 from typing import List, Dict, Tuple
+from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
 from collections import defaultdict
+import math
 
-from database import WeekPlan, RecipePortion, Ingredient, SnackLog, Snack, Person, Recipe
+from database import WeekPlan, RecipePortion, Ingredient, SnackLog, Snack, Person, RecipeVector, DailyPersonTotals
+import aggregates
+import database
+import units
+
+
+NUTRIENTS = ("kcal", "protein", "carbs", "fat")
 
 
 # ============================================================================
@@ -51,81 +59,104 @@ def is_wed_batch(meal_date: date, meal_type: str) -> bool:
 
 
 # ============================================================================
-# DAILY TOTALS
+# VECTOR ROWS (Meals summed from recipe_vectors, snacks from their ingredient)
 # ============================================================================
 
-def calculate_daily_totals(db: Session, target_date: date) -> Dict[str, Dict[str, float]]:
+def load_day_vector_rows(db: Session, start: date, end: date) -> List[Tuple[date, int, Dict[str, float]]]:
     """
-    Calculate nutrition totals for each person for a specific day.
+    Per-day, per-person nutrition and cost between start and end inclusive.
+    Costs use the prices in effect on each day.
     
-    Returns: {
-        "Michael": {"kcal": 2000, "protein": 150, "carbs": 200, "fat": 70},
-        "Lorna": {...},
-        "Izzy": {...}
-    }
+    Returns: [(date, person_id, {"kcal", "protein", "carbs", "fat", "cost"}), ...]
     """
-    totals = defaultdict(lambda: {"kcal": 0.0, "protein": 0.0, "carbs": 0.0, "fat": 0.0})
+    totals = defaultdict(lambda: dict.fromkeys(aggregates.TOTAL_COLUMNS, 0.0))
+    
+    # 1. Meals: one precomputed vector per planned slot
+    meal_rows = db.query(
+        WeekPlan.date,
+        WeekPlan.person_id,
+        *[getattr(RecipeVector, key) for key in aggregates.NUTRIENT_COLUMNS]
+    ).join(
+        RecipeVector,
+        and_(
+            RecipeVector.recipe_id == WeekPlan.recipe_id,
+            RecipeVector.person_id == WeekPlan.person_id
+        )
+    ).filter(WeekPlan.date.between(start, end)).all()
+    
+    # 2. Snacks: single-ingredient, so scale the ingredient directly
+    qty = Snack.default_quantity
+    snack_rows = db.query(
+        SnackLog.date,
+        SnackLog.person_id,
+        Ingredient.kcal_per_unit * qty,
+        Ingredient.protein_per_unit * qty,
+        Ingredient.carbs_per_unit * qty,
+        Ingredient.fat_per_unit * qty
+    ).join(
+        Snack, Snack.id == SnackLog.snack_id
+    ).join(
+        Ingredient, Ingredient.id == Snack.ingredient_id
+    ).filter(
+        SnackLog.date.between(start, end),
+        SnackLog.consumed == True
+    ).all()
     
-    # Get all people
-    people = db.query(Person).all()
-    person_map = {p.id: p.name for p in people}
+    for day_date, person_id, *values in meal_rows + snack_rows:
+        row = totals[(day_date, person_id)]
+        for key, value in zip(aggregates.NUTRIENT_COLUMNS, values):
+            row[key] += value or 0.0
     
-    # 1. Add meals from week plan
-    meals = db.query(WeekPlan).filter(WeekPlan.date == target_date).all()
+    # 3. Costs at the prices of each day
+    for day_date, person_id, cost in aggregates.dated_costs(db, lambda column: column.between(start, end)):
+        totals[(day_date, person_id)]["cost"] += cost
     
-    for meal in meals:
-        if not meal.recipe_id:
-            continue
-        
-        person_name = person_map.get(meal.person_id)
-        if not person_name:
-            continue
-        
-        # Get recipe portions for this person
-        portions = db.query(RecipePortion).filter(
-            RecipePortion.recipe_id == meal.recipe_id,
-            RecipePortion.person_id == meal.person_id
-        ).all()
-        
-        for portion in portions:
-            ingredient = db.query(Ingredient).filter(Ingredient.id == portion.ingredient_id).first()
-            if not ingredient:
-                continue
-            
-            qty = portion.quantity
-            totals[person_name]["kcal"] += ingredient.kcal_per_unit * qty
-            totals[person_name]["protein"] += ingredient.protein_per_unit * qty
-            totals[person_name]["carbs"] += ingredient.carbs_per_unit * qty
-            totals[person_name]["fat"] += ingredient.fat_per_unit * qty
-    
-    # 2. Add snacks from snack log
-    snacks = db.query(SnackLog).filter(
-        SnackLog.date == target_date,
-        SnackLog.consumed == True
-    ).all()
+    return [(day_date, person_id, values) for (day_date, person_id), values in totals.items()]
+
+
+def _person_totals(db: Session, start: date, end: date) -> Dict[str, Dict[str, float]]:
+    """Sum nutrition vectors per person over a date range"""
+    person_map = {pid: name for pid, name in db.query(Person.id, Person.name).all()}
+    totals = defaultdict(lambda: dict.fromkeys(NUTRIENTS, 0.0))
     
-    for snack_entry in snacks:
-        person_name = person_map.get(snack_entry.person_id)
+    for _, person_id, values in load_day_vector_rows(db, start, end):
+        person_name = person_map.get(person_id)
         if not person_name:
             continue
         
-        snack = db.query(Snack).filter(Snack.id == snack_entry.snack_id).first()
-        if not snack:
-            continue
-        
-        ingredient = db.query(Ingredient).filter(Ingredient.id == snack.ingredient_id).first()
-        if not ingredient:
-            continue
-        
-        qty = snack.default_quantity
-        totals[person_name]["kcal"] += ingredient.kcal_per_unit * qty
-        totals[person_name]["protein"] += ingredient.protein_per_unit * qty
-        totals[person_name]["carbs"] += ingredient.carbs_per_unit * qty
-        totals[person_name]["fat"] += ingredient.fat_per_unit * qty
+        for key in NUTRIENTS:
+            totals[person_name][key] += values[key]
     
     return dict(totals)
 
 
+def _daily_costs(db: Session, start: date, end: date) -> Dict[date, float]:
+    """Sum cost vectors per day over a date range"""
+    costs = defaultdict(float)
+    
+    for day_date, _, values in load_day_vector_rows(db, start, end):
+        costs[day_date] += values["cost"]
+    
+    return costs
+
+
+# ============================================================================
+# DAILY TOTALS
+# ============================================================================
+
+def calculate_daily_totals(db: Session, target_date: date) -> Dict[str, Dict[str, float]]:
+    """
+    Calculate nutrition totals for each person for a specific day.
+    
+    Returns: {
+        "Michael": {"kcal": 2000, "protein": 150, "carbs": 200, "fat": 70},
+        "Lorna": {...},
+        "Izzy": {...}
+    }
+    """
+    return _person_totals(db, target_date, target_date)
+
+
 # ============================================================================
 # WEEKLY TOTALS
 # ============================================================================
@@ -140,20 +171,7 @@ def calculate_weekly_totals(db: Session, week_start: date) -> Dict[str, Dict[str
         "Izzy": {...}
     }
     """
-    totals = defaultdict(lambda: {"kcal": 0.0, "protein": 0.0, "carbs": 0.0, "fat": 0.0})
-    
-    # Sum up each day of the week
-    for day_offset in range(7):
-        day_date = week_start + timedelta(days=day_offset)
-        day_totals = calculate_daily_totals(db, day_date)
-        
-        for person, nutrients in day_totals.items():
-            totals[person]["kcal"] += nutrients["kcal"]
-            totals[person]["protein"] += nutrients["protein"]
-            totals[person]["carbs"] += nutrients["carbs"]
-            totals[person]["fat"] += nutrients["fat"]
-    
-    return dict(totals)
+    return _person_totals(db, week_start, week_start + timedelta(days=6))
 
 
 # ============================================================================
@@ -162,50 +180,16 @@ def calculate_weekly_totals(db: Session, week_start: date) -> Dict[str, Dict[str
 
 def calculate_daily_cost(db: Session, target_date: date) -> float:
     """Calculate total cost for all meals on a specific day"""
-    total_cost = 0.0
-    
-    # 1. Meals
-    meals = db.query(WeekPlan).filter(WeekPlan.date == target_date).all()
-    
-    for meal in meals:
-        if not meal.recipe_id:
-            continue
-        
-        portions = db.query(RecipePortion).filter(
-            RecipePortion.recipe_id == meal.recipe_id,
-            RecipePortion.person_id == meal.person_id
-        ).all()
-        
-        for portion in portions:
-            ingredient = db.query(Ingredient).filter(Ingredient.id == portion.ingredient_id).first()
-            if ingredient:
-                total_cost += ingredient.cost_per_unit * portion.quantity
-    
-    # 2. Snacks
-    snacks = db.query(SnackLog).filter(
-        SnackLog.date == target_date,
-        SnackLog.consumed == True
-    ).all()
-    
-    for snack_entry in snacks:
-        snack = db.query(Snack).filter(Snack.id == snack_entry.snack_id).first()
-        if not snack:
-            continue
-        
-        ingredient = db.query(Ingredient).filter(Ingredient.id == snack.ingredient_id).first()
-        if ingredient:
-            total_cost += ingredient.cost_per_unit * snack.default_quantity
-    
-    return round(total_cost, 2)
+    costs = _daily_costs(db, target_date, target_date)
+    return round(costs.get(target_date, 0.0), 2)
 
 
 def calculate_weekly_cost(db: Session, week_start: date) -> float:
     """Calculate total cost for entire week"""
-    total_cost = 0.0
+    costs = _daily_costs(db, week_start, week_start + timedelta(days=6))
     
-    for day_offset in range(7):
-        day_date = week_start + timedelta(days=day_offset)
-        total_cost += calculate_daily_cost(db, day_date)
+    # Each day is rounded before summing
+    total_cost = sum(round(cost, 2) for cost in costs.values())
     
     return round(total_cost, 2)
 
@@ -217,82 +201,226 @@ def calculate_weekly_cost(db: Session, week_start: date) -> float:
 def generate_shopping_list(db: Session, week_start: date, batch: str) -> List[Dict]:
     """
     Generate shopping list for either Wed or Sun batch cook.
+    Same lists as /week-totals: whole packs, with the Sun batch using
+    Wednesday's leftovers first (see generate_week_shopping_lists).
     
     batch: "wed" or "sun"
     
     Returns: [
-        {"ingredient": "Chicken", "quantity": 1.5, "unit": "kg", "cost": 9.19},
+        {"ingredient": "Chicken", "quantity": 1.5, "unit": "kg", "cost": 9.19,
+         "packs": 2, "spend": 10.0, "leftover": 0.5, "carried_over": 0.0},
         ...
     ]
     """
-    # Consolidate ingredients
-    ingredient_totals = defaultdict(float)
+    shopping = generate_week_shopping_lists(db, week_start)
+    return shopping["wed" if batch == "wed" else "sun"]
+
+
+def shopping_item(ingredient: Ingredient, total_qty: float, pack: Dict = None) -> Dict:
+    """
+    Build one shopping list line for a consolidated ingredient quantity.
+    pack: this ingredient's optimize_packs() result (packs, spend, leftover)
+    """
+    # Calculate cost
+    cost = ingredient.cost_per_unit * total_qty
     
-    # Iterate through the week
-    for day_offset in range(7):
-        day_date = week_start + timedelta(days=day_offset)
-        
-        # Get meals for this day
-        meals = db.query(WeekPlan).filter(WeekPlan.date == day_date).all()
-        
-        for meal in meals:
-            if not meal.recipe_id:
-                continue
-            
-            # Check if this meal belongs to the requested batch
-            if batch == "wed":
-                if not is_wed_batch(day_date, meal.meal_type):
-                    continue
-            else:  # sun batch
-                if is_wed_batch(day_date, meal.meal_type):
-                    continue
-            
-            # Get portions for this meal
-            portions = db.query(RecipePortion).filter(
-                RecipePortion.recipe_id == meal.recipe_id,
-                RecipePortion.person_id == meal.person_id
-            ).all()
-            
-            for portion in portions:
-                ingredient_totals[portion.ingredient_id] += portion.quantity
-    
-    # Convert to shopping list with ingredient details
-    shopping_list = []
-    
-    for ingredient_id, total_qty in ingredient_totals.items():
-        ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
-        if not ingredient:
+    # Quantities are in the base unit; show e.g. g as kg from 1000 g
+    scale, display_unit = units.display(total_qty, ingredient.unit)
+    
+    item = {
+        "ingredient": ingredient.name,
+        "quantity": round(total_qty / scale, 2),
+        "unit": display_unit,
+        "cost": round(cost, 2)
+    }
+    
+    if pack is not None:
+        item["packs"] = pack["packs"]
+        item["spend"] = round(pack["spend"], 2)
+        item["leftover"] = round(pack["leftover"] / scale, 2)
+        item["carried_over"] = round(pack["carried_over"] / scale, 2)
+    
+    return item
+
+
+# ============================================================================
+# PACK OPTIMIZER (Whole packs per batch, Wed leftovers carried to Sun)
+# ============================================================================
+
+# Absorbs float noise so 500.0000001g of a 500g pack is still one pack
+PACK_EPSILON = 1e-6
+
+
+def optimize_packs(ingredients: List[Ingredient], wed_qty: List[float], sun_qty: List[float]) -> Dict[str, List[Dict]]:
+    """
+    Round both batches up to whole packs in one column-wise pass.
+    
+    The three lists are aligned by position (one entry per ingredient).
+    Wednesday buys whole packs for its meals; whatever is left over is used
+    before Sunday buys anything. Ingredients without a pack_size are bought
+    loose at cost_per_unit. A pack costs pack_cost, or pack_size x
+    cost_per_unit when pack_cost isn't set.
+    
+    Returns: {"wed": [...], "sun": [...]}, each aligned with ingredients:
+        {"packs": int or None, "spend": float, "leftover": float, "carried_over": float}
+    leftover is what's left after that batch's meals (Sun: at the end of the week).
+    """
+    size = [ingredient.pack_size or 0.0 for ingredient in ingredients]
+    unit_cost = [ingredient.cost_per_unit or 0.0 for ingredient in ingredients]
+    pack_cost = [
+        ingredient.pack_cost if ingredient.pack_cost is not None else s * c
+        for ingredient, s, c in zip(ingredients, size, unit_cost)
+    ]
+    
+    def buy(need):
+        packs = [math.ceil(q / s - PACK_EPSILON) if s > 0 and q > 0 else 0 for q, s in zip(need, size)]
+        bought = [p * s if s > 0 else q for p, s, q in zip(packs, size, need)]
+        spend = [p * pc if s > 0 else q * c for p, pc, s, q, c in zip(packs, pack_cost, size, need, unit_cost)]
+        return packs, bought, spend
+    
+    wed_packs, wed_bought, wed_spend = buy(wed_qty)
+    wed_leftover = [max(b - q, 0.0) for b, q in zip(wed_bought, wed_qty)]
+    
+    carried = [min(left, q) for left, q in zip(wed_leftover, sun_qty)]
+    sun_need = [q - c for q, c in zip(sun_qty, carried)]
+    
+    sun_packs, sun_bought, sun_spend = buy(sun_need)
+    sun_leftover = [
+        max(b - q, 0.0) + left - c
+        for b, q, left, c in zip(sun_bought, sun_need, wed_leftover, carried)
+    ]
+    
+    def batch(packs, spend, leftover, carried_over):
+        return [
+            {"packs": p if s > 0 else None, "spend": sp, "leftover": left, "carried_over": c}
+            for p, s, sp, left, c in zip(packs, size, spend, leftover, carried_over)
+        ]
+    
+    return {
+        "wed": batch(wed_packs, wed_spend, wed_leftover, [0.0] * len(ingredients)),
+        "sun": batch(sun_packs, sun_spend, sun_leftover, carried),
+    }
+
+
+# ============================================================================
+# SET-BASED WEEK ENGINE
+# ============================================================================
+
+def query_meal_rows(db: Session):
+    """
+    WeekPlan ⋈ RecipePortion ⋈ Ingredient, one row per planned portion:
+    (date, person_id, meal_type, quantity, Ingredient)
+    """
+    return db.query(
+        WeekPlan.date,
+        WeekPlan.person_id,
+        WeekPlan.meal_type,
+        RecipePortion.quantity,
+        Ingredient
+    ).join(
+        RecipePortion,
+        and_(
+            RecipePortion.recipe_id == WeekPlan.recipe_id,
+            RecipePortion.person_id == WeekPlan.person_id
+        )
+    ).join(
+        Ingredient, Ingredient.id == RecipePortion.ingredient_id
+    )
+
+
+def batch_shopping_lists(meal_rows: List, week_start: date) -> Dict[str, List[Dict]]:
+    """Split the week's meal rows into the Wed and Sun batch shopping lists"""
+    week_end = week_start + timedelta(days=6)
+    
+    shopping_totals = {"wed": defaultdict(float), "sun": defaultdict(float)}
+    ingredients = {}
+    
+    for day_date, person_id, meal_type, qty, ingredient in meal_rows:
+        if not week_start <= day_date <= week_end:
             continue
         
-        # Calculate cost
-        cost = ingredient.cost_per_unit * total_qty
+        batch = "wed" if is_wed_batch(day_date, meal_type) else "sun"
+        shopping_totals[batch][ingredient.id] += qty
+        ingredients[ingredient.id] = ingredient
+    
+    # Whole packs for every ingredient in the week at once
+    ingredient_ids = list(ingredients)
+    packs = optimize_packs(
+        [ingredients[ing_id] for ing_id in ingredient_ids],
+        [shopping_totals["wed"].get(ing_id, 0.0) for ing_id in ingredient_ids],
+        [shopping_totals["sun"].get(ing_id, 0.0) for ing_id in ingredient_ids]
+    )
+    
+    shopping = {}
+    for batch, ingredient_totals in shopping_totals.items():
+        items = [
+            shopping_item(ingredients[ing_id], ingredient_totals[ing_id], pack)
+            for ing_id, pack in zip(ingredient_ids, packs[batch])
+            if ing_id in ingredient_totals
+        ]
+        items.sort(key=lambda x: x["ingredient"])
+        shopping[batch] = items
+        shopping[f"{batch}_spend"] = round(sum(item["spend"] for item in items), 2)
+    
+    return shopping
+
+
+def generate_week_shopping_lists(db: Session, week_start: date) -> Dict[str, List[Dict]]:
+    """Both batch shopping lists for the week from a single join query"""
+    week_end = week_start + timedelta(days=6)
+    meal_rows = query_meal_rows(db).filter(WeekPlan.date.between(week_start, week_end)).all()
+    return batch_shopping_lists(meal_rows, week_start)
+
+
+def summarize_day_totals(
+    person_map: Dict[int, str],
+    day_rows: List[Tuple[date, int, Dict[str, float]]],
+    week_start: date,
+    today: date
+) -> Dict:
+    """
+    Fold per-day, per-person totals into today/week nutrition and cost.
+    day_rows: [(date, person_id, {"kcal", "protein", "carbs", "fat", "cost"}), ...]
+    """
+    week_end = week_start + timedelta(days=6)
+    
+    today_totals = {}
+    week_totals = defaultdict(lambda: dict.fromkeys(NUTRIENTS, 0.0))
+    day_cost = defaultdict(float)
+    
+    for day_date, person_id, values in day_rows:
+        day_cost[day_date] += values["cost"]
         
-        # Convert grams to kg if applicable
-        display_qty = total_qty
-        display_unit = ingredient.unit
+        person_name = person_map.get(person_id)
+        if not person_name:
+            continue
         
-        if ingredient.unit == "g" and total_qty >= 1000:
-            display_qty = total_qty / 1000
-            display_unit = "kg"
+        if day_date == today:
+            today_totals[person_name] = {key: values[key] for key in NUTRIENTS}
         
-        shopping_list.append({
-            "ingredient": ingredient.name,
-            "quantity": round(display_qty, 2),
-            "unit": display_unit,
-            "cost": round(cost, 2)
-        })
+        if week_start <= day_date <= week_end:
+            for key in NUTRIENTS:
+                week_totals[person_name][key] += values[key]
     
-    # Sort by ingredient name
-    shopping_list.sort(key=lambda x: x["ingredient"])
+    # Daily costs are rounded before summing, as calculate_weekly_cost does
+    week_cost = sum(
+        round(cost, 2) for day_date, cost in day_cost.items()
+        if week_start <= day_date <= week_end
+    )
     
-    return shopping_list
+    return {
+        "today_cost": round(day_cost.get(today, 0.0), 2),
+        "today_totals": today_totals,
+        "week_cost": round(week_cost, 2),
+        "week_totals": dict(week_totals),
+    }
 
 
 # ============================================================================
 # COMPLETE WEEK SUMMARY
 # ============================================================================
 
-def calculate_week_summary(db: Session, week_start: date = None) -> Dict:
+def calculate_week_summary(db: Session, week_start: date = None, today: date = None) -> Dict:
     """
     Calculate complete summary for HA to read.
     Includes today totals, week totals, shopping lists, costs.
@@ -300,24 +428,39 @@ def calculate_week_summary(db: Session, week_start: date = None) -> Dict:
     if week_start is None:
         week_start = get_week_start()
     
-    today = date.today()
+    if today is None:
+        today = date.today()
     
-    # Daily totals for today
-    today_totals_raw = calculate_daily_totals(db, today)
-    today_totals = [
-        {
-            "person": person,
-            "kcal": round(vals["kcal"], 0),
-            "protein": round(vals["protein"], 1),
-            "carbs": round(vals["carbs"], 1),
-            "fat": round(vals["fat"], 1)
-        }
-        for person, vals in today_totals_raw.items()
+    week_end = week_start + timedelta(days=6)
+    
+    # Nutrition and cost: range scan over the materialized daily totals
+    person_map = {pid: name for pid, name in db.query(Person.id, Person.name).all()}
+    day_rows = [
+        (row.date, row.person_id, {key: getattr(row, key) for key in aggregates.TOTAL_COLUMNS})
+        for row in aggregates.load_daily_totals(db, week_start, week_end, [today])
     ]
+    week = summarize_day_totals(person_map, day_rows, week_start, today)
     
-    # Weekly totals
-    week_totals_raw = calculate_weekly_totals(db, week_start)
-    week_totals = [
+    # Shopping lists: one join over the week's planned portions
+    shopping = generate_week_shopping_lists(db, week_start)
+    
+    return {
+        "today_cost": week["today_cost"],
+        "today_totals": format_person_totals(week["today_totals"]),
+        "week_cost": week["week_cost"],
+        "week_totals": format_person_totals(week["week_totals"]),
+        "wed_shopping": shopping["wed"],
+        "sun_shopping": shopping["sun"],
+        "wed_spend": shopping["wed_spend"],
+        "sun_spend": shopping["sun_spend"],
+        "week_start": week_start.isoformat(),
+        "last_updated": today.isoformat()
+    }
+
+
+def format_person_totals(totals: Dict[str, Dict[str, float]]) -> List[Dict]:
+    """Round per-person nutrition totals for the API response"""
+    return [
         {
             "person": person,
             "kcal": round(vals["kcal"], 0),
@@ -325,24 +468,139 @@ def calculate_week_summary(db: Session, week_start: date = None) -> Dict:
             "carbs": round(vals["carbs"], 1),
             "fat": round(vals["fat"], 1)
         }
-        for person, vals in week_totals_raw.items()
+        for person, vals in totals.items()
     ]
+
+
+# ============================================================================
+# RANGE SUMMARIES (Arbitrary date ranges grouped by day/week/month)
+# ============================================================================
+
+SUMMARY_GROUPS = ("day", "week", "month")
+
+
+def period_key(column, group: str):
+    """SQL expression naming the period a date falls in"""
+    if group == "day":
+        return func.strftime("%Y-%m-%d", column)
+    if group == "week":
+        # Monday of the week ("weekday 0" moves forward to Sunday)
+        return func.date(column, "weekday 0", "-6 days")
+    if group == "month":
+        return func.strftime("%Y-%m", column)
+    raise ValueError(f"Unknown group '{group}'")
+
+
+def calculate_range_summary(
+    db: Session,
+    start: date,
+    end: date,
+    group: str = "week",
+    include_shopping: bool = True
+) -> Dict:
+    """
+    Per-person nutrition, cost and shopping totals for start..end inclusive,
+    grouped into periods.
     
-    # Costs
-    today_cost = calculate_daily_cost(db, today)
-    week_cost = calculate_weekly_cost(db, week_start)
+    Nutrition/cost is one GROUP BY over daily_person_totals; shopping is one
+    GROUP BY over the planned portions. Query count doesn't depend on range.
+    """
+    person_map = {pid: name for pid, name in db.query(Person.id, Person.name).all()}
+    
+    # 1. Nutrition and cost per (period, person)
+    period = period_key(DailyPersonTotals.date, group)
+    total_rows = db.query(
+        period,
+        DailyPersonTotals.person_id,
+        *[func.sum(getattr(DailyPersonTotals, key)) for key in aggregates.TOTAL_COLUMNS]
+    ).filter(
+        DailyPersonTotals.date.between(start, end)
+    ).group_by(period, DailyPersonTotals.person_id).order_by(period, DailyPersonTotals.person_id).all()
+    
+    periods = {}
+    
+    def get_period(key):
+        if key not in periods:
+            periods[key] = {"period": key, "cost": 0.0, "totals": [], "shopping": []}
+        return periods[key]
+    
+    for key, person_id, kcal, protein, carbs, fat, cost in total_rows:
+        entry = get_period(key)
+        entry["cost"] += cost or 0.0
+        
+        person_name = person_map.get(person_id)
+        if not person_name:
+            continue
+        
+        entry["totals"].append({
+            "person": person_name,
+            "kcal": round(kcal or 0.0, 0),
+            "protein": round(protein or 0.0, 1),
+            "carbs": round(carbs or 0.0, 1),
+            "fat": round(fat or 0.0, 1),
+            "cost": round(cost or 0.0, 2)
+        })
+    
+    # 2. Shopping quantities per (period, ingredient)
+    if include_shopping:
+        period = period_key(WeekPlan.date, group)
+        shopping_rows = db.query(
+            period,
+            RecipePortion.ingredient_id,
+            func.sum(RecipePortion.quantity)
+        ).join(
+            RecipePortion,
+            and_(
+                RecipePortion.recipe_id == WeekPlan.recipe_id,
+                RecipePortion.person_id == WeekPlan.person_id
+            )
+        ).filter(
+            WeekPlan.date.between(start, end)
+        ).group_by(period, RecipePortion.ingredient_id).all()
+        
+        ingredient_ids = {row[1] for row in shopping_rows}
+        ingredients = {
+            ingredient.id: ingredient
+            for ingredient in db.query(Ingredient).filter(Ingredient.id.in_(ingredient_ids)).all()
+        } if ingredient_ids else {}
+        
+        shopping_rows = [row for row in shopping_rows if row[1] in ingredients]
+        
+        # Each period buys whole packs on its own (nothing carried between periods)
+        packs = optimize_packs(
+            [ingredients[ingredient_id] for _, ingredient_id, _ in shopping_rows],
+            [qty for _, _, qty in shopping_rows],
+            [0.0] * len(shopping_rows)
+        )["wed"]
+        
+        for (key, ingredient_id, qty), pack in zip(shopping_rows, packs):
+            get_period(key)["shopping"].append(shopping_item(ingredients[ingredient_id], qty, pack))
+        
+        for entry in periods.values():
+            entry["shopping"].sort(key=lambda x: x["ingredient"])
     
-    # Shopping lists
-    wed_shopping = generate_shopping_list(db, week_start, "wed")
-    sun_shopping = generate_shopping_list(db, week_start, "sun")
+    result = [periods[key] for key in sorted(periods)]
+    for entry in result:
+        entry["cost"] = round(entry["cost"], 2)
     
     return {
-        "today_cost": today_cost,
-        "today_totals": today_totals,
-        "week_cost": week_cost,
-        "week_totals": week_totals,
-        "wed_shopping": wed_shopping,
-        "sun_shopping": sun_shopping,
-        "week_start": week_start.isoformat(),
-        "last_updated": date.today().isoformat()
-    }
\ No newline at end of file
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "group": group,
+        "total_cost": round(sum(entry["cost"] for entry in result), 2),
+        "periods": result
+    }
+
+
+# ============================================================================
+# ASYNC VARIANTS (For async routes - db is whatever database.get_session yields)
+# ============================================================================
+
+async def calculate_week_summary_async(db, week_start: date = None, today: date = None) -> Dict:
+    """calculate_week_summary without blocking the event loop"""
+    return await database.run_db(db, calculate_week_summary, week_start, today)
+
+
+async def calculate_range_summary_async(db, start: date, end: date, group: str = "week", include_shopping: bool = True) -> Dict:
+    """calculate_range_summary without blocking the event loop"""
+    return await database.run_db(db, calculate_range_summary, start, end, group, include_shopping)
@@ -3,21 +3,336 @@ Database setup and connection for the meal planner.
 Uses SQLite for simplicity - just a single file database.
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, Date, Boolean
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, ForeignKey, Date, Boolean, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import Session, sessionmaker, relationship
+from starlette.concurrency import run_in_threadpool
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from typing import Dict, List
 import os
+import re
+import threading
+
+import metrics
+import units
 
 # SQLite database file location
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "mealplanner.db")
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
+
+# ============================================================================
+# ENGINE PROFILES
+# ============================================================================
+# Pick with MEAL_PLANNER_DB_PROFILE (default "tuned"). "tuned" uses WAL so
+# HA's polls keep reading while a bulk update writes, and waits on a busy
+# lock instead of failing with "database is locked".
+
+ENGINE_PROFILES = {
+    "tuned": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",       # Safe with WAL; fsync only at checkpoints
+            "busy_timeout": 5000,          # ms to wait for a lock before erroring
+            "mmap_size": 64 * 1024 * 1024,
+            "cache_size": -16000,          # Negative = KiB, so ~16 MB per connection
+            "temp_store": "MEMORY",
+        },
+        # Enough for FastAPI's threadpool; WAL readers don't block each other
+        "pool": {
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 30,
+        },
+    },
+    # Plain SQLite/SQLAlchemy defaults (rollback journal, default pool)
+    "legacy": {
+        "pragmas": {},
+        "pool": {},
+    },
+}
+
+DB_PROFILE = os.environ.get("MEAL_PLANNER_DB_PROFILE", "tuned")
+
+# "sync" (default): routes use Session in FastAPI's threadpool
+# "async": hot routes use AsyncSession over aiosqlite (see get_session/run_db)
+DB_MODE = os.environ.get("MEAL_PLANNER_DB_MODE", "sync")
+
+
+def _apply_pragmas(sync_engine, pragmas: dict):
+    """Set the profile's PRAGMAs on every new connection"""
+    if not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def create_db_engine(db_path: str, profile: str = None, pool: dict = None):
+    """Create a SQLite engine for db_path using an engine profile (pool overrides its pool settings)"""
+    settings = ENGINE_PROFILES[profile or DB_PROFILE]
+
+    db_engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False},
+        **(settings["pool"] if pool is None else pool)
+    )
+    _apply_pragmas(db_engine, settings["pragmas"])
+
+    return db_engine
+
+
+def create_async_db_engine(db_path: str, profile: str = None, pool: dict = None):
+    """Create an aiosqlite-backed AsyncEngine for db_path using an engine profile"""
+    # Only needed in async mode, so aiosqlite is imported lazily
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    settings = ENGINE_PROFILES[profile or DB_PROFILE]
+
+    db_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}", **(settings["pool"] if pool is None else pool)
+    )
+    _apply_pragmas(db_engine.sync_engine, settings["pragmas"])
+
+    return db_engine
+
+
 # Create engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_db_engine(DB_PATH)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine/session factory - only created in async mode
+async_engine = None
+AsyncSessionLocal = None
+
+
+def _init_async(profile: str = None):
+    global async_engine, AsyncSessionLocal
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_db_engine(DB_PATH, profile)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+if DB_MODE == "async":
+    _init_async()
+
+
+def use_database(db_path: str, profile: str = None, mode: str = None):
+    """
+    Point the app at a different database file (benchmarks, tooling).
+    Call before init_db() / importing main.
+    """
+    global DB_PATH, DATABASE_URL, DB_MODE, engine
+
+    engine.dispose()
+
+    DB_PATH = db_path
+    DATABASE_URL = f"sqlite:///{DB_PATH}"
+    DB_MODE = mode or DB_MODE
+    engine = create_db_engine(DB_PATH, profile)
+    SessionLocal.configure(bind=engine)
+
+    if DB_MODE == "async":
+        _init_async(profile)
+
+
+# ============================================================================
+# HOUSEHOLDS (One database file per household)
+# ============================================================================
+# The "default" household is DB_PATH above (what HA has always used, via
+# the unprefixed routes). Others live in HOUSEHOLDS_DIR/<id>.db and are
+# reached through /households/<id>/... (see households.py). Every session
+# and cache lookup follows the household of the current request.
+
+DEFAULT_HOUSEHOLD = "default"
+
+HOUSEHOLDS_DIR = os.environ.get(
+    "MEAL_PLANNER_HOUSEHOLDS_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "data", "households")
+)
+
+# Lowercase, so ids map 1:1 to file names on any filesystem
+HOUSEHOLD_ID_PATTERN = r"^[a-z0-9][a-z0-9_-]{0,62}$"
+
+# Engines kept open; the least recently used household's is disposed beyond this
+MAX_OPEN_HOUSEHOLDS = int(os.environ.get("MEAL_PLANNER_MAX_OPEN_HOUSEHOLDS", "32"))
+
+# Per household: households.py admits at most pool_size + max_overflow
+# requests at once, so no threadpool thread ever waits on a checkout
+HOUSEHOLD_POOL = {
+    "pool_size": 4,
+    "max_overflow": 12,
+    "pool_timeout": 30,
+}
+
+_household: ContextVar[str] = ContextVar("meal_planner_household", default=DEFAULT_HOUSEHOLD)
+
+# Guards _households and _opening only; never held while a database is opened
+_households_lock = threading.Lock()
+
+# {household id: HouseholdDatabase}, least recently used first
+_households: "OrderedDict[str, HouseholdDatabase]" = OrderedDict()
+
+# {household id: lock held while that household's database is being opened}
+_opening: Dict[str, threading.Lock] = {}
+
+
+class HouseholdDatabase:
+    """Engine and session factories for one household's database file"""
+
+    def __init__(self, household_id: str):
+        self.household_id = household_id
+        self.db_path = household_path(household_id)
+        self.engine = create_db_engine(self.db_path, pool=HOUSEHOLD_POOL)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+
+        if DB_MODE == "async":
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+
+            self.async_engine = create_async_db_engine(self.db_path, pool=HOUSEHOLD_POOL)
+            self.AsyncSessionLocal = async_sessionmaker(
+                self.async_engine, autoflush=False, expire_on_commit=False
+            )
+
+    def dispose(self):
+        self.engine.dispose()
+        if self.async_engine is not None:
+            # aiosqlite connections can't be closed outside the event loop;
+            # the old pool is dropped and its connections close when collected
+            self.async_engine.sync_engine.dispose(close=False)
+
+
+def is_valid_household_id(household_id: str) -> bool:
+    return re.fullmatch(HOUSEHOLD_ID_PATTERN, household_id) is not None
+
+
+def household_path(household_id: str) -> str:
+    """Database file of a household"""
+    if household_id == DEFAULT_HOUSEHOLD:
+        return DB_PATH
+    return os.path.join(HOUSEHOLDS_DIR, f"{household_id}.db")
+
+
+def household_exists(household_id: str) -> bool:
+    if household_id == DEFAULT_HOUSEHOLD or household_id in _households:
+        return True
+    return is_valid_household_id(household_id) and os.path.exists(household_path(household_id))
+
+
+def list_households() -> List[str]:
+    """Ids of all households, default first"""
+    names = []
+    if os.path.isdir(HOUSEHOLDS_DIR):
+        names = sorted(
+            name[:-3] for name in os.listdir(HOUSEHOLDS_DIR)
+            if name.endswith(".db") and is_valid_household_id(name[:-3])
+        )
+    return [DEFAULT_HOUSEHOLD] + [name for name in names if name != DEFAULT_HOUSEHOLD]
+
+
+def current_household() -> str:
+    """Household of the current request (or use_household block)"""
+    return _household.get()
+
+
+@contextmanager
+def use_household(household_id: str):
+    """Route sessions, caches and change events in this block to a household"""
+    token = _household.set(household_id)
+    try:
+        yield
+    finally:
+        _household.reset(token)
+
+
+def _household_database(household_id: str) -> HouseholdDatabase:
+    """Cached engines of a non-default household, opened (and migrated) on first use"""
+    with _households_lock:
+        household = _households.get(household_id)
+        if household is not None:
+            _households.move_to_end(household_id)
+            return household
+        opening = _opening.setdefault(household_id, threading.Lock())
+
+    # Schema and migrations (which may rebuild aggregates) run under this
+    # household's own lock, so a slow open never holds up other households
+    with opening:
+        with _households_lock:
+            household = _households.get(household_id)
+            if household is not None:
+                _households.move_to_end(household_id)
+                return household
+
+        try:
+            household = HouseholdDatabase(household_id)
+            try:
+                Base.metadata.create_all(bind=household.engine)
+                run_migrations(household.engine)
+            except BaseException:
+                household.dispose()
+                raise
+
+            evicted = []
+            with _households_lock:
+                _households[household_id] = household
+                while len(_households) > MAX_OPEN_HOUSEHOLDS:
+                    evicted.append(_households.popitem(last=False)[1])
+        finally:
+            with _households_lock:
+                _opening.pop(household_id, None)
+
+    for stale in evicted:
+        stale.dispose()
+
+    return household
+
+
+def close_households():
+    """Dispose every open household engine (shutdown, benchmarks)"""
+    with _households_lock:
+        while _households:
+            _, household = _households.popitem()
+            household.dispose()
+
+
+def current_engine():
+    """Engine of the current household"""
+    household_id = _household.get()
+    if household_id == DEFAULT_HOUSEHOLD:
+        return engine
+    return _household_database(household_id).engine
+
+
+def session_factory():
+    """sessionmaker of the current household"""
+    household_id = _household.get()
+    if household_id == DEFAULT_HOUSEHOLD:
+        return SessionLocal
+    return _household_database(household_id).SessionLocal
+
+
+def async_session_factory():
+    """async_sessionmaker of the current household (async mode only)"""
+    household_id = _household.get()
+    if household_id == DEFAULT_HOUSEHOLD:
+        return AsyncSessionLocal
+    return _household_database(household_id).AsyncSessionLocal
+
+
 # Base class for models
 Base = declarative_base()
 
@@ -40,7 +355,7 @@ class Ingredient(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
-    unit = Column(String, nullable=False)  # "g", "ml", "item"
+    unit = Column(String, nullable=False)  # Base unit: "g", "ml", "item" (see units.py)
     
     # Cost per unit (e.g., £0.006 per gram)
     cost_per_unit = Column(Float, default=0.0)
@@ -56,6 +371,23 @@ class Ingredient(Base):
     pack_cost = Column(Float, nullable=True)  # e.g., £3.00
 
 
+class IngredientPrice(Base):
+    """
+    Append-only price history: cost_per_unit applies from effective_from
+    until the ingredient's next row. Ingredient.cost_per_unit is today's.
+    """
+    __tablename__ = "ingredient_prices"
+    __table_args__ = (
+        # As-of lookups: latest effective_from <= day for an ingredient
+        Index("uq_ingredient_prices_as_of", "ingredient_id", "effective_from", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), nullable=False)
+    effective_from = Column(Date, nullable=False)
+    cost_per_unit = Column(Float, nullable=False)
+
+
 class Recipe(Base):
     """Recipes/meals (Japanese Chicken, Steak, etc.)"""
     __tablename__ = "recipes"
@@ -71,6 +403,10 @@ class Recipe(Base):
 class RecipePortion(Base):
     """Per-person ingredient quantities for each recipe"""
     __tablename__ = "recipe_portions"
+    __table_args__ = (
+        Index("ix_recipe_portions_recipe_person", "recipe_id", "person_id"),
+        Index("ix_recipe_portions_ingredient", "ingredient_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
@@ -89,6 +425,11 @@ class RecipePortion(Base):
 class WeekPlan(Base):
     """Weekly meal plan - which meals are scheduled when"""
     __tablename__ = "week_plan"
+    __table_args__ = (
+        # One row per slot; also serves date-range scans (leading column)
+        Index("uq_week_plan_slot", "date", "person_id", "meal_type", unique=True),
+        Index("ix_week_plan_recipe", "recipe_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False)
@@ -117,6 +458,9 @@ class Snack(Base):
 class SnackLog(Base):
     """Daily snack consumption tracking"""
     __tablename__ = "snack_log"
+    __table_args__ = (
+        Index("uq_snack_log_entry", "date", "person_id", "snack_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False)
@@ -129,47 +473,252 @@ class SnackLog(Base):
     snack = relationship("Snack")
 
 
+# ============================================================================
+# MATERIALIZED AGGREGATES (Maintained by aggregates.py - never edit directly)
+# ============================================================================
+
+class RecipeVector(Base):
+    """Per-person nutrition and cost of one serving of a recipe"""
+    __tablename__ = "recipe_vectors"
+    __table_args__ = (
+        UniqueConstraint("recipe_id", "person_id", name="uq_recipe_vectors_recipe_person"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
+    person_id = Column(Integer, ForeignKey("people.id"), nullable=False)
+    
+    kcal = Column(Float, default=0.0)
+    protein = Column(Float, default=0.0)
+    carbs = Column(Float, default=0.0)
+    fat = Column(Float, default=0.0)
+    cost = Column(Float, default=0.0)
+
+
+class DailyPersonTotals(Base):
+    """Nutrition and cost per person per day (meals + consumed snacks)"""
+    __tablename__ = "daily_person_totals"
+    __table_args__ = (
+        UniqueConstraint("date", "person_id", name="uq_daily_person_totals_date_person"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, nullable=False)
+    person_id = Column(Integer, ForeignKey("people.id"), nullable=False)
+    
+    kcal = Column(Float, default=0.0)
+    protein = Column(Float, default=0.0)
+    carbs = Column(Float, default=0.0)
+    fat = Column(Float, default=0.0)
+    cost = Column(Float, default=0.0)
+
+
 # ============================================================================
 # DATABASE INITIALIZATION
 # ============================================================================
 
 def init_db():
-    """Create all tables"""
+    """Create all tables, then bring older database files up to date"""
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     print(f"✅ Database initialized at: {DB_PATH}")
 
 
+def create_household(household_id: str, people: List[str]) -> bool:
+    """
+    Create a household's database file and add its people.
+    Returns False if the household already exists.
+    """
+    os.makedirs(HOUSEHOLDS_DIR, exist_ok=True)
+
+    try:
+        # Claims the id; a concurrent create of the same id fails here
+        open(household_path(household_id), "x").close()
+    except FileExistsError:
+        return False
+
+    with use_household(household_id):
+        seed_initial_data(people)
+
+    print(f"✅ Household created: {household_id}")
+    return True
+
+
 def get_db():
     """
     Dependency for FastAPI routes.
-    Creates a database session, yields it, then closes it.
+    Creates a database session for the request's household, yields it, then closes it.
     """
-    db = SessionLocal()
+    db = session_factory()()
     try:
         yield db
     finally:
         db.close()
 
 
+async def get_session():
+    """
+    Dependency for async routes that work in either DB_MODE.
+    Yields an AsyncSession in async mode, a regular Session otherwise;
+    pass it to run_db() rather than querying it directly.
+    """
+    if DB_MODE == "async":
+        async with async_session_factory()() as db:
+            yield db
+    else:
+        db = session_factory()()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def run_db(db, fn, *args):
+    """
+    Run sync ORM code fn(session, *args) from an async route without
+    blocking the event loop: via AsyncSession.run_sync in async mode,
+    or in the threadpool with a regular Session.
+    """
+    if DB_MODE == "async":
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(metrics.profiled(fn), db, *args)
+
+
+# ============================================================================
+# SCHEMA MIGRATIONS (Version tracked in SQLite's PRAGMA user_version)
+# ============================================================================
+# effective_from of an ingredient's first price, so it covers all history
+PRICE_HISTORY_START = date(1970, 1, 1)
+
+# create_all() only adds missing tables, so anything that changes an existing
+# table is a numbered migration here. Migrations must be idempotent - fresh
+# databases run them too, right after create_all() built the current schema.
+
+def _create_indexes(conn, table, names):
+    """Create the named indexes declared on a model's table if missing"""
+    for index in table.indexes:
+        if index.name in names:
+            index.create(conn, checkfirst=True)
+
+
+def _migrate_hot_path_indexes(conn):
+    # Collapse duplicate slots so the unique indexes can be built. Keep the
+    # lowest id - the row find-or-create lookups have been updating.
+    conn.exec_driver_sql(
+        "DELETE FROM week_plan WHERE id NOT IN "
+        "(SELECT MIN(id) FROM week_plan GROUP BY date, person_id, meal_type)"
+    )
+    conn.exec_driver_sql(
+        "DELETE FROM snack_log WHERE id NOT IN "
+        "(SELECT MIN(id) FROM snack_log GROUP BY date, person_id, snack_id)"
+    )
+
+    # Duplicates were double-counted in the materialized totals; migration 4
+    # (which runs after this on any database this one touches) rebuilds them
+
+    _create_indexes(conn, WeekPlan.__table__, {"uq_week_plan_slot", "ix_week_plan_recipe"})
+    _create_indexes(conn, SnackLog.__table__, {"uq_snack_log_entry"})
+    _create_indexes(conn, RecipePortion.__table__, {
+        "ix_recipe_portions_recipe_person", "ix_recipe_portions_ingredient"
+    })
+
+
+def _migrate_price_history(conn):
+    # Every ingredient's current price has always applied until now
+    conn.exec_driver_sql(
+        "INSERT INTO ingredient_prices (ingredient_id, effective_from, cost_per_unit) "
+        "SELECT id, ?, COALESCE(cost_per_unit, 0.0) FROM ingredients "
+        "WHERE id NOT IN (SELECT ingredient_id FROM ingredient_prices)",
+        (PRICE_HISTORY_START.isoformat(),)
+    )
+
+
+def _migrate_base_units(conn):
+    # Ingredients in a known non-base unit ("kg", "Tbsp") move to its base
+    # unit; every quantity and per-unit value stored against them is
+    # rescaled to match, so totals and costs come out the same
+    for ingredient_id, unit in conn.exec_driver_sql("SELECT id, unit FROM ingredients").all():
+        base, factor = units.resolve(unit)
+        if unit == base:
+            continue
+
+        conn.exec_driver_sql(
+            "UPDATE ingredients SET unit = ?, "
+            + ", ".join(f"{key} = {key} / ?" for key in units.PER_UNIT_FIELDS)
+            + ", pack_size = pack_size * ? WHERE id = ?",
+            (base, *[factor] * len(units.PER_UNIT_FIELDS), factor, ingredient_id)
+        )
+        if factor == 1.0:
+            continue
+
+        conn.exec_driver_sql(
+            "UPDATE recipe_portions SET quantity = quantity * ? WHERE ingredient_id = ?", (factor, ingredient_id)
+        )
+        conn.exec_driver_sql(
+            "UPDATE snacks SET default_quantity = default_quantity * ? WHERE ingredient_id = ?", (factor, ingredient_id)
+        )
+        conn.exec_driver_sql(
+            "UPDATE ingredient_prices SET cost_per_unit = cost_per_unit / ? WHERE ingredient_id = ?", (factor, ingredient_id)
+        )
+
+
+def _migrate_aggregates(conn):
+    # Materialize recipe_vectors / daily_person_totals from the source rows
+    # once; every write keeps them current from then on
+    import aggregates  # Imported here: aggregates imports this module
+
+    db = Session(bind=conn)
+    try:
+        aggregates.rebuild_aggregates(db)
+        db.flush()
+    finally:
+        db.close()
+
+
+# (version, description, migrate(conn)) - append only, never renumber
+MIGRATIONS = [
+    (1, "week_plan/snack_log/recipe_portions indexes and unique slots", _migrate_hot_path_indexes),
+    (2, "ingredient_prices history backfilled from current prices", _migrate_price_history),
+    (3, "ingredient quantities and per-unit values in base units", _migrate_base_units),
+    (4, "recipe_vectors and daily_person_totals rebuilt from source rows", _migrate_aggregates),
+]
+
+
+def run_migrations(bind):
+    """Apply any migrations newer than the database's user_version"""
+    with bind.begin() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+        for number, description, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+
+            migrate(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+            print(f"✅ Migration {number}: {description}")
+
+
 # ============================================================================
 # SEED DATA (Optional - run once to populate initial data)
 # ============================================================================
 
-def seed_initial_data():
-    """Add basic people to get started"""
-    db = SessionLocal()
+# People of the default household
+DEFAULT_PEOPLE = ["Michael", "Lorna", "Izzy"]
+
+
+def seed_initial_data(people: List[str] = None):
+    """Add basic people to get started (the current household's, default DEFAULT_PEOPLE)"""
+    if people is None:
+        people = DEFAULT_PEOPLE
+
+    db = session_factory()()
     
     try:
         # Add people if they don't exist
-        if db.query(Person).count() == 0:
-            people = [
-                Person(name="Michael"),
-                Person(name="Lorna"),
-                Person(name="Izzy")
-            ]
-            db.add_all(people)
+        if people and db.query(Person).count() == 0:
+            db.add_all([Person(name=name) for name in people])
             db.commit()
-            print("✅ Added people: Michael, Lorna, Izzy")
+            print(f"✅ Added people: {', '.join(people)}")
         
         print("✅ Database seeded")
         
@@ -0,0 +1,236 @@
+"""
+Change notifications for Home Assistant.
+- GET /events streams server-sent events; MEAL_PLANNER_WEBHOOK_URL also
+  gets each event POSTed (e.g. an HA webhook trigger)
+- Whenever precompute.py refreshes a household's summaries (debounced
+  after writes, and at midnight) a compact diff against the previous
+  summary is pushed
+- Each household has its own stream (/households/<id>/events), snapshot
+  and version sequence
+
+Client contract (each event's id is the data version, data is JSON):
+    hello   {"version", "week_start"}                  on connect
+    change  {"version", "week_start", "days", "people", "shopping", "totals"}
+            days: changed person-days of the current week (new totals)
+            people: changed week totals per person
+            shopping: {"wed"/"sun": {"changed": [items], "removed": [names]}}
+            totals: changed today_cost / week_cost / wed_spend / sun_spend
+    reset   {"version", "week_start"}                  refetch /week-totals
+            (new week or day, or this client fell behind)
+A ": keepalive" comment is sent every KEEPALIVE_SECONDS. Events are missed
+while disconnected, so refetch /week-totals on reconnect and keep polling
+it at a long fallback interval. Webhook payloads are {"event", "household",
+...data}, one POST per household that changed.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import AsyncIterator, Dict, Optional, Set
+import asyncio
+import json
+import os
+import urllib.request
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import Person
+import aggregates
+import cache
+import calculations
+import database
+
+KEEPALIVE_SECONDS = 15.0
+
+# Reconnect delay suggested to SSE clients
+RETRY_MS = 5000
+
+# Events buffered per client before it's sent a reset instead
+QUEUE_SIZE = 32
+
+WEBHOOK_URL = os.environ.get("MEAL_PLANNER_WEBHOOK_URL")
+WEBHOOK_TIMEOUT = 5
+
+# {household id: {"lock", "subscribers", "snapshot"}}
+#   snapshot: last published state {"version", "week_start", "today", "summary", "days"}
+_channels: Dict[str, Dict] = {}
+
+
+def _channel() -> Dict:
+    """Subscribers and last snapshot of the current household"""
+    household_id = database.current_household()
+    channel = _channels.get(household_id)
+    if channel is None:
+        channel = _channels[household_id] = {"lock": asyncio.Lock(), "subscribers": set(), "snapshot": None}
+    return channel
+
+
+# ============================================================================
+# SNAPSHOTS AND DIFFS
+# ============================================================================
+
+def take_snapshot(db: Session, week_start: date, today: date, summary: Optional[Dict] = None) -> Dict:
+    """Week summary (computed unless given) plus per-person-day totals, keyed for diffing"""
+    if summary is None:
+        summary = calculations.calculate_week_summary(db, week_start, today)
+    person_map = dict(db.query(Person.id, Person.name).all())
+
+    days = {}
+    for row in aggregates.load_daily_totals(db, week_start, week_start + timedelta(days=6)):
+        person_name = person_map.get(row.person_id)
+        if person_name:
+            days[(row.date.isoformat(), person_name)] = {
+                key: round(getattr(row, key) or 0.0, 2) for key in aggregates.TOTAL_COLUMNS
+            }
+
+    return {"summary": summary, "days": days}
+
+
+def diff_snapshots(old: Dict, new: Dict) -> Dict:
+    """What changed between two snapshots of the same week"""
+    zero = dict.fromkeys(aggregates.TOTAL_COLUMNS, 0.0)
+
+    days = []
+    for day_date, person in sorted(set(old["days"]) | set(new["days"])):
+        values = new["days"].get((day_date, person), zero)
+        if old["days"].get((day_date, person), zero) != values:
+            days.append({"date": day_date, "person": person, **values})
+
+    before, after = old["summary"], new["summary"]
+    people = [row for row in after["week_totals"] if row not in before["week_totals"]]
+
+    shopping = {}
+    for batch in ("wed", "sun"):
+        old_items = {item["ingredient"]: item for item in before[f"{batch}_shopping"]}
+        new_items = {item["ingredient"]: item for item in after[f"{batch}_shopping"]}
+        changed = [item for name, item in new_items.items() if old_items.get(name) != item]
+        removed = sorted(set(old_items) - set(new_items))
+        if changed or removed:
+            shopping[batch] = {"changed": changed, "removed": removed}
+
+    totals = {
+        key: after[key]
+        for key in ("today_cost", "week_cost", "wed_spend", "sun_spend")
+        if before[key] != after[key]
+    }
+
+    return {"days": days, "people": people, "shopping": shopping, "totals": totals}
+
+
+async def _take_snapshot() -> Dict:
+    version = cache.get_data_version()
+    week_start = calculations.get_week_start()
+    today = date.today()
+
+    # Normally precompute.py has just stored it
+    summary = cache.get_week_totals(week_start, today, version)
+
+    async with asynccontextmanager(database.get_session)() as db:
+        snapshot = await database.run_db(db, take_snapshot, week_start, today, summary)
+
+    if summary is None:
+        cache.store_week_totals(week_start, today, version, snapshot["summary"])
+    snapshot.update(version=version, week_start=week_start, today=today)
+    return snapshot
+
+
+# ============================================================================
+# PUBLISHING
+# ============================================================================
+
+def format_event(name: str, data: Dict) -> str:
+    """One server-sent event"""
+    payload = json.dumps(data, default=str, separators=(",", ":"))
+    return f"id: {data['version']}\nevent: {name}\ndata: {payload}\n\n"
+
+
+def _header(snapshot: Dict) -> Dict:
+    return {"version": snapshot["version"], "week_start": snapshot["week_start"].isoformat()}
+
+
+def _broadcast(subscribers: Set[asyncio.Queue], name: str, data: Dict):
+    message = format_event(name, data)
+
+    for queue in list(subscribers):
+        if queue.full():
+            # Too far behind for diffs to add up; make it refetch
+            while not queue.empty():
+                queue.get_nowait()
+            message_for_queue = format_event("reset", {"version": data["version"], "week_start": data["week_start"]})
+        else:
+            message_for_queue = message
+        queue.put_nowait(message_for_queue)
+
+
+def _post_webhook(name: str, data: Dict):
+    request = urllib.request.Request(
+        WEBHOOK_URL,
+        data=json.dumps({"event": name, "household": database.current_household(), **data}, default=str).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=WEBHOOK_TIMEOUT):
+        pass
+
+
+async def publish_changes():
+    """Snapshot the current household's week and push what changed since its last snapshot"""
+    channel = _channel()
+    if not channel["subscribers"] and not WEBHOOK_URL:
+        # Nobody listening; the next subscriber takes a fresh snapshot
+        channel["snapshot"] = None
+        return
+
+    async with channel["lock"]:
+        old = channel["snapshot"]
+        new = channel["snapshot"] = await _take_snapshot()
+
+    if old is None or old["week_start"] != new["week_start"] or old["today"] != new["today"]:
+        name, data = "reset", _header(new)
+    else:
+        diff = diff_snapshots(old, new)
+        if not any(diff.values()):
+            # The write didn't touch the current week
+            return
+        name, data = "change", {**_header(new), **diff}
+
+    _broadcast(channel["subscribers"], name, data)
+
+    if WEBHOOK_URL:
+        try:
+            await run_in_threadpool(_post_webhook, name, data)
+        except OSError as e:
+            print(f"⚠️  Change webhook failed: {e}")
+
+
+# ============================================================================
+# LIFECYCLE AND STREAM
+# ============================================================================
+
+def reset():
+    """Forget subscribers and snapshots (on startup; their locks belong to the old event loop)"""
+    _channels.clear()
+
+
+async def stream() -> AsyncIterator[str]:
+    """Server-sent events for one client of the current household (see the contract above)"""
+    channel = _channel()
+    queue = asyncio.Queue(QUEUE_SIZE)
+    channel["subscribers"].add(queue)
+
+    try:
+        # Baseline, so the first change after connecting is a diff
+        async with channel["lock"]:
+            if channel["snapshot"] is None:
+                channel["snapshot"] = await _take_snapshot()
+            hello = _header(channel["snapshot"])
+
+        yield f"retry: {RETRY_MS}\n" + format_event("hello", hello)
+
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+    finally:
+        channel["subscribers"].discard(queue)
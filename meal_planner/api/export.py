@@ -0,0 +1,154 @@
+"""
+Streaming exports of meal planner history.
+- NDJSON or CSV, written batch by batch from a streamed cursor
+- Memory stays flat however many years of history are exported
+- Resumable: rows come out in key order, so pass the last row's key back -
+  after_id, plus after_portion_id for recipes (one row per portion)
+"""
+
+from datetime import date
+from typing import Dict, Iterator, List
+import csv
+import io
+import json
+
+from sqlalchemy import and_, or_, select
+
+import database
+from database import WeekPlan, SnackLog, Ingredient, Recipe, RecipePortion
+
+# Rows fetched from the cursor (and written to the response) per batch
+BATCH_SIZE = 500
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _columns(model, names: List[str]):
+    return [getattr(model, name).label(name) for name in names]
+
+
+# Each export: the SELECT, the id column used for ordering/resuming, the
+# date column for range filters (None if the table isn't dated) and, for
+# tables with several rows per id, the column ordering/resuming within one id
+EXPORT_TABLES = {
+    "week_plan": {
+        "select": lambda: select(*_columns(WeekPlan, ["id", "date", "person_id", "meal_type", "recipe_id"])),
+        "id_column": WeekPlan.id,
+        "date_column": WeekPlan.date,
+    },
+    "snack_log": {
+        "select": lambda: select(*_columns(SnackLog, ["id", "date", "person_id", "snack_id", "consumed"])),
+        "id_column": SnackLog.id,
+        "date_column": SnackLog.date,
+    },
+    "ingredients": {
+        "select": lambda: select(*_columns(Ingredient, [
+            "id", "name", "unit", "cost_per_unit", "kcal_per_unit", "protein_per_unit",
+            "carbs_per_unit", "fat_per_unit", "pack_size", "pack_cost"
+        ])),
+        "id_column": Ingredient.id,
+        "date_column": None,
+    },
+    # One row per portion (recipes without portions get one row of nulls)
+    "recipes": {
+        "select": lambda: select(
+            Recipe.id.label("id"),
+            Recipe.name.label("name"),
+            Recipe.meal_type.label("meal_type"),
+            RecipePortion.id.label("portion_id"),
+            RecipePortion.ingredient_id.label("ingredient_id"),
+            RecipePortion.person_id.label("person_id"),
+            RecipePortion.quantity.label("quantity")
+        ).outerjoin(RecipePortion, RecipePortion.recipe_id == Recipe.id),
+        "id_column": Recipe.id,
+        "date_column": None,
+        "then_by": RecipePortion.id,
+    },
+}
+
+
+def is_dated(table: str) -> bool:
+    """Whether start/end filters apply to this export"""
+    return EXPORT_TABLES[table]["date_column"] is not None
+
+
+def has_row_key(table: str) -> bool:
+    """Whether rows of this export are resumed by (id, portion id) rather than id alone"""
+    return "then_by" in EXPORT_TABLES[table]
+
+
+def _iter_rows(
+    table: str,
+    start: date = None,
+    end: date = None,
+    after_id: int = None,
+    after_portion_id: int = None
+) -> Iterator[List[Dict]]:
+    """Yield batches of row dicts from a streamed cursor, in (id, then_by) order"""
+    spec = EXPORT_TABLES[table]
+    stmt = spec["select"]()
+
+    # Rows after the last one written: (id, then_by) > (after_id, after_portion_id)
+    if after_id is not None and after_portion_id is not None:
+        stmt = stmt.where(or_(
+            spec["id_column"] > after_id,
+            and_(spec["id_column"] == after_id, spec["then_by"] > after_portion_id)
+        ))
+    elif after_id is not None:
+        stmt = stmt.where(spec["id_column"] > after_id)
+    if start is not None:
+        stmt = stmt.where(spec["date_column"] >= start)
+    if end is not None:
+        stmt = stmt.where(spec["date_column"] <= end)
+
+    # Key order so a resumed export continues exactly where it stopped
+    order = [spec["id_column"]]
+    if "then_by" in spec:
+        order.append(spec["then_by"])
+    stmt = stmt.order_by(*order)
+
+    with database.current_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=BATCH_SIZE).execute(stmt)
+        for partition in result.mappings().partitions(BATCH_SIZE):
+            yield [dict(row) for row in partition]
+
+
+def _json_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def stream_export(
+    table: str,
+    fmt: str,
+    start: date = None,
+    end: date = None,
+    after_id: int = None,
+    after_portion_id: int = None
+) -> Iterator[str]:
+    """Serialize an export as NDJSON lines or CSV (with a header row)"""
+    if fmt == "ndjson":
+        for batch in _iter_rows(table, start, end, after_id, after_portion_id):
+            yield "".join(
+                json.dumps({key: _json_value(value) for key, value in row.items()}) + "\n"
+                for row in batch
+            )
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in EXPORT_TABLES[table]["select"]().selected_columns])
+
+    for batch in _iter_rows(table, start, end, after_id, after_portion_id):
+        writer.writerows([row.values() for row in batch])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Header only (no rows matched)
+    if buffer.tell():
+        yield buffer.getvalue()
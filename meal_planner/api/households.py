@@ -0,0 +1,117 @@
+"""
+Household routing for the meal planner API.
+- /households/<id>/<route> serves <route> from that household's database,
+  caches and change stream; unprefixed routes are the "default" household
+- Each household runs at most MAX_CONCURRENT_REQUESTS requests at once.
+  The rest wait here, without holding a threadpool thread or a pooled
+  connection, so one busy household can't starve the others.
+"""
+
+from typing import Dict
+import asyncio
+import json
+import os
+import re
+
+import database
+
+# Matches engine pools, so admitted requests never wait on a checkout
+MAX_CONCURRENT_REQUESTS = database.HOUSEHOLD_POOL["pool_size"] + database.HOUSEHOLD_POOL["max_overflow"]
+
+# Requests that may wait for a slot per household; beyond that they get a 503
+MAX_QUEUED_REQUESTS = int(os.environ.get("MEAL_PLANNER_HOUSEHOLD_QUEUE", "64"))
+
+_PREFIX = re.compile(r"^/households/([^/]+)(/.*)?$")
+
+# {household id: semaphore}
+_limits: Dict[str, asyncio.Semaphore] = {}
+
+# {household id: requests waiting for a slot}
+_waiting: Dict[str, int] = {}
+
+
+def split_path(path: str):
+    """(household id, path within the household)"""
+    match = _PREFIX.match(path)
+    if match is None:
+        return database.DEFAULT_HOUSEHOLD, path
+    return match.group(1), match.group(2) or "/"
+
+
+async def _send_error(send, status: int, detail: str, headers: Dict[str, str] = None):
+    body = json.dumps({"detail": detail}, separators=(",", ":")).encode()
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    raw_headers += [(key.encode(), value.encode()) for key, value in (headers or {}).items()]
+
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class HouseholdMiddleware:
+    """
+    ASGI middleware: strips the /households/<id> prefix, then runs the
+    request inside database.use_household(<id>) once a slot is free.
+    A slot is held until the response is complete, or only until the
+    headers for server-sent event streams (those don't end).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # The path may still carry root_path (e.g. HA Ingress)
+        root_path = scope.get("root_path", "")
+        path = scope["path"]
+        prefix = root_path if root_path and path.startswith(root_path + "/") else ""
+
+        household_id, route_path = split_path(path[len(prefix):])
+        if household_id != database.DEFAULT_HOUSEHOLD:
+            if not database.household_exists(household_id):
+                await _send_error(send, 404, f"Household '{household_id}' not found")
+                return
+            path = prefix + route_path
+            scope = dict(scope, path=path, raw_path=path.encode())
+
+        limit = _limits.get(household_id)
+        if limit is None:
+            limit = _limits.setdefault(household_id, asyncio.Semaphore(MAX_CONCURRENT_REQUESTS))
+
+        if limit.locked():
+            if _waiting.get(household_id, 0) >= MAX_QUEUED_REQUESTS:
+                await _send_error(send, 503, f"Household '{household_id}' is busy", {"Retry-After": "1"})
+                return
+
+            _waiting[household_id] = _waiting.get(household_id, 0) + 1
+            try:
+                await limit.acquire()
+            finally:
+                _waiting[household_id] -= 1
+        else:
+            await limit.acquire()
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                limit.release()
+
+        async def send_and_release(message):
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                if headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    release()
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                release()
+
+        try:
+            with database.use_household(household_id):
+                await self.app(scope, receive, send_and_release)
+        finally:
+            release()
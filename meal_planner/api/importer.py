@@ -0,0 +1,392 @@
+"""
+Bulk import of ingredients, recipes and portions.
+- NDJSON or CSV, read from the request stream and processed in chunks
+  (CSV through one csv.reader, so quoted fields may span lines)
+- Names resolve to ids through an in-memory index (no per-row lookups)
+- Each chunk is one transaction of batched executemany writes
+- Bad rows are reported individually and never block the rest
+"""
+
+from datetime import date
+from collections import deque
+from typing import AsyncIterator, Dict, List, Tuple
+import csv
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import aggregates
+import cache
+import database
+import models
+import prices
+import units
+
+# Rows validated and written per transaction
+CHUNK_SIZE = 1000
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+IMPORT_TYPES = ("ingredient", "recipe", "portion")
+
+# Index tables: {lowercase name: id}
+INDEX_MODELS = {
+    "ingredients": database.Ingredient,
+    "recipes": database.Recipe,
+    "people": database.Person,
+}
+
+
+# ============================================================================
+# READING (Request stream -> chunks of (line number, record))
+# ============================================================================
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without buffering the whole body"""
+    pending = b""
+    async for piece in stream:
+        pending += piece
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8-sig").rstrip("\r")
+
+
+class _LineFeed:
+    """Lines pushed as they arrive, pulled by a csv.reader"""
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def _iter_csv_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, List[str]]]:
+    """
+    Yield (first line number, values) for each CSV record. One csv.reader
+    reads the whole stream; it is only asked for a record once the lines
+    fed to it close every quote, so a quoted field may span lines.
+    A record the reader rejects comes out as (line number, csv.Error).
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    quotes = 0
+
+    async def drain():
+        while feed.lines:
+            first_line = reader.line_num + 1
+            try:
+                values = next(reader)
+            except csv.Error as e:
+                yield first_line, e
+                continue
+            # Blank lines
+            if len(values) > 1 or "".join(values).strip():
+                yield first_line, values
+
+    async for line in _iter_lines(stream):
+        feed.lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue  # Inside a quoted field: wait for the line that closes it
+        quotes = 0
+        async for row in drain():
+            yield row
+
+    # An unclosed quote at the end reads as the rest of the body
+    async for row in drain():
+        yield row
+
+
+async def _iter_ndjson_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Yield (line number, line) for each non-blank line"""
+    line_no = 0
+    async for line in _iter_lines(stream):
+        line_no += 1
+        if line.strip():
+            yield line_no, line
+
+
+def _parse_ndjson(line: str) -> Dict:
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("Expected a JSON object")
+    return record
+
+
+async def iter_records(stream: AsyncIterator[bytes], fmt: str, errors: List[Dict]) -> AsyncIterator[List[Tuple[int, Dict]]]:
+    """
+    Yield chunks of (line number, record dict).
+    Lines that don't parse are added to errors and left out.
+    CSV needs a header row; a "type" column says what each row is and
+    empty cells are treated as missing. A CSV record's line number is
+    the line it starts on.
+    """
+    chunk = []
+    header = None
+    rows = _iter_ndjson_lines(stream) if fmt == "ndjson" else _iter_csv_rows(stream)
+
+    async for line_no, row in rows:
+        try:
+            if fmt == "ndjson":
+                record = _parse_ndjson(row)
+            elif isinstance(row, csv.Error):
+                raise ValueError(str(row))
+            elif header is None:
+                header = [name.strip() for name in row]
+                continue
+            else:
+                if len(row) > len(header):
+                    raise ValueError(f"Expected {len(header)} columns, got {len(row)}")
+                record = {key: value for key, value in zip(header, row) if value != ""}
+        except ValueError as e:
+            errors.append({"line": line_no, "error": f"Unreadable row: {e}"})
+            continue
+
+        chunk.append((line_no, record))
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+# ============================================================================
+# WRITING (One transaction per chunk)
+# ============================================================================
+
+def new_report() -> Dict:
+    return {
+        "ingredients_created": 0,
+        "ingredients_updated": 0,
+        "recipes_created": 0,
+        "portions_created": 0,
+        "errors": [],
+    }
+
+
+def load_name_index(db: Session) -> Dict[str, Dict[str, int]]:
+    """Lowercase name -> id for ingredients, recipes and people"""
+    return {
+        key: {name.lower(): row_id for row_id, name in db.query(model.id, model.name).all()}
+        for key, model in INDEX_MODELS.items()
+    }
+
+
+def _resolve(index: Dict[str, int], ids: set, name, row_id, label: str) -> int:
+    """Id for a name or id reference, checked against the index"""
+    if row_id is not None:
+        if row_id not in ids:
+            raise ValueError(f"Unknown {label} id {row_id}")
+        return row_id
+    if name is None:
+        raise ValueError(f"Missing {label}")
+    found = index.get(name.lower())
+    if found is None:
+        raise ValueError(f"Unknown {label} '{name}'")
+    return found
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+    )
+
+
+def import_chunk(db: Session, records: List[Tuple[int, Dict]], names: Dict, report: Dict):
+    """
+    Validate and write one chunk. Ingredients are written first, then recipes,
+    then portions, so a portion may refer to anything earlier in its chunk or
+    in a previous one. Ingredients whose name already exists are updated
+    with just the fields their row gives.
+    """
+    # Work on a copy so a rolled-back chunk leaves the index untouched
+    index = {key: dict(values) for key, values in names.items()}
+    ids = {key: set(values.values()) for key, values in index.items()}
+
+    ingredients = {}
+    recipes = {}
+    portions = []
+    errors = []
+
+    # 1. Validate
+    for line_no, record in records:
+        kind = record.pop("type", None)
+        try:
+            if kind == "ingredient":
+                # Rows for an existing name only change the fields they give
+                name = record.get("name")
+                exists = isinstance(name, str) and name.lower() in index["ingredients"]
+                ingredient = (models.IngredientUpdate if exists else models.IngredientCreate)(**record)
+                key = ingredient.name.lower()
+                if key in ingredients:
+                    raise ValueError(f"Ingredient '{ingredient.name}' already given on line {ingredients[key][0]}")
+                ingredients[key] = (line_no, ingredient)
+            elif kind == "recipe":
+                recipe = models.ImportRecipe(**record)
+                key = recipe.name.lower()
+                if key in index["recipes"] or key in recipes:
+                    raise ValueError(f"Recipe '{recipe.name}' already exists")
+                recipes[key] = (line_no, recipe)
+                portions.extend((line_no, portion.model_copy(update={"recipe": recipe.name}))
+                                for portion in recipe.portions)
+            elif kind == "portion":
+                portions.append((line_no, models.ImportPortion(**record)))
+            else:
+                raise ValueError(f"type must be one of {', '.join(IMPORT_TYPES)}")
+        except ValidationError as e:
+            errors.append({"line": line_no, "error": _validation_message(e)})
+        except (TypeError, ValueError) as e:
+            errors.append({"line": line_no, "error": str(e)})
+
+    try:
+        # 2. Ingredients (in base units): update existing names, insert new ones
+        existing_ids = [index["ingredients"][key] for key in ingredients if key in index["ingredients"]]
+        stored = {}
+        if existing_ids:
+            stored = {
+                row_id: (unit, cost)
+                for row_id, unit, cost in db.query(
+                    database.Ingredient.id, database.Ingredient.unit, database.Ingredient.cost_per_unit
+                ).filter(database.Ingredient.id.in_(existing_ids)).all()
+            }
+
+        existing = []
+        new = []
+        for key, (line_no, ingredient) in ingredients.items():
+            if key not in index["ingredients"]:
+                new.append(units.normalize_ingredient(ingredient.dict()))
+                continue
+
+            # Missing (or blank CSV) fields keep their stored values
+            row_id = index["ingredients"][key]
+            stored_unit = stored[row_id][0]
+            values = ingredient.dict(exclude_unset=True)
+            if values.get("unit"):
+                try:
+                    units.convert(1.0, values["unit"], stored_unit)
+                except units.UnitError as e:
+                    errors.append({"line": line_no, "error": str(e)})
+                    continue
+            existing.append({"id": row_id, **units.normalize_ingredient(values, stored_unit)})
+
+        costs = {}
+        previous_costs = {row_id: cost for row_id, (_, cost) in stored.items()}
+        if existing:
+            db.execute(update(database.Ingredient), existing)
+            costs.update((row["id"], row["cost_per_unit"]) for row in existing if "cost_per_unit" in row)
+        if new:
+            rows = db.execute(
+                insert(database.Ingredient).returning(
+                    database.Ingredient.id, database.Ingredient.name, database.Ingredient.cost_per_unit
+                ),
+                new
+            ).all()
+            for row_id, name, cost in rows:
+                index["ingredients"][name.lower()] = row_id
+                ids["ingredients"].add(row_id)
+                costs[row_id] = cost
+
+        # Changed prices apply from today (see prices.py)
+        prices.record_prices(db, costs, previous=previous_costs)
+
+        # 3. Recipes
+        if recipes:
+            rows = db.execute(
+                insert(database.Recipe).returning(database.Recipe.id, database.Recipe.name),
+                [{"name": recipe.name, "meal_type": recipe.meal_type} for _, recipe in recipes.values()]
+            ).all()
+            for row_id, name in rows:
+                index["recipes"][name.lower()] = row_id
+                ids["recipes"].add(row_id)
+
+        # 4. Portions (names resolved against the index, new rows included)
+        resolved = []
+        for line_no, portion in portions:
+            try:
+                resolved.append((line_no, portion, {
+                    "recipe_id": _resolve(index["recipes"], ids["recipes"], portion.recipe, portion.recipe_id, "recipe"),
+                    "ingredient_id": _resolve(index["ingredients"], ids["ingredients"], portion.ingredient, portion.ingredient_id, "ingredient"),
+                    "person_id": _resolve(index["people"], ids["people"], portion.person, portion.person_id, "person"),
+                }))
+            except ValueError as e:
+                errors.append({"line": line_no, "error": str(e)})
+
+        # Quantities given in another unit are converted to the ingredient's
+        ingredient_units = {}
+        with_units = {row["ingredient_id"] for _, portion, row in resolved if portion.unit}
+        if with_units:
+            ingredient_units = dict(db.query(database.Ingredient.id, database.Ingredient.unit).filter(
+                database.Ingredient.id.in_(with_units)
+            ).all())
+
+        portion_rows = []
+        for line_no, portion, row in resolved:
+            try:
+                row["quantity"] = units.normalize_quantity(
+                    portion.quantity, portion.unit, ingredient_units.get(row["ingredient_id"])
+                )
+                portion_rows.append(row)
+            except units.UnitError as e:
+                errors.append({"line": line_no, "error": str(e)})
+
+        if portion_rows:
+            db.execute(insert(database.RecipePortion), portion_rows)
+
+        # 5. Aggregates for everything the chunk touched. Updates that only
+        # change the price leave days before today alone (see prices.py)
+        aggregates.refresh_for_recipes(db, {row["recipe_id"] for row in portion_rows})
+        repriced, changed = [], []
+        for row in existing:
+            changed_totals = aggregates.INGREDIENT_TOTAL_FIELDS & row.keys()
+            if changed_totals == {"cost_per_unit"}:
+                repriced.append(row["id"])
+            elif changed_totals:
+                changed.append(row["id"])
+        aggregates.refresh_for_ingredients(db, repriced, since=date.today())
+        aggregates.refresh_for_ingredients(db, changed)
+
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        message = f"Chunk rolled back: {getattr(e, 'orig', None) or e}"
+        report["errors"].extend(
+            {"line": line_no, "error": message} for line_no, _ in records
+        )
+        return
+
+    if existing or new or recipes or portion_rows:
+        cache.bump_data_version()
+    if recipes:
+        cache.invalidate_name_map(database.Recipe)
+
+    names.update(index)
+
+    report["ingredients_created"] += len(new)
+    report["ingredients_updated"] += len(existing)
+    report["recipes_created"] += len(recipes)
+    report["portions_created"] += len(portion_rows)
+    report["errors"].extend(errors)
+
+
+def finish_report(report: Dict) -> Dict:
+    report["errors"].sort(key=lambda error: error["line"])
+    return {
+        "message": (
+            f"Imported {report['ingredients_created'] + report['ingredients_updated']} ingredients, "
+            f"{report['recipes_created']} recipes and {report['portions_created']} portions "
+            f"({len(report['errors'])} rows rejected)"
+        ),
+        **report
+    }
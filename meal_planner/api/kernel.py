@@ -0,0 +1,425 @@
+"""
+Vectorized nutrition/cost kernel (NumPy).
+- Ingredient macros as a dense (ingredient x 4) matrix M
+- Recipe portions as a sparse (recipe-person x ingredient) quantity matrix P
+- Planned meals as a sparse (slot x recipe-person) matrix S, consumed
+  snacks as a sparse (slot x ingredient) matrix
+- Slot nutrition is S @ (P @ M) (+ snacks @ M); shopping quantities are
+  P^T @ (meals per recipe-person in the batch)
+- Slot cost uses the price in effect on each day (prices.py): every planned
+  portion and snack is priced with one sorted search over the price history
+Sparse matrices are held as COO arrays and multiplied with np.bincount.
+Works straight from source rows, so it doesn't need the aggregate tables.
+"""
+
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Tuple
+import numpy as np
+from sqlalchemy import and_, or_, case, func, select, true, tuple_
+from sqlalchemy.orm import Session
+
+from database import WeekPlan, RecipePortion, Ingredient, IngredientPrice, SnackLog, Snack, Person
+import calculations
+
+
+# Total columns, in order (cost is priced per day, the rest come from M)
+COLUMNS = ("kcal", "protein", "carbs", "fat", "cost")
+NUTRIENT_COLUMNS = COLUMNS[:4]
+
+INGREDIENT_COLUMNS = (
+    Ingredient.kcal_per_unit,
+    Ingredient.protein_per_unit,
+    Ingredient.carbs_per_unit,
+    Ingredient.fat_per_unit,
+    Ingredient.cost_per_unit,
+)
+
+# julianday(d) - JULIAN_ORDINAL_OFFSET == d.toordinal()
+JULIAN_ORDINAL_OFFSET = 1721424.5
+
+# Packs (ingredient row, day ordinal) into one sortable int64 key
+DAY_STRIDE = date.max.toordinal() + 1
+
+# Meal codes (only breakfast/lunch vs. dinner matters for the batch split)
+BREAKFAST_LUNCH, DINNER, OTHER_MEAL = 0, 1, 2
+
+
+# ============================================================================
+# LOADING (Source rows -> dense/COO arrays)
+# ============================================================================
+
+def _fetch(db: Session, stmt, width: int) -> np.ndarray:
+    """Run a numeric SELECT into an (n x width) float array"""
+    # Plain tuples: numpy probes Row objects for array attributes, which is slow
+    rows = [tuple(row) for row in db.execute(stmt)]
+    return np.nan_to_num(np.array(rows, dtype=float).reshape(-1, width))
+
+
+def _day(column):
+    """Date column as a day ordinal-compatible float (no date parsing per row)"""
+    return func.julianday(column)
+
+
+def _ordinals(values: np.ndarray) -> np.ndarray:
+    return (values - JULIAN_ORDINAL_OFFSET).round().astype(np.int64)
+
+
+def load_ingredient_matrix(db: Session) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns: (sorted ingredient ids, M: (ingredient x 4) per-unit
+    kcal/protein/carbs/fat, today's cost_per_unit per ingredient);
+    missing values count as 0
+    """
+    data = _fetch(db, select(Ingredient.id, *INGREDIENT_COLUMNS).order_by(Ingredient.id), 1 + len(COLUMNS))
+    return data[:, 0].astype(np.int64), data[:, 1:5], data[:, 5]
+
+
+def load_prices(db: Session, ingredient_ids: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    The price history as arrays sorted by (ingredient row, effective_from):
+    key (row * DAY_STRIDE + effective_from ordinal), col and cost
+    """
+    data = _fetch(db, select(
+        IngredientPrice.ingredient_id, _day(IngredientPrice.effective_from), IngredientPrice.cost_per_unit
+    ).join(Ingredient, Ingredient.id == IngredientPrice.ingredient_id), 3)
+
+    cols = np.searchsorted(ingredient_ids, data[:, 0].astype(np.int64))
+    keys = cols * DAY_STRIDE + _ordinals(data[:, 1])
+    order = np.argsort(keys, kind="stable")
+    return {"key": keys[order], "col": cols[order], "cost": data[order, 2]}
+
+
+def load_portions(db: Session, ingredient_ids: np.ndarray, planned=None) -> Dict[str, np.ndarray]:
+    """
+    P as COO arrays: recipe, person, col (row of M) and qty.
+    planned: optional SELECT of (recipe_id, person_id) pairs to load
+    """
+    stmt = select(
+        RecipePortion.recipe_id, RecipePortion.person_id, RecipePortion.ingredient_id, RecipePortion.quantity
+    ).join(Ingredient, Ingredient.id == RecipePortion.ingredient_id)
+
+    if planned is not None:
+        stmt = stmt.where(tuple_(RecipePortion.recipe_id, RecipePortion.person_id).in_(planned))
+
+    data = _fetch(db, stmt, 4)
+    return {
+        "recipe": data[:, 0].astype(np.int64),
+        "person": data[:, 1].astype(np.int64),
+        "col": np.searchsorted(ingredient_ids, data[:, 2].astype(np.int64)),
+        "qty": data[:, 3],
+    }
+
+
+def load_meals(db: Session, condition_for: Callable) -> Dict[str, np.ndarray]:
+    """S as COO arrays: day (ordinal), person, meal (code) and recipe"""
+    meal_code = case(
+        (WeekPlan.meal_type.in_(["breakfast", "lunch"]), BREAKFAST_LUNCH),
+        (WeekPlan.meal_type == "dinner", DINNER),
+        else_=OTHER_MEAL
+    )
+    data = _fetch(db, select(
+        _day(WeekPlan.date), WeekPlan.person_id, meal_code, WeekPlan.recipe_id
+    ).where(
+        condition_for(WeekPlan.date), WeekPlan.recipe_id.isnot(None)
+    ), 4)
+
+    return {
+        "day": _ordinals(data[:, 0]),
+        "person": data[:, 1].astype(np.int64),
+        "meal": data[:, 2].astype(np.int64),
+        "recipe": data[:, 3].astype(np.int64),
+    }
+
+
+def load_snacks(db: Session, ingredient_ids: np.ndarray, condition_for: Callable) -> Dict[str, np.ndarray]:
+    """Consumed snacks as COO arrays: day (ordinal), person, col (row of M) and qty"""
+    data = _fetch(db, select(
+        _day(SnackLog.date), SnackLog.person_id, Snack.ingredient_id, Snack.default_quantity
+    ).join(
+        Snack, Snack.id == SnackLog.snack_id
+    ).join(
+        Ingredient, Ingredient.id == Snack.ingredient_id
+    ).where(
+        condition_for(SnackLog.date), SnackLog.consumed == True
+    ), 4)
+
+    return {
+        "day": _ordinals(data[:, 0]),
+        "person": data[:, 1].astype(np.int64),
+        "col": np.searchsorted(ingredient_ids, data[:, 2].astype(np.int64)),
+        "qty": data[:, 3],
+    }
+
+
+# ============================================================================
+# PRODUCTS
+# ============================================================================
+
+def group_sum(keys: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum the rows of values sharing a key, i.e. G @ values for the 0/1
+    (group x row) matrix G. Returns: (unique keys, (group x width) sums)
+    """
+    groups, rows = np.unique(keys, return_inverse=True)
+    sums = np.column_stack([
+        np.bincount(rows, weights=values[:, k], minlength=len(groups))
+        for k in range(values.shape[1])
+    ]) if len(groups) else np.zeros((0, values.shape[1]))
+    return groups, sums
+
+
+def _pair_keys(first: np.ndarray, second: np.ndarray, stride: int) -> np.ndarray:
+    return first * stride + second
+
+
+def recipe_vectors(portions: Dict[str, np.ndarray], matrix: np.ndarray, stride: int) -> Tuple[np.ndarray, np.ndarray]:
+    """P @ M: (recipe-person keys, (recipe-person x 4) nutrition)"""
+    keys = _pair_keys(portions["recipe"], portions["person"], stride)
+    return group_sum(keys, portions["qty"][:, None] * matrix[portions["col"]])
+
+
+def meal_rows(meals: Dict[str, np.ndarray], vector_keys: np.ndarray, stride: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row of P @ M for each planned meal.
+    Returns: (row index per meal, mask of meals whose recipe has portions)
+    """
+    keys = _pair_keys(meals["recipe"], meals["person"], stride)
+    index = np.minimum(np.searchsorted(vector_keys, keys), max(len(vector_keys) - 1, 0))
+    found = vector_keys[index] == keys if len(vector_keys) else np.zeros(len(keys), dtype=bool)
+    return index, found
+
+
+def unit_costs(prices: Dict[str, np.ndarray], current: np.ndarray, cols: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """
+    cost_per_unit of ingredient row col on day, for every (col, day) pair:
+    the latest price row with effective_from <= day (prices.as_of), else
+    today's cost_per_unit for ingredients without history
+    """
+    costs = current[cols]
+    if not len(prices["key"]) or not len(cols):
+        return costs
+
+    latest = np.searchsorted(prices["key"], cols * DAY_STRIDE + days, side="right") - 1
+    clipped = np.maximum(latest, 0)
+    priced = (latest >= 0) & (prices["col"][clipped] == cols)
+    costs[priced] = prices["cost"][clipped[priced]]
+    return costs
+
+
+def meal_costs(
+    meals: Dict[str, np.ndarray],
+    portions: Dict[str, np.ndarray],
+    vector_keys: np.ndarray,
+    index: np.ndarray,
+    found: np.ndarray,
+    prices: Dict[str, np.ndarray],
+    current: np.ndarray,
+    stride: int
+) -> np.ndarray:
+    """
+    Cost of each found meal on its own day: the meal's portions are
+    expanded (one row per meal x portion), priced as of the meal's day
+    and summed back per meal
+    """
+    # Portions grouped by recipe-person row of P @ M
+    portion_rows = np.searchsorted(vector_keys, _pair_keys(portions["recipe"], portions["person"], stride))
+    order = np.argsort(portion_rows, kind="stable")
+    counts = np.bincount(portion_rows, minlength=len(vector_keys))
+    starts = np.cumsum(counts) - counts
+
+    rows = index[found]
+    per_meal = counts[rows]
+    meal_of = np.repeat(np.arange(len(rows)), per_meal)
+    offsets = np.arange(len(meal_of)) - np.repeat(np.cumsum(per_meal) - per_meal, per_meal)
+    portion = order[np.repeat(starts[rows], per_meal) + offsets]
+
+    days = meals["day"][found][meal_of]
+    cost = portions["qty"][portion] * unit_costs(prices, current, portions["col"][portion], days)
+    return np.bincount(meal_of, weights=cost, minlength=len(rows))
+
+
+def slot_totals(
+    meals: Dict[str, np.ndarray],
+    snacks: Dict[str, np.ndarray],
+    vectors: np.ndarray,
+    index: np.ndarray,
+    found: np.ndarray,
+    costs: np.ndarray,
+    matrix: np.ndarray,
+    prices: Dict[str, np.ndarray],
+    current: np.ndarray,
+    stride: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    S @ (P @ M) + snacks @ M with dated costs, grouped per (day, person) slot.
+    Returns: (days, person ids, (slot x 5) totals)
+    """
+    snack_costs = snacks["qty"] * unit_costs(prices, current, snacks["col"], snacks["day"])
+
+    days = np.concatenate([meals["day"][found], snacks["day"]])
+    people = np.concatenate([meals["person"][found], snacks["person"]])
+    values = np.concatenate([
+        np.column_stack([vectors[index[found]], costs]),
+        np.column_stack([snacks["qty"][:, None] * matrix[snacks["col"]], snack_costs]),
+    ])
+
+    keys, totals = group_sum(_pair_keys(days, people, stride), values)
+    return keys // stride, keys % stride, totals
+
+
+def wed_batch_mask(meals: Dict[str, np.ndarray]) -> np.ndarray:
+    """calculations.is_wed_batch() for every planned meal at once"""
+    weekday = (meals["day"] - 1) % 7  # ordinal 1 (0001-01-01) was a Monday
+    return (
+        ((weekday == 2) & (meals["meal"] == DINNER))
+        | ((weekday >= 3) & (weekday <= 5))
+        | ((weekday == 6) & (meals["meal"] == BREAKFAST_LUNCH))
+    )
+
+
+def _stride(*arrays: np.ndarray) -> int:
+    """Multiplier that packs (x, person_id) pairs into one int64 key"""
+    return max((int(a.max()) for a in arrays if len(a)), default=0) + 1
+
+
+# ============================================================================
+# CALCULATIONS
+# ============================================================================
+
+def _totals(db: Session, condition_for: Callable, planned=None):
+    """Load and multiply: (ingredient ids, portions, meals, P @ M keys, meal rows, found, slot totals)"""
+    ingredient_ids, matrix, current = load_ingredient_matrix(db)
+    prices = load_prices(db, ingredient_ids)
+    portions = load_portions(db, ingredient_ids, planned)
+    meals = load_meals(db, condition_for)
+    snacks = load_snacks(db, ingredient_ids, condition_for)
+
+    stride = _stride(portions["person"], meals["person"], snacks["person"])
+    vector_keys, vectors = recipe_vectors(portions, matrix, stride)
+    index, found = meal_rows(meals, vector_keys, stride)
+    costs = meal_costs(meals, portions, vector_keys, index, found, prices, current, stride)
+    slots = slot_totals(meals, snacks, vectors, index, found, costs, matrix, prices, current, stride)
+
+    return ingredient_ids, portions, meals, vector_keys, index, found, slots, stride
+
+
+def _slot_dict(slots) -> Dict[Tuple[date, int], Dict[str, float]]:
+    days, people, totals = slots
+    return {
+        (date.fromordinal(int(day)), int(person_id)): dict(zip(COLUMNS, map(float, values)))
+        for day, person_id, values in zip(days, people, totals)
+    }
+
+
+def daily_totals(
+    db: Session,
+    start: date = None,
+    end: date = None,
+    dates: Iterable[date] = None
+) -> Dict[Tuple[date, int], Dict[str, float]]:
+    """
+    kcal/protein/carbs/fat/cost per (date, person_id) from source rows,
+    over start..end inclusive (all history when not given), or only the
+    given dates. Costs are as of each day, like daily_person_totals.
+    """
+    dates = sorted(set(dates)) if dates is not None else None
+
+    def condition_for(column):
+        conditions = []
+        if start is not None:
+            conditions.append(column >= start)
+        if end is not None:
+            conditions.append(column <= end)
+        if dates is not None:
+            conditions.append(column.in_(dates))
+        return and_(true(), *conditions)
+
+    return _slot_dict(_totals(db, condition_for)[6])
+
+
+def week_summary(db: Session, week_start: date = None, today: date = None) -> Dict:
+    """calculations.calculate_week_summary() computed by the kernel from source rows"""
+    if week_start is None:
+        week_start = calculations.get_week_start()
+
+    if today is None:
+        today = date.today()
+
+    week_end = week_start + timedelta(days=6)
+    first, last = week_start.toordinal(), week_end.toordinal()
+
+    def condition_for(column):
+        return or_(column.between(week_start, week_end), column == today)
+
+    # 1. Nutrition and cost per slot, folded exactly as from daily_person_totals
+    person_map = {pid: name for pid, name in db.query(Person.id, Person.name).all()}
+    planned = select(WeekPlan.recipe_id, WeekPlan.person_id).where(condition_for(WeekPlan.date)).distinct()
+    ingredient_ids, portions, meals, vector_keys, index, found, slots, stride = _totals(db, condition_for, planned)
+
+    day_rows = [(day_date, person_id, values) for (day_date, person_id), values in _slot_dict(slots).items()]
+    week = calculations.summarize_day_totals(person_map, day_rows, week_start, today)
+
+    # 2. Shopping: P^T @ (meals per recipe-person in each batch)
+    week_meals = (meals["day"] >= first) & (meals["day"] <= last) & found
+    wed = wed_batch_mask(meals)
+    portion_rows = np.searchsorted(vector_keys, _pair_keys(portions["recipe"], portions["person"], stride))
+
+    quantities = {}
+    present = {}
+    for batch, mask in (("wed", week_meals & wed), ("sun", week_meals & ~wed)):
+        meal_counts = np.bincount(index[mask], minlength=len(vector_keys))[portion_rows]
+        quantities[batch] = np.bincount(
+            portions["col"], weights=portions["qty"] * meal_counts, minlength=len(ingredient_ids)
+        )
+        present[batch] = np.bincount(
+            portions["col"], weights=meal_counts > 0, minlength=len(ingredient_ids)
+        ) > 0
+
+    shopping = shopping_lists(db, ingredient_ids, quantities, present)
+
+    return {
+        "today_cost": week["today_cost"],
+        "today_totals": calculations.format_person_totals(week["today_totals"]),
+        "week_cost": week["week_cost"],
+        "week_totals": calculations.format_person_totals(week["week_totals"]),
+        "wed_shopping": shopping["wed"],
+        "sun_shopping": shopping["sun"],
+        "wed_spend": shopping["wed_spend"],
+        "sun_spend": shopping["sun_spend"],
+        "week_start": week_start.isoformat(),
+        "last_updated": today.isoformat()
+    }
+
+
+def shopping_lists(
+    db: Session,
+    ingredient_ids: np.ndarray,
+    quantities: Dict[str, np.ndarray],
+    present: Dict[str, np.ndarray]
+) -> Dict[str, List[Dict]]:
+    """Turn per-ingredient batch quantity columns into both shopping lists"""
+    used = np.flatnonzero(present["wed"] | present["sun"])
+    ingredients = {
+        ingredient.id: ingredient
+        for ingredient in db.query(Ingredient).filter(Ingredient.id.in_(ingredient_ids[used].tolist())).all()
+    } if len(used) else {}
+    used_ingredients = [ingredients[int(ingredient_ids[i])] for i in used]
+
+    packs = calculations.optimize_packs(
+        used_ingredients,
+        quantities["wed"][used].tolist(),
+        quantities["sun"][used].tolist()
+    )
+
+    shopping = {}
+    for batch in ("wed", "sun"):
+        items = [
+            calculations.shopping_item(ingredient, float(quantities[batch][i]), pack)
+            for i, ingredient, pack in zip(used, used_ingredients, packs[batch])
+            if present[batch][i]
+        ]
+        items.sort(key=lambda x: x["ingredient"])
+        shopping[batch] = items
+        shopping[f"{batch}_spend"] = round(sum(item["spend"] for item in items), 2)
+
+    return shopping
@@ -3,19 +3,60 @@ FastAPI application for the meal planner.
 This is the HTTP server that Home Assistant communicates with.
 """
 
-from fastapi import FastAPI, Depends, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Optional, Set
 from datetime import date, timedelta
 
 import database
 import models
 import calculations
+import cache
+import aggregates
+import export
+import importer
+import planner
+import metrics
+import events
+import precompute
+import responses
+import prices
+import households
+import units
+import snapshots
 
 # Initialize database
 database.init_db()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Seed and warm up on startup; stop background work and close databases on shutdown"""
+    print("=" * 60)
+    print("🍽️  Meal Planner API Starting")
+    print("=" * 60)
+    print(f"🗄️  Database mode: {database.DB_MODE}, profile: {database.DB_PROFILE}")
+    database.seed_initial_data()
+
+    # Background precompute and change notifications need the running event loop
+    precompute.start()
+    print("✅ API ready at http://localhost:8000")
+    print("📖 Docs available at http://localhost:8000/docs")
+    print("=" * 60)
+
+    try:
+        yield
+    finally:
+        await precompute.stop()
+        database.close_households()
+
+
 # Create FastAPI app (Ingress-aware)
 app = FastAPI(
     title="Meal Planner API",
@@ -23,6 +64,7 @@ app = FastAPI(
     version="1.0.0",
     # Fix Swagger UI behind Home Assistant Ingress
     root_path="/api/hassio_ingress/EjiYrpfGiBJ9tLW2DCkO-huymtri_d-Kszjlcb4dEdc/proxy/8000",
+    lifespan=lifespan,
 )
 
 # Enable CORS (so HA can access from different origin)
@@ -34,18 +76,117 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, SQL counts, ?profile=1
+app.middleware("http")(metrics.instrument)
+
+# /households/<id>/... routes and per-household request limits (outermost)
+app.add_middleware(households.HouseholdMiddleware)
+
+# Largest page list endpoints return for ?limit=
+MAX_PAGE_SIZE = 1000
+
+
+# ============================================================================
+# LIST HELPERS (Pagination and ?fields= selection)
+# ============================================================================
+
+def select_fields(fields: Optional[str], model) -> Optional[Set[str]]:
+    """Parse ?fields=a,b against a response model (None means every field)"""
+    if not fields:
+        return None
+
+    wanted = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = wanted - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return wanted
+
+
+def list_response(rows: List[Dict], total: int, response: Response, wanted: Optional[Set[str]]):
+    """
+    Rows for the endpoint's response model, with the unpaged row count in
+    X-Total-Count. With ?fields= (or fast JSON) the rows are sent as built,
+    bypassing the response model.
+    """
+    if wanted is not None:
+        rows = [{key: value for key, value in row.items() if key in wanted} for row in rows]
+    elif not responses.FAST_JSON:
+        response.headers["X-Total-Count"] = str(total)
+        return rows
+
+    return responses.fast_response(rows, headers={"X-Total-Count": str(total)})
+
 # ============================================================================
 # MAIN ENDPOINT (What HA Reads)
 # ============================================================================
 
 @app.get("/week-totals", response_model=models.WeekTotalsResponse)
-def get_week_totals(db: Session = Depends(database.get_db)):
+async def get_week_totals(
+    request: Request,
+    response: Response,
+    week_start: Optional[date] = None,
+    db=Depends(database.get_session)
+):
     """
     Main endpoint for Home Assistant to read.
-    Returns complete weekly summary with all totals and shopping lists.
+    Returns complete weekly summary with all totals and shopping lists
+    (of the current week, or the week containing week_start).
+    The current and next week are precomputed in the background, so this
+    is normally a cache read; supports If-None-Match.
+    """
+    today = date.today()
+    week_start = calculations.get_week_start(week_start or today)
+
+    version = cache.get_data_version()
+    etag = cache.week_totals_etag(week_start, today, version)
+
+    if cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    summary = cache.get_week_totals(week_start, today, version)
+    if summary is None:
+        summary = await calculations.calculate_week_summary_async(db, week_start, today)
+        cache.store_week_totals(week_start, today, version, summary)
+
+    if responses.FAST_JSON:
+        return responses.fast_response(summary, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return summary
+
+
+@app.get("/snapshot", response_model=models.SnapshotStatus)
+def get_snapshot_status():
+    """
+    Freshness of the week-totals.json snapshot (written after every change
+    for HA to read as a file; see snapshots.py)
     """
-    week_start = calculations.get_week_start()
-    summary = calculations.calculate_week_summary(db, week_start)
+    return snapshots.status()
+
+
+@app.get("/summary", response_model=models.RangeSummaryResponse)
+async def get_summary(
+    start: date,
+    end: date = None,
+    group: str = "week",
+    shopping: bool = True,
+    db=Depends(database.get_session)
+):
+    """
+    Nutrition, cost and shopping totals per person for any date range,
+    grouped by day, week or month (e.g. a year of history for dashboards).
+    """
+    if end is None:
+        end = date.today()
+
+    if group not in calculations.SUMMARY_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group must be one of {', '.join(calculations.SUMMARY_GROUPS)}")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    summary = await calculations.calculate_range_summary_async(db, start, end, group, shopping)
+    if responses.FAST_JSON:
+        return responses.fast_response(summary)
     return summary
 
 
@@ -59,6 +200,55 @@ def root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Request latency and SQL statement metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# ============================================================================
+# CHANGE NOTIFICATIONS (Pushed to HA instead of waiting for the next poll)
+# ============================================================================
+
+@app.get("/events")
+async def stream_events():
+    """
+    Server-sent events: a compact diff of the current week after every
+    write. See events.py for the client contract.
+    """
+    return StreamingResponse(
+        events.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ============================================================================
+# HOUSEHOLD ENDPOINTS
+# ============================================================================
+# Every other route is also served per household at /households/<id>/...
+# (see households.py); unprefixed routes are the "default" household.
+
+@app.get("/households", response_model=List[models.Household])
+def list_households():
+    """All households, default first"""
+    return [{"id": household_id} for household_id in database.list_households()]
+
+
+@app.post("/households", response_model=models.Household, status_code=201)
+def create_household(household: models.HouseholdCreate):
+    """Create a household with its own database, seeded with its people"""
+    if not database.is_valid_household_id(household.id):
+        raise HTTPException(
+            status_code=400,
+            detail="Household id must be lowercase letters, digits, '-' or '_' (at most 63)"
+        )
+    if database.household_exists(household.id) or not database.create_household(household.id, household.people):
+        raise HTTPException(status_code=409, detail=f"Household '{household.id}' already exists")
+
+    return {"id": household.id}
+
+
 # ============================================================================
 # PEOPLE ENDPOINTS
 # ============================================================================
@@ -75,6 +265,8 @@ def create_person(person: models.PersonCreate, db: Session = Depends(database.ge
     db_person = database.Person(name=person.name)
     db.add(db_person)
     db.commit()
+    cache.bump_data_version()
+    cache.invalidate_name_map(database.Person)
     db.refresh(db_person)
     return db_person
 
@@ -100,10 +292,13 @@ def get_ingredient(ingredient_id: int, db: Session = Depends(database.get_db)):
 
 @app.post("/ingredients", response_model=models.Ingredient)
 def create_ingredient(ingredient: models.IngredientCreate, db: Session = Depends(database.get_db)):
-    """Create new ingredient"""
-    db_ingredient = database.Ingredient(**ingredient.dict())
+    """Create new ingredient (unit, per-unit values and pack size are stored in the base unit)"""
+    db_ingredient = database.Ingredient(**units.normalize_ingredient(ingredient.dict()))
     db.add(db_ingredient)
+    db.flush()
+    prices.record_prices(db, {db_ingredient.id: db_ingredient.cost_per_unit})
     db.commit()
+    cache.bump_data_version()
     db.refresh(db_ingredient)
     return db_ingredient
 
@@ -114,16 +309,39 @@ def update_ingredient(
     ingredient: models.IngredientUpdate,
     db: Session = Depends(database.get_db)
 ):
-    """Update ingredient details"""
+    """Update ingredient details (values given with a unit are converted to the stored base unit)"""
     db_ingredient = db.query(database.Ingredient).filter(database.Ingredient.id == ingredient_id).first()
     if not db_ingredient:
         raise HTTPException(status_code=404, detail="Ingredient not found")
 
+    # Portions and snacks are stored in the current base unit, so it can't
+    # move to another dimension (g -> ml) under them
+    if ingredient.unit:
+        try:
+            units.convert(1.0, ingredient.unit, db_ingredient.unit)
+        except units.UnitError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    previous_cost = db_ingredient.cost_per_unit
+
     # Update only provided fields
-    for key, value in ingredient.dict(exclude_unset=True).items():
+    changes = units.normalize_ingredient(ingredient.dict(exclude_unset=True), db_ingredient.unit)
+    for key, value in changes.items():
         setattr(db_ingredient, key, value)
 
+    # A new price applies from today; earlier days keep theirs
+    if "cost_per_unit" in changes:
+        prices.record_prices(db, {ingredient_id: db_ingredient.cost_per_unit}, previous={ingredient_id: previous_cost})
+
+    # Re-total every recipe and day that uses this ingredient
+    changed_totals = aggregates.INGREDIENT_TOTAL_FIELDS & changes.keys()
+    if changed_totals == {"cost_per_unit"}:
+        aggregates.refresh_for_ingredients(db, [ingredient_id], since=date.today())
+    elif changed_totals:
+        aggregates.refresh_for_ingredients(db, [ingredient_id])
+
     db.commit()
+    cache.bump_data_version()
     db.refresh(db_ingredient)
     return db_ingredient
 
@@ -136,51 +354,182 @@ def delete_ingredient(ingredient_id: int, db: Session = Depends(database.get_db)
         raise HTTPException(status_code=404, detail="Ingredient not found")
 
     db.delete(db_ingredient)
+    db.query(database.IngredientPrice).filter(
+        database.IngredientPrice.ingredient_id == ingredient_id
+    ).delete(synchronize_session=False)
+    aggregates.refresh_for_ingredients(db, [ingredient_id])
     db.commit()
+    cache.bump_data_version()
     return {"message": "Ingredient deleted"}
 
 
+@app.get("/ingredients/{ingredient_id}/prices", response_model=List[models.IngredientPrice])
+def get_ingredient_prices(ingredient_id: int, db: Session = Depends(database.get_db)):
+    """Price history of an ingredient, oldest first"""
+    if db.get(database.Ingredient, ingredient_id) is None:
+        raise HTTPException(status_code=404, detail="Ingredient not found")
+    return prices.price_history(db, ingredient_id)
+
+
+@app.post("/ingredients/{ingredient_id}/prices", response_model=List[models.IngredientPrice])
+def add_ingredient_price(ingredient_id: int, price: models.IngredientPriceCreate, db: Session = Depends(database.get_db)):
+    """
+    Record a price from effective_from (e.g. a receipt from last month).
+    Days from then on are re-costed; earlier days keep their prices.
+    """
+    db_ingredient = db.get(database.Ingredient, ingredient_id)
+    if db_ingredient is None:
+        raise HTTPException(status_code=404, detail="Ingredient not found")
+
+    today = date.today()
+    effective_from = price.effective_from or today
+    if effective_from > today:
+        raise HTTPException(status_code=400, detail="effective_from can't be in the future")
+
+    cost_per_unit = price.cost_per_unit
+    if price.unit:
+        try:
+            cost_per_unit /= units.convert(1.0, price.unit, db_ingredient.unit)
+        except units.UnitError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    previous = {ingredient_id: db_ingredient.cost_per_unit}
+    if prices.record_prices(db, {ingredient_id: cost_per_unit}, effective_from, previous):
+        # Today's price may be the one that changed
+        db_ingredient.cost_per_unit = prices.prices_as_of(db, [ingredient_id], today)[ingredient_id]
+        aggregates.refresh_for_ingredients(db, [ingredient_id], since=effective_from)
+        db.commit()
+        cache.bump_data_version()
+
+    return prices.price_history(db, ingredient_id)
+
+
 # ============================================================================
 # RECIPE ENDPOINTS
 # ============================================================================
 
 @app.get("/recipes", response_model=List[models.Recipe])
-def list_recipes(meal_type: str = None, db: Session = Depends(database.get_db)):
-    """List all recipes, optionally filtered by meal type"""
+def list_recipes(
+    response: Response,
+    meal_type: str = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = None,
+    db: Session = Depends(database.get_db)
+):
+    """
+    List recipes with their portions, optionally filtered by meal type.
+    Paged with offset/limit; ?fields=id,name skips the portions entirely.
+    """
+    wanted = select_fields(fields, models.Recipe)
+
     query = db.query(database.Recipe)
     if meal_type:
         query = query.filter(database.Recipe.meal_type == meal_type)
-    return query.all()
+    total = query.count()
+
+    query = query.order_by(database.Recipe.id).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+
+    rows = load_recipe_rows(db, query, with_portions=wanted is None or "portions" in wanted)
+    return list_response(rows, total, response, wanted)
 
 
 @app.get("/recipes/{recipe_id}", response_model=models.Recipe)
 def get_recipe(recipe_id: int, db: Session = Depends(database.get_db)):
     """Get recipe with all portions"""
-    recipe = db.query(database.Recipe).filter(database.Recipe.id == recipe_id).first()
-    if not recipe:
+    rows = load_recipe_rows(db, db.query(database.Recipe).filter(database.Recipe.id == recipe_id))
+    if not rows:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    return recipe
+    return rows[0]
+
+
+def load_recipe_rows(db: Session, query, with_portions: bool = True) -> List[Dict]:
+    """
+    Recipes matched by query as dicts, each with its portions and their
+    ingredient/person names. Two queries however many recipes match: the
+    recipes, then every portion of them joined to its names.
+    """
+    recipes = [
+        {"id": recipe_id, "name": name, "meal_type": meal_type, "portions": []}
+        for recipe_id, name, meal_type in query.with_entities(
+            database.Recipe.id, database.Recipe.name, database.Recipe.meal_type
+        ).all()
+    ]
+    if not with_portions or not recipes:
+        return recipes
+
+    # Same filter/order/page as the recipes, as a subquery (no giant IN list)
+    recipe_ids = query.with_entities(database.Recipe.id).subquery()
+    portions = db.query(
+        database.RecipePortion.recipe_id,
+        database.RecipePortion.id,
+        database.RecipePortion.ingredient_id,
+        database.RecipePortion.person_id,
+        database.RecipePortion.quantity,
+        database.Ingredient.name,
+        database.Person.name
+    ).outerjoin(
+        database.Ingredient, database.Ingredient.id == database.RecipePortion.ingredient_id
+    ).outerjoin(
+        database.Person, database.Person.id == database.RecipePortion.person_id
+    ).filter(
+        database.RecipePortion.recipe_id.in_(select(recipe_ids.c.id))
+    ).order_by(database.RecipePortion.id).all()
+
+    by_id = {recipe["id"]: recipe for recipe in recipes}
+    for recipe_id, portion_id, ingredient_id, person_id, quantity, ingredient_name, person_name in portions:
+        by_id[recipe_id]["portions"].append({
+            "id": portion_id,
+            "ingredient_id": ingredient_id,
+            "person_id": person_id,
+            "quantity": quantity,
+            "ingredient_name": ingredient_name,
+            "person_name": person_name
+        })
+
+    return recipes
 
 
 @app.post("/recipes", response_model=models.Recipe)
 def create_recipe(recipe: models.RecipeCreate, db: Session = Depends(database.get_db)):
-    """Create new recipe with portions"""
+    """Create new recipe with portions (quantities given in another unit are converted to the ingredient's)"""
+    ingredient_units = dict(db.query(database.Ingredient.id, database.Ingredient.unit).filter(
+        database.Ingredient.id.in_({portion.ingredient_id for portion in recipe.portions if portion.unit})
+    ).all())
+
+    quantities = []
+    for portion in recipe.portions:
+        if portion.unit and portion.ingredient_id not in ingredient_units:
+            raise HTTPException(status_code=400, detail=f"Unknown ingredient id {portion.ingredient_id}")
+        try:
+            quantities.append(units.normalize_quantity(
+                portion.quantity, portion.unit, ingredient_units.get(portion.ingredient_id)
+            ))
+        except units.UnitError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     db_recipe = database.Recipe(name=recipe.name, meal_type=recipe.meal_type)
     db.add(db_recipe)
     db.commit()
     db.refresh(db_recipe)
 
     # Add portions
-    for portion in recipe.portions:
+    for portion, quantity in zip(recipe.portions, quantities):
         db_portion = database.RecipePortion(
             recipe_id=db_recipe.id,
             ingredient_id=portion.ingredient_id,
             person_id=portion.person_id,
-            quantity=portion.quantity
+            quantity=quantity
         )
         db.add(db_portion)
 
+    aggregates.refresh_for_recipes(db, [db_recipe.id])
+
     db.commit()
+    cache.bump_data_version()
+    cache.invalidate_name_map(database.Recipe)
     db.refresh(db_recipe)
     return db_recipe
 
@@ -193,7 +542,10 @@ def delete_recipe(recipe_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(status_code=404, detail="Recipe not found")
 
     db.delete(db_recipe)
+    aggregates.refresh_for_recipes(db, [recipe_id])
     db.commit()
+    cache.bump_data_version()
+    cache.invalidate_name_map(database.Recipe)
     return {"message": "Recipe deleted"}
 
 
@@ -202,44 +554,104 @@ def delete_recipe(recipe_id: int, db: Session = Depends(database.get_db)):
 # ============================================================================
 
 @app.get("/week-plan", response_model=List[models.WeekPlan])
-def get_week_plan(week_start: date = None, db: Session = Depends(database.get_db)):
-    """Get current week's meal plan"""
+async def get_week_plan(
+    response: Response,
+    week_start: date = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = None,
+    db=Depends(database.get_session)
+):
+    """Get current week's meal plan with person and recipe names (paged, ?fields=)"""
     if week_start is None:
         week_start = calculations.get_week_start()
 
+    wanted = select_fields(fields, models.WeekPlan)
+    total, rows = await database.run_db(db, load_week_plan, week_start, offset, limit)
+    return list_response(rows, total, response, wanted)
+
+
+def load_week_plan(db: Session, week_start: date, offset: int = 0, limit: int = None):
+    """
+    (total, rows) of the week plan for the 7 days from week_start, one page
+    of rows with person_name and recipe_name joined in
+    """
     week_end = week_start + timedelta(days=6)
 
-    plans = db.query(database.WeekPlan).filter(
+    query = db.query(
+        database.WeekPlan.id,
+        database.WeekPlan.date,
+        database.WeekPlan.person_id,
+        database.WeekPlan.meal_type,
+        database.WeekPlan.recipe_id,
+        database.Person.name.label("person_name"),
+        database.Recipe.name.label("recipe_name")
+    ).outerjoin(
+        database.Person, database.Person.id == database.WeekPlan.person_id
+    ).outerjoin(
+        database.Recipe, database.Recipe.id == database.WeekPlan.recipe_id
+    ).filter(
         database.WeekPlan.date >= week_start,
         database.WeekPlan.date <= week_end
-    ).all()
+    )
+    total = query.count()
 
-    return plans
+    query = query.order_by(database.WeekPlan.date, database.WeekPlan.person_id, database.WeekPlan.id).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
 
+    return total, [row._asdict() for row in query.all()]
 
-@app.post("/week-plan/bulk-update")
-def bulk_update_week_plan(update: models.BulkMealUpdate, db: Session = Depends(database.get_db)):
+
+@app.post("/week-plan/bulk-update", response_model=models.BulkMealUpdateResponse)
+async def bulk_update_week_plan(update: models.BulkMealUpdate, db=Depends(database.get_session)):
     """
     Bulk update meal plan from Home Assistant.
-    HA sends all selections at once.
+    HA sends all selections at once; every changed slot is written with a
+    single batched INSERT ... ON CONFLICT DO UPDATE in one transaction.
     """
-    # Map person names to IDs
-    people = db.query(database.Person).all()
-    person_map = {p.name.lower(): p.id for p in people}
+    return await database.run_db(db, apply_week_plan_update, update)
+
 
-    # Map recipe names to IDs
-    recipes = db.query(database.Recipe).all()
-    recipe_map = {r.name.lower(): r.id for r in recipes}
+def apply_week_plan_update(db: Session, update: models.BulkMealUpdate) -> dict:
+    """Resolve and upsert a bulk meal update (sync; see bulk_update_week_plan)"""
+    # Map person/recipe names to IDs (cached between requests)
+    person_map = cache.get_name_map(db, database.Person)
+    recipe_map = cache.get_name_map(db, database.Recipe)
 
     # Day name to offset
     day_offsets = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
 
-    updated_count = 0
+    # Current recipe for every slot this week (None = slot row doesn't exist yet)
+    week_end = update.week_start + timedelta(days=6)
+    existing = {
+        (row.date, row.person_id, row.meal_type): row.recipe_id
+        for row in db.query(
+            database.WeekPlan.date,
+            database.WeekPlan.person_id,
+            database.WeekPlan.meal_type,
+            database.WeekPlan.recipe_id
+        ).filter(database.WeekPlan.date.between(update.week_start, week_end)).all()
+    }
+
+    results = []
+    slots = {}  # (date, person_id, meal_type) -> (index into results, recipe_id); last one wins
+    resolved = 0  # Entries with a known day and person, written or not
 
     for meal in update.meals:
+        result = {
+            "day": meal.day,
+            "person": meal.person,
+            "meal_type": meal.meal_type,
+            "status": "skipped",
+            "reason": None
+        }
+        results.append(result)
+
         # Calculate date
         day_offset = day_offsets.get(meal.day.lower())
         if day_offset is None:
+            result["reason"] = f"Unknown day '{meal.day}'"
             continue
 
         meal_date = update.week_start + timedelta(days=day_offset)
@@ -247,36 +659,94 @@ def bulk_update_week_plan(update: models.BulkMealUpdate, db: Session = Depends(d
         # Get person ID
         person_id = person_map.get(meal.person.lower())
         if not person_id:
+            result["reason"] = f"Unknown person '{meal.person}'"
             continue
 
-        # Get recipe ID (None if blank/"—")
+        # Get recipe ID (None if blank/"—"; unknown names also clear the slot)
         recipe_id = None
         if meal.recipe_name and meal.recipe_name != "—":
             recipe_id = recipe_map.get(meal.recipe_name.lower())
+            if recipe_id is None:
+                result["reason"] = f"Unknown recipe '{meal.recipe_name}', slot cleared"
+
+        slot = (meal_date, person_id, meal.meal_type.lower())
+        if slot in slots:
+            results[slots[slot][0]]["reason"] = "Superseded by a later entry for the same slot"
+
+        slots[slot] = (len(results) - 1, recipe_id)
+        resolved += 1
 
-        # Find or create week plan entry
-        plan = db.query(database.WeekPlan).filter(
-            database.WeekPlan.date == meal_date,
-            database.WeekPlan.person_id == person_id,
-            database.WeekPlan.meal_type == meal.meal_type.lower()
-        ).first()
+    # Classify against what's stored; unchanged slots aren't written
+    rows = []
+    affected_dates = set()
 
-        if plan:
-            plan.recipe_id = recipe_id
+    for slot, (index, recipe_id) in slots.items():
+        result = results[index]
+
+        if slot not in existing:
+            result["status"] = "created"
+        elif existing[slot] != recipe_id:
+            result["status"] = "updated"
         else:
-            plan = database.WeekPlan(
-                date=meal_date,
-                person_id=person_id,
-                meal_type=meal.meal_type.lower(),
-                recipe_id=recipe_id
-            )
-            db.add(plan)
+            result["reason"] = result["reason"] or "Unchanged"
+            continue
 
-        updated_count += 1
+        meal_date, person_id, meal_type = slot
+        rows.append({
+            "date": meal_date,
+            "person_id": person_id,
+            "meal_type": meal_type,
+            "recipe_id": recipe_id
+        })
+        affected_dates.add(meal_date)
+
+    if rows:
+        stmt = sqlite_insert(database.WeekPlan)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["date", "person_id", "meal_type"],
+            set_={"recipe_id": stmt.excluded.recipe_id}
+        )
+        db.execute(stmt, rows)
 
-    db.commit()
+        aggregates.refresh_daily_totals(db, affected_dates)
+        db.commit()
+        cache.bump_data_version()
 
-    return {"message": f"Updated {updated_count} meal selections"}
+    created = sum(1 for r in results if r["status"] == "created")
+    updated = sum(1 for r in results if r["status"] == "updated")
+    skipped = len(results) - created - updated
+
+    return {
+        "message": f"Updated {resolved} meal selections",
+        "created": created,
+        "updated": updated,
+        "skipped": skipped,
+        "results": results
+    }
+
+
+@app.post("/week-plan/auto-generate", response_model=models.AutoPlanResponse)
+async def auto_generate_week_plan(options: models.AutoPlanRequest, db=Depends(database.get_session)):
+    """
+    Fill the week's open slots from the recipe catalogue so each person
+    lands in their daily kcal/protein ranges and the week stays under
+    max_week_cost. Returns a preview unless apply is set.
+    """
+    try:
+        return await database.run_db(db, apply_auto_plan, options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def apply_auto_plan(db: Session, options: models.AutoPlanRequest) -> dict:
+    """Generate a plan and optionally write it as a bulk update (sync)"""
+    plan = planner.generate_week_plan(db, options)
+
+    if options.apply and plan["meals"]:
+        apply_week_plan_update(db, models.BulkMealUpdate(week_start=plan["week_start"], meals=plan["meals"]))
+        plan["applied"] = True
+
+    return plan
 
 
 # ============================================================================
@@ -291,75 +761,148 @@ def list_snacks(db: Session = Depends(database.get_db)):
 
 @app.post("/snacks", response_model=models.Snack)
 def create_snack(snack: models.SnackCreate, db: Session = Depends(database.get_db)):
-    """Create new snack item"""
-    db_snack = database.Snack(**snack.dict())
+    """Create new snack item (default_quantity in another unit is converted to the ingredient's)"""
+    fields = snack.dict(exclude={"unit"})
+    if snack.unit:
+        ingredient = db.get(database.Ingredient, snack.ingredient_id)
+        if ingredient is None:
+            raise HTTPException(status_code=400, detail=f"Unknown ingredient id {snack.ingredient_id}")
+        try:
+            fields["default_quantity"] = units.normalize_quantity(snack.default_quantity, snack.unit, ingredient.unit)
+        except units.UnitError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    db_snack = database.Snack(**fields)
     db.add(db_snack)
     db.commit()
+    cache.bump_data_version()
+    cache.invalidate_name_map(database.Snack)
     db.refresh(db_snack)
     return db_snack
 
 
 @app.post("/snack-log/bulk-update")
-def bulk_update_snack_log(update: models.BulkSnackUpdate, db: Session = Depends(database.get_db)):
+async def bulk_update_snack_log(update: models.BulkSnackUpdate, db=Depends(database.get_session)):
     """
     Bulk update snack log from Home Assistant.
-    HA sends all toggle states at once.
+    HA sends all toggle states at once; they're written with a single
+    batched INSERT ... ON CONFLICT DO UPDATE in one transaction.
     """
-    # Map names to IDs
-    people = db.query(database.Person).all()
-    person_map = {p.name.lower(): p.id for p in people}
+    return await database.run_db(db, apply_snack_log_update, update)
+
 
-    snacks = db.query(database.Snack).all()
-    snack_map = {s.name.lower(): s.id for s in snacks}
+def apply_snack_log_update(db: Session, update: models.BulkSnackUpdate) -> dict:
+    """Resolve and upsert a bulk snack update (sync; see bulk_update_snack_log)"""
+    # Map names to IDs (cached between requests)
+    person_map = cache.get_name_map(db, database.Person)
+    snack_map = cache.get_name_map(db, database.Snack)
 
-    updated_count = 0
+    rows = []
+    skipped = []
+    affected_dates = set()
 
     for snack_sel in update.snacks:
         person_id = person_map.get(snack_sel.person.lower())
         snack_id = snack_map.get(snack_sel.snack_name.lower())
 
         if not person_id or not snack_id:
+            skipped.append({
+                "date": snack_sel.date,
+                "person": snack_sel.person,
+                "snack_name": snack_sel.snack_name,
+                "reason": "Unknown person" if not person_id else "Unknown snack"
+            })
             continue
 
-        # Find or create snack log entry
-        log = db.query(database.SnackLog).filter(
-            database.SnackLog.date == snack_sel.date,
-            database.SnackLog.person_id == person_id,
-            database.SnackLog.snack_id == snack_id
-        ).first()
+        rows.append({
+            "date": snack_sel.date,
+            "person_id": person_id,
+            "snack_id": snack_id,
+            "consumed": snack_sel.consumed
+        })
+        affected_dates.add(snack_sel.date)
+
+    if rows:
+        # Repeated entries apply in payload order, so the last toggle wins
+        stmt = sqlite_insert(database.SnackLog)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["date", "person_id", "snack_id"],
+            set_={"consumed": stmt.excluded.consumed}
+        )
+        db.execute(stmt, rows)
 
-        if log:
-            log.consumed = snack_sel.consumed
-        else:
-            log = database.SnackLog(
-                date=snack_sel.date,
-                person_id=person_id,
-                snack_id=snack_id,
-                consumed=snack_sel.consumed
-            )
-            db.add(log)
+        aggregates.refresh_daily_totals(db, affected_dates)
+        db.commit()
+        cache.bump_data_version()
 
-        updated_count += 1
+    return {
+        "message": f"Updated {len(rows)} snack log entries",
+        "skipped": skipped
+    }
 
-    db.commit()
 
-    return {"message": f"Updated {updated_count} snack log entries"}
+# ============================================================================
+# EXPORT ENDPOINTS
+# ============================================================================
+
+@app.get("/export/{table}")
+def export_table(
+    table: str,
+    format: str = "ndjson",
+    start: date = None,
+    end: date = None,
+    after_id: int = None,
+    after_portion_id: int = None
+):
+    """
+    Stream a full table export as NDJSON or CSV.
+    Tables: week_plan, snack_log, ingredients, recipes (one row per portion).
+    Rows are in id order; resume an interrupted export with after_id=<last id>
+    (recipes: after_id=<last id>&after_portion_id=<last portion_id>).
+    start/end filter week_plan and snack_log by date.
+    """
+    if table not in export.EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown export table '{table}'")
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    if (start or end) and not export.is_dated(table):
+        raise HTTPException(status_code=400, detail=f"'{table}' has no date to filter on")
+    if after_portion_id is not None and (after_id is None or not export.has_row_key(table)):
+        raise HTTPException(status_code=400, detail="after_portion_id needs after_id and applies to recipes only")
+
+    headers = {}
+    if format == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="{table}.csv"'
+
+    return StreamingResponse(
+        export.stream_export(table, format, start, end, after_id, after_portion_id),
+        media_type=export.EXPORT_FORMATS[format],
+        headers=headers
+    )
 
 
 # ============================================================================
-# STARTUP
+# IMPORT ENDPOINTS
 # ============================================================================
 
-@app.on_event("startup")
-def startup_event():
-    """Run when API starts"""
-    print("=" * 60)
-    print("🍽️  Meal Planner API Starting")
-    print("=" * 60)
-    database.seed_initial_data()
-    print("✅ API ready at http://localhost:8000")
-    print("📖 Docs available at http://localhost:8000/docs")
-    print("=" * 60)
+@app.post("/import", response_model=models.ImportResponse)
+async def import_data(request: Request, format: str = "ndjson", db=Depends(database.get_session)):
+    """
+    Bulk import ingredients, recipes and portions from an NDJSON or CSV body.
+    Every row has a "type" (ingredient / recipe / portion); portions refer
+    to recipes, ingredients and people by name or id. Rows are written in
+    chunked transactions and rejected rows are reported by line number.
+    """
+    if format not in importer.IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+
+    report = importer.new_report()
+    names = await database.run_db(db, importer.load_name_index)
+
+    async for records in importer.iter_records(request.stream(), format, report["errors"]):
+        await database.run_db(db, importer.import_chunk, records, names, report)
+
+    return importer.finish_report(report)
 
 
 if __name__ == "__main__":
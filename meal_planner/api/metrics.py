@@ -0,0 +1,272 @@
+"""
+Request instrumentation for the meal planner API.
+- Per-route latency histograms and request counts
+- Number and duration of SQL statements per request (engine events)
+- Prometheus text format for /metrics
+- ?profile=1: a cProfile breakdown of that one request instead of its body
+  (only with MEAL_PLANNER_PROFILING=1; one profiled request at a time)
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Set MEAL_PLANNER_PROFILING=1 to honour ?profile=1 (off by default: anyone
+# who can reach the API could otherwise make it profile every request)
+PROFILING_ENABLED = os.environ.get("MEAL_PLANNER_PROFILING", "0") != "0"
+
+# Lines of cProfile output returned for ?profile=1
+PROFILE_LINES = 40
+
+# Stats for the request being handled: {"queries", "query_seconds", "profiles"}
+_current: ContextVar[Optional[Dict]] = ContextVar("meal_planner_request", default=None)
+
+_lock = threading.Lock()
+
+# Profiled requests run one at a time: a profiler on the event loop thread
+# would also record any other profiled request interleaved with it
+_profile_lock = asyncio.Lock()
+
+# {(metric name, labels): {"buckets": [...], "sum": float, "count": int}}
+_histograms: Dict[Tuple[str, Tuple], Dict] = {}
+
+# {(metric name, labels): count}
+_counters: Dict[Tuple[str, Tuple], int] = {}
+
+HELP = {
+    "meal_planner_requests_total": ("counter", "Requests handled, by route and status"),
+    "meal_planner_request_duration_seconds": ("histogram", "Request latency by route"),
+    "meal_planner_request_sql_queries": ("histogram", "SQL statements executed per request"),
+    "meal_planner_request_sql_seconds": ("histogram", "Time spent in SQL per request"),
+}
+
+HISTOGRAM_BUCKETS = {
+    "meal_planner_request_duration_seconds": LATENCY_BUCKETS,
+    "meal_planner_request_sql_queries": QUERY_COUNT_BUCKETS,
+    "meal_planner_request_sql_seconds": LATENCY_BUCKETS,
+}
+
+
+# ============================================================================
+# SQL STATEMENT TIMING (Every engine, sync or the async engines' sync side)
+# ============================================================================
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get("query_start_time")
+    if stats is None or not starts:
+        return
+
+    stats["queries"] += 1
+    stats["query_seconds"] += time.perf_counter() - starts.pop()
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the SQL statements run inside the block, e.g. around a direct
+    function call or an in-process request. Yields the stats dict.
+    """
+    stats = {"queries": 0, "query_seconds": 0.0, "profiles": None}
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+def _observe(name: str, labels: Tuple, value: float):
+    buckets = HISTOGRAM_BUCKETS[name]
+    histogram = _histograms.get((name, labels))
+    if histogram is None:
+        histogram = _histograms[(name, labels)] = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            histogram["buckets"][i] += 1
+    histogram["sum"] += value
+    histogram["count"] += 1
+
+
+def record_request(method: str, route: str, status: int, seconds: float, stats: Dict):
+    """Add one finished request to the metrics"""
+    labels = (("method", method), ("route", route))
+
+    with _lock:
+        key = ("meal_planner_requests_total", labels + (("status", str(status)),))
+        _counters[key] = _counters.get(key, 0) + 1
+        _observe("meal_planner_request_duration_seconds", labels, seconds)
+        _observe("meal_planner_request_sql_queries", labels, stats["queries"])
+        _observe("meal_planner_request_sql_seconds", labels, stats["query_seconds"])
+
+
+def _format_labels(labels: Tuple, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return str(int(bound)) if float(bound).is_integer() else str(bound)
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: {**value, "buckets": list(value["buckets"])} for key, value in _histograms.items()}
+
+    lines = []
+    for name, (kind, help_text) in HELP.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            continue
+
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            bounds = [_format_bound(bound) for bound in HISTOGRAM_BUCKETS[name]] + ["+Inf"]
+            for bound, count in zip(bounds, histogram["buckets"] + [histogram["count"]]):
+                le = 'le="' + bound + '"'
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# PROFILING
+# ============================================================================
+
+def profiled(fn):
+    """
+    Wrap fn so it's profiled when the current request asked for ?profile=1.
+    For work handed to another thread (the request's own profiler only
+    sees the event loop thread).
+    """
+    stats = _current.get()
+    if stats is None or stats["profiles"] is None:
+        return fn
+
+    def run(*args):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return fn(*args)
+        finally:
+            profiler.disable()
+            stats["profiles"].append(profiler)
+
+    return run
+
+
+def profile_report(method: str, path: str, status: int, seconds: float, stats: Dict, profiles: List[cProfile.Profile]) -> str:
+    """Text breakdown for ?profile=1: timing summary, then top functions by cumulative time"""
+    output = io.StringIO()
+    output.write(f"{method} {path} -> {status}\n")
+    output.write(f"total {seconds * 1000:.1f} ms, {stats['queries']} SQL statements in {stats['query_seconds'] * 1000:.1f} ms\n\n")
+
+    report = pstats.Stats(profiles[0], stream=output)
+    for profile in profiles[1:]:
+        report.add(profile)
+    report.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_LINES)
+
+    return output.getvalue()
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+async def instrument(request, call_next):
+    """
+    Time the request, count its SQL statements and record both per route.
+    Adds a Server-Timing header; with ?profile=1 returns the profile instead.
+    Streaming responses are timed until their headers are sent.
+    """
+    profile = PROFILING_ENABLED and request.query_params.get("profile") == "1"
+    if not profile:
+        return await _instrumented(request, call_next, False)
+
+    async with _profile_lock:
+        return await _instrumented(request, call_next, True)
+
+
+async def _instrumented(request, call_next, profile: bool):
+    """instrument() for one request, profiled or not"""
+    # Imported here so this module stays importable without FastAPI
+    from fastapi.responses import PlainTextResponse
+
+    outer = _current.get()
+    stats = {"queries": 0, "query_seconds": 0.0, "profiles": [] if profile else None}
+    token = _current.set(stats)
+
+    profiler = cProfile.Profile() if profile else None
+    start = time.perf_counter()
+    try:
+        if profiler:
+            profiler.enable()
+        response = await call_next(request)
+    finally:
+        if profiler:
+            profiler.disable()
+        _current.reset(token)
+        if outer is not None:
+            outer["queries"] += stats["queries"]
+            outer["query_seconds"] += stats["query_seconds"]
+
+    seconds = time.perf_counter() - start
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", "unmatched")
+    record_request(request.method, route_path, response.status_code, seconds, stats)
+
+    if profile:
+        report = profile_report(
+            request.method, request.url.path, response.status_code, seconds, stats, [profiler] + stats["profiles"]
+        )
+        return PlainTextResponse(report, headers={"X-Profiled-Status": str(response.status_code)})
+
+    response.headers["Server-Timing"] = (
+        f'app;dur={seconds * 1000:.1f}, '
+        f'db;dur={stats["query_seconds"] * 1000:.1f};desc="{stats["queries"]} queries"'
+    )
+    return response
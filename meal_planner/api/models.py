@@ -4,8 +4,8 @@ These define the structure of data sent to/from the API.
 """
 
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import date
+from typing import Optional, List, Dict
+from datetime import date, datetime
 
 
 # ============================================================================
@@ -31,7 +31,7 @@ class Person(PersonBase):
 
 class IngredientBase(BaseModel):
     name: str
-    unit: str
+    unit: str  # Any registry unit on input ("kg", "tbsp"); stored and returned as its base (g, ml, item)
     cost_per_unit: float = 0.0
     kcal_per_unit: float = 0.0
     protein_per_unit: float = 0.0
@@ -61,6 +61,20 @@ class Ingredient(IngredientBase):
         from_attributes = True
 
 
+class IngredientPriceCreate(BaseModel):
+    """A price that applies from effective_from (today if not given)"""
+    cost_per_unit: float
+    effective_from: Optional[date] = None
+    unit: Optional[str] = None  # Unit the price is per, e.g. "kg"; defaults to the ingredient's
+
+class IngredientPrice(BaseModel):
+    effective_from: date
+    cost_per_unit: float
+    
+    class Config:
+        from_attributes = True
+
+
 # ============================================================================
 # RECIPE MODELS
 # ============================================================================
@@ -71,7 +85,7 @@ class RecipePortionBase(BaseModel):
     quantity: float
 
 class RecipePortionCreate(RecipePortionBase):
-    pass
+    unit: Optional[str] = None  # Unit of quantity, e.g. "tbsp"; defaults to the ingredient's
 
 class RecipePortion(RecipePortionBase):
     id: int
@@ -132,7 +146,7 @@ class SnackBase(BaseModel):
     default_quantity: float
 
 class SnackCreate(SnackBase):
-    pass
+    unit: Optional[str] = None  # Unit of default_quantity; defaults to the ingredient's
 
 class Snack(SnackBase):
     id: int
@@ -187,7 +201,13 @@ class ShoppingItem(BaseModel):
     ingredient: str
     quantity: float
     unit: str
-    cost: float
+    cost: float  # cost_per_unit x quantity
+    
+    # Whole-pack buying (packs is None for loose ingredients)
+    packs: Optional[int] = None
+    spend: Optional[float] = None
+    leftover: Optional[float] = None
+    carried_over: Optional[float] = None  # Covered by Wed leftovers (Sun only)
 
 class WeekTotalsResponse(BaseModel):
     """Complete weekly summary (what HA sensors will read)"""
@@ -202,12 +222,39 @@ class WeekTotalsResponse(BaseModel):
     # Shopping lists
     wed_shopping: List[ShoppingItem]
     sun_shopping: List[ShoppingItem]
+    wed_spend: float = 0.0
+    sun_spend: float = 0.0
     
     # Metadata
     week_start: date
     last_updated: str
 
 
+class PeriodPersonTotals(BaseModel):
+    """Totals for one person over one summary period"""
+    person: str
+    kcal: float
+    protein: float
+    carbs: float
+    fat: float
+    cost: float
+
+class PeriodSummary(BaseModel):
+    """One day/week/month of a range summary"""
+    period: str  # "2026-10-12" (day, or Monday of the week) / "2026-10" (month)
+    cost: float
+    totals: List[PeriodPersonTotals] = []
+    shopping: List[ShoppingItem] = []
+
+class RangeSummaryResponse(BaseModel):
+    """Summary over an arbitrary date range (dashboards, history)"""
+    start: date
+    end: date
+    group: str  # "day", "week", "month"
+    total_cost: float
+    periods: List[PeriodSummary]
+
+
 # ============================================================================
 # BULK UPDATE MODELS (For HA to write back)
 # ============================================================================
@@ -224,6 +271,22 @@ class BulkMealUpdate(BaseModel):
     week_start: date
     meals: List[MealSelection]
 
+class MealSlotResult(BaseModel):
+    """Outcome for one meal selection in a bulk update"""
+    day: str
+    person: str
+    meal_type: str
+    status: str  # "created", "updated", "skipped"
+    reason: Optional[str] = None
+
+class BulkMealUpdateResponse(BaseModel):
+    """Per-slot outcomes of a bulk meal update"""
+    message: str
+    created: int
+    updated: int
+    skipped: int
+    results: List[MealSlotResult]
+
 class SnackSelection(BaseModel):
     """Single snack toggle from HA"""
     date: date
@@ -233,4 +296,117 @@ class SnackSelection(BaseModel):
 
 class BulkSnackUpdate(BaseModel):
     """Batch update from HA - all snack selections"""
-    snacks: List[SnackSelection]
\ No newline at end of file
+    snacks: List[SnackSelection]
+
+# ============================================================================
+# IMPORT MODELS (Bulk loading ingredients and recipes)
+# ============================================================================
+
+class ImportPortion(BaseModel):
+    """One portion row; references can be names or ids"""
+    recipe: Optional[str] = None
+    recipe_id: Optional[int] = None
+    ingredient: Optional[str] = None
+    ingredient_id: Optional[int] = None
+    person: Optional[str] = None
+    person_id: Optional[int] = None
+    quantity: float
+    unit: Optional[str] = None  # Unit of quantity; defaults to the ingredient's
+
+class ImportRecipe(BaseModel):
+    """One recipe row, optionally with its portions inline (NDJSON only)"""
+    name: str
+    meal_type: str
+    portions: List[ImportPortion] = []
+
+class ImportRowError(BaseModel):
+    """A rejected import row (line numbers are 1-based, CSV header included)"""
+    line: int
+    error: str
+
+class ImportResponse(BaseModel):
+    """Outcome of a bulk import"""
+    message: str
+    ingredients_created: int
+    ingredients_updated: int
+    recipes_created: int
+    portions_created: int
+    errors: List[ImportRowError]
+
+
+# ============================================================================
+# AUTO-GENERATE MODELS (Filling the week from the recipe catalogue)
+# ============================================================================
+
+class MacroTargets(BaseModel):
+    """Daily per-person ranges the plan generator aims for"""
+    kcal_min: float = 1800
+    kcal_max: float = 2400
+    protein_min: float = 100
+    protein_max: Optional[float] = None
+
+class AutoPlanRequest(BaseModel):
+    """What to fill and what to aim for"""
+    week_start: Optional[date] = None  # Defaults to the current week
+    people: List[str] = []  # Empty = everyone
+    targets: MacroTargets = MacroTargets()
+    person_targets: Dict[str, MacroTargets] = {}  # Overrides by person name
+    max_week_cost: Optional[float] = None
+    meal_types: List[str] = ["breakfast", "lunch", "dinner"]
+    keep_existing: bool = True  # Only fill empty slots
+    max_repeats: int = 3  # Uses of one recipe per person per week before it's penalized
+    time_limit_ms: int = 500
+    seed: int = 0
+    apply: bool = False  # False = preview only
+
+class AutoPlanDay(BaseModel):
+    """Planned totals for one person on one day"""
+    day: str
+    person: str
+    kcal: float
+    protein: float
+    carbs: float
+    fat: float
+    cost: float
+    on_target: bool
+
+class AutoPlanResponse(BaseModel):
+    """Generated plan (written to the week when apply is set)"""
+    message: str
+    week_start: date
+    week_cost: float
+    within_budget: bool
+    days_on_target: int
+    applied: bool
+    meals: List[MealSelection]
+    unfilled: List[MealSelection] = []
+    days: List[AutoPlanDay]
+
+
+# ============================================================================
+# HOUSEHOLD MODELS (One database per household)
+# ============================================================================
+
+class HouseholdCreate(BaseModel):
+    id: str  # Lowercase letters, digits, "-" and "_"; used in /households/<id>/...
+    people: List[str] = []
+
+class Household(BaseModel):
+    id: str
+
+
+# ============================================================================
+# SNAPSHOT MODELS (week-totals.json for HA)
+# ============================================================================
+
+class SnapshotStatus(BaseModel):
+    """Freshness of the week-totals.json snapshot file"""
+    path: str
+    data_version: int  # Current data version
+    version: Optional[int] = None  # Data version the file was written at
+    week_start: Optional[date] = None
+    written_at: Optional[datetime] = None  # When the file content last changed
+    age_seconds: Optional[float] = None
+    bytes: Optional[int] = None
+    gzip_bytes: Optional[int] = None
+    fresh: bool  # Written at the current data version, today
@@ -0,0 +1,292 @@
+"""
+Automatic week plans.
+- Fills the day x meal x person slot grid from the recipe catalogue
+- Each person-day aims for a kcal and protein range, the week for a cost ceiling
+- Local search over the precomputed recipe vectors (recipe_vectors table)
+"""
+
+from datetime import timedelta
+from typing import Dict
+import time
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import Person, Recipe, RecipeVector, WeekPlan
+import aggregates
+import calculations
+import models
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+KCAL, PROTEIN, CARBS, FAT, COST = range(5)
+
+# Penalty weights: per kcal / g protein outside the daily range, per £ over
+# the ceiling, per £ spent (prefers the cheaper of two equally good plans)
+# and per use of a recipe beyond max_repeats
+KCAL_WEIGHT = 1.0
+PROTEIN_WEIGHT = 10.0
+BUDGET_WEIGHT = 100.0
+SPEND_WEIGHT = 1.0
+REPEAT_WEIGHT = 50.0
+
+# Random restarts without a better plan before giving up early
+MAX_STALE_RESTARTS = 20
+
+
+# ============================================================================
+# PENALTIES
+# ============================================================================
+
+def day_penalty(kcal, protein, target: Dict[str, float]):
+    """Distance of a person-day (or an array of them) from its target ranges"""
+    return (
+        KCAL_WEIGHT * (np.maximum(target["kcal_min"] - kcal, 0) + np.maximum(kcal - target["kcal_max"], 0))
+        + PROTEIN_WEIGHT * (
+            np.maximum(target["protein_min"] - protein, 0) + np.maximum(protein - target["protein_max"], 0)
+        )
+    )
+
+
+def budget_penalty(week_cost, ceiling: float):
+    return BUDGET_WEIGHT * np.maximum(week_cost - ceiling, 0) + SPEND_WEIGHT * week_cost
+
+
+def repeat_penalty(uses, max_repeats: int):
+    return REPEAT_WEIGHT * np.maximum(uses - max_repeats, 0)
+
+
+# ============================================================================
+# GENERATOR
+# ============================================================================
+
+def _target_ranges(targets: models.MacroTargets) -> Dict[str, float]:
+    return {
+        "kcal_min": targets.kcal_min,
+        "kcal_max": targets.kcal_max,
+        "protein_min": targets.protein_min,
+        "protein_max": targets.protein_max if targets.protein_max is not None else np.inf,
+    }
+
+
+def generate_week_plan(db: Session, request: models.AutoPlanRequest) -> Dict:
+    """
+    Choose a recipe for every open slot of the week.
+    Raises ValueError for unknown people. Doesn't write anything; see
+    main.auto_generate_week_plan for applying the result.
+    """
+    # Any day of the week is accepted; the plan always covers Monday to Sunday
+    week_start = calculations.get_week_start(request.week_start)
+    week_end = week_start + timedelta(days=6)
+    meal_types = [meal_type.lower() for meal_type in request.meal_types]
+    rng = np.random.default_rng(request.seed)
+
+    # 1. People and their targets
+    everyone = db.query(Person.id, Person.name).order_by(Person.id).all()
+    if request.people:
+        wanted = {name.lower() for name in request.people}
+        people = [(pid, name) for pid, name in everyone if name.lower() in wanted]
+        unknown = wanted - {name.lower() for _, name in people}
+        if unknown:
+            raise ValueError(f"Unknown people: {', '.join(sorted(unknown))}")
+    else:
+        people = everyone
+
+    overrides = {name.lower(): targets for name, targets in request.person_targets.items()}
+    targets = [_target_ranges(overrides.get(name.lower(), request.targets)) for _, name in people]
+    person_index = {pid: p for p, (pid, _) in enumerate(people)}
+
+    # 2. Candidate recipes per (person, meal type), as rows of one vector matrix
+    vector_rows = db.query(
+        RecipeVector.recipe_id,
+        RecipeVector.person_id,
+        func.lower(Recipe.meal_type),
+        *[getattr(RecipeVector, key) for key in aggregates.TOTAL_COLUMNS]
+    ).join(
+        Recipe, Recipe.id == RecipeVector.recipe_id
+    ).filter(
+        RecipeVector.person_id.in_(list(person_index)),
+        func.lower(Recipe.meal_type).in_(meal_types)
+    ).order_by(RecipeVector.recipe_id).all()
+
+    vectors = np.array([row[3:] for row in vector_rows], dtype=float).reshape(-1, 5)
+    recipe_ids = sorted({row[0] for row in vector_rows})
+    recipe_position = {recipe_id: i for i, recipe_id in enumerate(recipe_ids)}
+    row_recipe = np.array([recipe_position[row[0]] for row in vector_rows], dtype=np.int64)
+
+    candidates = {}
+    for i, (_, person_id, meal_type, *_) in enumerate(vector_rows):
+        candidates.setdefault((person_index[person_id], meal_type), []).append(i)
+    candidates = {key: np.array(rows, dtype=np.int64) for key, rows in candidates.items()}
+
+    # 3. What's already planned stays (unless it's being replanned)
+    totals = np.zeros((len(people), 7, 5))
+    uses = np.zeros((len(people), len(recipe_ids)), dtype=np.int64)
+    base_cost = 0.0
+    fixed = set()
+
+    existing = db.query(WeekPlan.date, WeekPlan.person_id, WeekPlan.meal_type, WeekPlan.recipe_id).filter(
+        WeekPlan.date.between(week_start, week_end),
+        WeekPlan.recipe_id.isnot(None)
+    ).all()
+    existing_vectors = aggregates.get_recipe_vectors(db, {row.recipe_id for row in existing})
+
+    for day_date, person_id, meal_type, recipe_id in existing:
+        p = person_index.get(person_id)
+        replanned = p is not None and meal_type.lower() in meal_types and not request.keep_existing
+        if replanned:
+            continue
+
+        vector = np.array(existing_vectors.get((recipe_id, person_id), (0.0,) * 5))
+        if p is None:
+            base_cost += vector[COST]
+            continue
+
+        d = (day_date - week_start).days
+        totals[p, d] += vector
+        fixed.add((p, d, meal_type.lower()))
+        if recipe_id in recipe_position:
+            uses[p, recipe_position[recipe_id]] += 1
+
+    # 4. Open slots
+    slots = []
+    unfilled = []
+    for d in range(7):
+        for p, (_, name) in enumerate(people):
+            for meal_type in meal_types:
+                if (p, d, meal_type) in fixed:
+                    continue
+                if (p, meal_type) in candidates:
+                    slots.append((p, d, meal_type))
+                else:
+                    unfilled.append({"day": DAYS[d], "person": name, "meal_type": meal_type, "recipe_name": None})
+
+    ceiling = request.max_week_cost if request.max_week_cost is not None else np.inf
+    week_cost = base_cost + totals[:, :, COST].sum()
+    choice = np.full(len(slots), -1, dtype=np.int64)
+
+    def move_deltas(s):
+        """Objective change for every candidate of slot s"""
+        p, d, meal_type = slots[s]
+        rows = candidates[(p, meal_type)]
+        current = choice[s]
+        current_vector = vectors[current] if current >= 0 else np.zeros(5)
+
+        day = totals[p, d] - current_vector
+        new_day = day + vectors[rows]
+        day_delta = (
+            day_penalty(new_day[:, KCAL], new_day[:, PROTEIN], targets[p])
+            - day_penalty(totals[p, d, KCAL], totals[p, d, PROTEIN], targets[p])
+        )
+
+        cost = week_cost - current_vector[COST]
+        cost_delta = budget_penalty(cost + vectors[rows, COST], ceiling) - budget_penalty(week_cost, ceiling)
+
+        recipe_uses = uses[p].copy()
+        repeat_delta = np.zeros(len(rows))
+        if current >= 0:
+            r = row_recipe[current]
+            repeat_delta -= repeat_penalty(recipe_uses[r], request.max_repeats) - repeat_penalty(recipe_uses[r] - 1, request.max_repeats)
+            recipe_uses[r] -= 1
+        new_uses = recipe_uses[row_recipe[rows]]
+        repeat_delta += repeat_penalty(new_uses + 1, request.max_repeats) - repeat_penalty(new_uses, request.max_repeats)
+
+        return rows, day_delta + cost_delta + repeat_delta
+
+    def assign(s, row):
+        nonlocal week_cost
+        p, d, _ = slots[s]
+        current = choice[s]
+        if current >= 0:
+            totals[p, d] -= vectors[current]
+            week_cost -= vectors[current, COST]
+            uses[p, row_recipe[current]] -= 1
+        totals[p, d] += vectors[row]
+        week_cost += vectors[row, COST]
+        uses[p, row_recipe[row]] += 1
+        choice[s] = row
+
+    def objective():
+        score = budget_penalty(week_cost, ceiling) + repeat_penalty(uses, request.max_repeats).sum()
+        for p in range(len(people)):
+            score += day_penalty(totals[p, :, KCAL], totals[p, :, PROTEIN], targets[p]).sum()
+        return float(score)
+
+    # 5. Greedy fill, then first-improvement local search with random restarts
+    for s in range(len(slots)):
+        rows, deltas = move_deltas(s)
+        assign(s, rows[int(np.argmin(deltas))])
+
+    deadline = time.perf_counter() + request.time_limit_ms / 1000
+    best_score, best_choice = objective(), choice.copy()
+    stale = 0
+
+    while slots and time.perf_counter() < deadline and stale < MAX_STALE_RESTARTS:
+        improved = False
+        for s in rng.permutation(len(slots)):
+            rows, deltas = move_deltas(s)
+            best = int(np.argmin(deltas))
+            if deltas[best] < -1e-9:
+                assign(s, rows[best])
+                improved = True
+
+        if improved:
+            continue
+
+        # Local optimum: keep it if it's the best so far, then shake a few slots
+        score = objective()
+        if score < best_score - 1e-9:
+            best_score, best_choice, stale = score, choice.copy(), 0
+        else:
+            stale += 1
+
+        for s in rng.choice(len(slots), size=max(1, len(slots) // 10), replace=False):
+            p, _, meal_type = slots[s]
+            assign(s, rng.choice(candidates[(p, meal_type)]))
+
+    # Restore the best plan found
+    for s, row in enumerate(best_choice):
+        if choice[s] != row:
+            assign(s, row)
+
+    # 6. Report
+    recipe_names = dict(db.query(Recipe.id, Recipe.name).filter(Recipe.id.in_(recipe_ids)).all()) if recipe_ids else {}
+    meals = [
+        {
+            "day": DAYS[d],
+            "person": people[p][1],
+            "meal_type": meal_type,
+            "recipe_name": recipe_names[vector_rows[choice[s]][0]]
+        }
+        for s, (p, d, meal_type) in enumerate(slots)
+    ]
+
+    days = []
+    for d in range(7):
+        for p, (_, name) in enumerate(people):
+            kcal, protein, carbs, fat, cost = totals[p, d]
+            days.append({
+                "day": DAYS[d],
+                "person": name,
+                "kcal": round(float(kcal), 0),
+                "protein": round(float(protein), 1),
+                "carbs": round(float(carbs), 1),
+                "fat": round(float(fat), 1),
+                "cost": round(float(cost), 2),
+                "on_target": bool(day_penalty(kcal, protein, targets[p]) == 0)
+            })
+
+    on_target = sum(1 for day in days if day["on_target"])
+
+    return {
+        "message": f"Planned {len(meals)} meals; {on_target} of {len(days)} person-days on target",
+        "week_start": week_start,
+        "week_cost": round(float(week_cost), 2),
+        "within_budget": bool(week_cost <= ceiling),
+        "days_on_target": on_target,
+        "applied": False,
+        "meals": meals,
+        "unfilled": unfilled,
+        "days": days
+    }
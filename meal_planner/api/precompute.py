@@ -0,0 +1,147 @@
+"""
+Background precompute of week summaries.
+- After writes (debounced) and at midnight, each household's current and
+  next week summaries are computed off the request path and stored in the
+  week-totals cache, so /week-totals is normally a dict lookup
+- The "today" fields roll over at midnight without a request paying for it
+- Change events (events.py) and the week-totals.json snapshot file
+  (snapshots.py) are produced from the fresh summaries
+"""
+
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Set
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+import cache
+import calculations
+import database
+import events
+import snapshots
+
+# Writes within this window are recomputed once
+DEBOUNCE_SECONDS = 0.25
+
+# Weeks after the current one kept precomputed (next week's shopping)
+WEEKS_AHEAD = 1
+
+# Margin after midnight, so date.today() has certainly moved on
+ROLLOVER_SLACK_SECONDS = 1.0
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_changed: Optional[asyncio.Event] = None
+_worker: Optional[asyncio.Task] = None
+
+# Households written to since the worker last ran
+_dirty: Set[str] = set()
+
+
+# ============================================================================
+# PRECOMPUTE
+# ============================================================================
+
+async def precompute_household(household_id: str, today: date):
+    """Store the current and upcoming week summaries of a household, then publish them"""
+    with database.use_household(household_id):
+        version = cache.get_data_version()
+        week_start = calculations.get_week_start(today)
+
+        async with asynccontextmanager(database.get_session)() as db:
+            for offset in range(WEEKS_AHEAD + 1):
+                target_week = week_start + timedelta(weeks=offset)
+                if cache.get_week_totals(target_week, today, version) is None:
+                    summary = await database.run_db(db, calculations.calculate_week_summary, target_week, today)
+                    cache.store_week_totals(target_week, today, version, summary)
+
+        # None if a write landed meanwhile; its own precompute follows
+        summary = cache.get_week_totals(week_start, today, version)
+        if summary is not None:
+            try:
+                await run_in_threadpool(snapshots.write_week_totals, summary, version, week_start, today)
+            except OSError as e:
+                print(f"⚠️  Snapshot write failed for {household_id}: {e}")
+
+        await events.publish_changes()
+
+
+async def _precompute(household_id: str, today: date):
+    try:
+        await precompute_household(household_id, today)
+    except Exception as e:
+        print(f"⚠️  Precompute failed for {household_id}: {e}")
+
+
+def _seconds_until_midnight() -> float:
+    midnight = datetime.combine(date.today() + timedelta(days=1), time.min)
+    return (midnight - datetime.now()).total_seconds() + ROLLOVER_SLACK_SECONDS
+
+
+async def _run():
+    while True:
+        today = date.today()
+        try:
+            await asyncio.wait_for(_changed.wait(), _seconds_until_midnight())
+            await asyncio.sleep(DEBOUNCE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _changed.clear()
+
+        households = set(_dirty)
+        _dirty.clear()
+
+        if date.today() != today:
+            # Day rollover: every household seen so far gets its new "today"
+            households.update(cache.active_households())
+
+        # Concurrently, so one slow household doesn't hold up the others
+        today = date.today()
+        await asyncio.gather(*(_precompute(household_id, today) for household_id in households))
+
+
+def _mark_changed(household_id: str):
+    _dirty.add(household_id)
+    _changed.set()
+
+
+def _on_version_bump(version: int):
+    """cache listener; may be called from threadpool threads"""
+    loop = _loop
+    if loop is None or loop.is_closed():
+        return
+    try:
+        loop.call_soon_threadsafe(_mark_changed, database.current_household())
+    except RuntimeError:
+        # Loop shutting down
+        pass
+
+
+cache.add_version_listener(_on_version_bump)
+
+
+# ============================================================================
+# LIFECYCLE
+# ============================================================================
+
+def start():
+    """Start the worker on the running event loop; the default household is precomputed right away"""
+    global _loop, _changed, _worker
+    _loop = asyncio.get_running_loop()
+    _changed = asyncio.Event()
+    _dirty.clear()
+    events.reset()
+    _worker = _loop.create_task(_run())
+    _mark_changed(database.DEFAULT_HOUSEHOLD)
+
+
+async def stop():
+    global _loop, _worker
+    _loop = None
+    if _worker is not None:
+        _worker.cancel()
+        try:
+            await _worker
+        except asyncio.CancelledError:
+            pass
+        _worker = None
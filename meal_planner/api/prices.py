@@ -0,0 +1,127 @@
+"""
+Ingredient price history.
+- ingredient_prices is append-only: one row per ingredient per price change
+- Costs of past days use the price that applied on that day (as-of)
+- Bulk as-of resolution is a range join against [effective_from, effective_to)
+  rows, not a lookup per portion
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database import IngredientPrice, PRICE_HISTORY_START
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+
+# ============================================================================
+# RANGE JOINS (Bulk as-of resolution)
+# ============================================================================
+
+def price_ranges():
+    """
+    ingredient_prices as validity ranges: each row applies from
+    effective_from until effective_to (the next row; NULL for the current one)
+    """
+    return select(
+        IngredientPrice.ingredient_id,
+        IngredientPrice.cost_per_unit,
+        IngredientPrice.effective_from,
+        func.lead(IngredientPrice.effective_from).over(
+            partition_by=IngredientPrice.ingredient_id,
+            order_by=IngredientPrice.effective_from
+        ).label("effective_to")
+    ).subquery("price_ranges")
+
+
+def as_of(ranges, ingredient_id, day):
+    """Join condition: the range of ingredient_id that covers day"""
+    return and_(
+        ranges.c.ingredient_id == ingredient_id,
+        ranges.c.effective_from <= day,
+        or_(ranges.c.effective_to.is_(None), day < ranges.c.effective_to)
+    )
+
+
+# ============================================================================
+# LOOKUPS AND WRITES
+# ============================================================================
+
+def prices_as_of(db: Session, ingredient_ids: Iterable[int], day: date) -> Dict[int, float]:
+    """{ingredient_id: cost_per_unit on day} (ingredients without history are left out)"""
+    ingredient_ids = list(set(ingredient_ids))
+    prices = {}
+
+    for i in range(0, len(ingredient_ids), CHUNK_SIZE):
+        latest = select(
+            IngredientPrice.ingredient_id,
+            func.max(IngredientPrice.effective_from).label("effective_from")
+        ).filter(
+            IngredientPrice.ingredient_id.in_(ingredient_ids[i:i + CHUNK_SIZE]),
+            IngredientPrice.effective_from <= day
+        ).group_by(IngredientPrice.ingredient_id).subquery()
+
+        rows = db.query(IngredientPrice.ingredient_id, IngredientPrice.cost_per_unit).join(
+            latest,
+            and_(
+                latest.c.ingredient_id == IngredientPrice.ingredient_id,
+                latest.c.effective_from == IngredientPrice.effective_from
+            )
+        ).all()
+        prices.update(rows)
+
+    return prices
+
+
+def record_prices(
+    db: Session,
+    costs: Dict[int, float],
+    effective_from: date = None,
+    previous: Dict[int, float] = None
+) -> List[int]:
+    """
+    Append a price row for each {ingredient_id: cost_per_unit} that differs
+    from the price already in effect (a second change on the same day
+    replaces that day's row). An ingredient without history first gets a
+    row covering all of it, at its previous cost if known, else this one.
+    Returns the ingredient ids whose price changed.
+    """
+    if effective_from is None:
+        effective_from = date.today()
+    previous = previous or {}
+
+    current = prices_as_of(db, costs, effective_from)
+    has_history = set(prices_as_of(db, costs, date.max))
+
+    rows = []
+    for ingredient_id, cost in costs.items():
+        cost = cost or 0.0
+        if ingredient_id not in has_history:
+            first = previous.get(ingredient_id)
+            first = cost if first is None else first
+            rows.append({"ingredient_id": ingredient_id, "effective_from": PRICE_HISTORY_START, "cost_per_unit": first})
+            current[ingredient_id] = first
+        if current.get(ingredient_id) != cost:
+            rows.append({"ingredient_id": ingredient_id, "effective_from": effective_from, "cost_per_unit": cost})
+
+    if rows:
+        stmt = sqlite_insert(IngredientPrice)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["ingredient_id", "effective_from"],
+            set_={"cost_per_unit": stmt.excluded.cost_per_unit}
+        )
+        db.execute(stmt, rows)
+
+    return sorted({row["ingredient_id"] for row in rows})
+
+
+def price_history(db: Session, ingredient_id: int) -> List[IngredientPrice]:
+    """All price rows of one ingredient, oldest first"""
+    return db.query(IngredientPrice).filter(
+        IngredientPrice.ingredient_id == ingredient_id
+    ).order_by(IngredientPrice.effective_from).all()
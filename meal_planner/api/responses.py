@@ -0,0 +1,32 @@
+"""
+Fast JSON responses for the hot endpoints.
+- ORJSONResponse: orjson encodes dicts, dates and numpy scalars directly
+- Opt in with MEAL_PLANNER_FAST_JSON=1
+- Only for dicts the server built itself in the response model's shape,
+  so response_model validation and jsonable_encoder are skipped
+"""
+
+from typing import Any, Dict
+import os
+
+import orjson
+from fastapi.responses import JSONResponse
+
+FAST_JSON = os.environ.get("MEAL_PLANNER_FAST_JSON", "0") == "1"
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def fast_response(content: Any, headers: Dict[str, str] = None) -> ORJSONResponse:
+    """
+    Send content as-is. It must already match the endpoint's response
+    model (field names, and no extra keys that model would drop).
+    """
+    return ORJSONResponse(content, headers=headers)
@@ -0,0 +1,136 @@
+"""
+Week-totals snapshot files for Home Assistant.
+- After every precompute (so after each change, and at midnight) the current
+  week's /week-totals body is written to week-totals.json, plus a gzipped
+  week-totals.json.gz next to it
+- Files are replaced atomically, so a reader never sees a partial write
+- Point MEAL_PLANNER_SNAPSHOT_DIR at /config/www/meal_planner and HA serves
+  them at /local/meal_planner/... with no API work (aiohttp picks the .gz for
+  clients that accept gzip)
+- Unchanged content isn't rewritten (SD cards)
+"""
+
+from datetime import date, datetime
+from typing import Dict, Optional
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import cache
+import database
+
+SNAPSHOT_DIR = os.environ.get(
+    "MEAL_PLANNER_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "data", "snapshots")
+)
+
+FILE_NAME = "week-totals.json"
+
+_lock = threading.Lock()
+
+# {household id: {"version", "week_start", "today", "written_at", "sha256", "bytes", "gzip_bytes"}}
+_written: Dict[str, Dict] = {}
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def snapshot_path(household_id: str = None) -> str:
+    """week-totals.json of a household (the default one at the top level)"""
+    household_id = household_id or database.current_household()
+    if household_id == database.DEFAULT_HOUSEHOLD:
+        return os.path.join(SNAPSHOT_DIR, FILE_NAME)
+    return os.path.join(SNAPSHOT_DIR, "households", household_id, FILE_NAME)
+
+
+def _replace(path: str, data: bytes):
+    """Write data to a temp file beside path, then rename it over path"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_week_totals(summary: Dict, version: int, week_start: date, today: date) -> bool:
+    """
+    Write the current household's snapshot files for a summary computed at
+    version. Returns False if the files already held this content.
+    """
+    household_id = database.current_household()
+    path = snapshot_path(household_id)
+    data = json.dumps(summary, default=str, separators=(",", ":")).encode()
+    digest = hashlib.sha256(data).hexdigest()
+
+    with _lock:
+        previous = _written.get(household_id)
+        if previous is not None and previous["sha256"] == digest and os.path.exists(path):
+            previous.update(version=version, week_start=week_start, today=today)
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = gzip.compress(data, mtime=0)
+
+        # .gz first: whenever the .json is new, its .gz is at least as new
+        _replace(path + ".gz", compressed)
+        _replace(path, data)
+
+        _written[household_id] = {
+            "version": version,
+            "week_start": week_start,
+            "today": today,
+            "written_at": datetime.now().astimezone(),
+            "sha256": digest,
+            "bytes": len(data),
+            "gzip_bytes": len(compressed),
+        }
+
+    return True
+
+
+# ============================================================================
+# FRESHNESS
+# ============================================================================
+
+def status() -> Dict:
+    """Snapshot state of the current household, for GET /snapshot"""
+    household_id = database.current_household()
+    written: Optional[Dict] = _written.get(household_id)
+    version = cache.get_data_version()
+    today = date.today()
+
+    result = {
+        "path": os.path.abspath(snapshot_path(household_id)),
+        "data_version": version,
+        "version": None,
+        "week_start": None,
+        "written_at": None,
+        "age_seconds": None,
+        "bytes": None,
+        "gzip_bytes": None,
+        "fresh": False,
+    }
+    if written is None:
+        return result
+
+    result.update(
+        version=written["version"],
+        week_start=written["week_start"],
+        written_at=written["written_at"],
+        age_seconds=round((datetime.now().astimezone() - written["written_at"]).total_seconds(), 1),
+        bytes=written["bytes"],
+        gzip_bytes=written["gzip_bytes"],
+        # Stale while a write or the day rollover is waiting to be precomputed
+        fresh=written["version"] == version and written["today"] == today,
+    )
+    return result
@@ -0,0 +1,77 @@
+"""
+Shared test fixtures.
+Every test runs against throwaway SQLite databases seeded with the
+benchmark's synthetic households; the real mealplanner.db is never touched.
+
+Run from meal_planner/api:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, List
+
+import pytest
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+# Keep side effects of the app inside a temp dir
+_SCRATCH = tempfile.mkdtemp(prefix="meal-planner-tests-")
+os.environ.setdefault("MEAL_PLANNER_HOUSEHOLDS_DIR", os.path.join(_SCRATCH, "households"))
+os.environ.setdefault("MEAL_PLANNER_SNAPSHOT_DIR", os.path.join(_SCRATCH, "snapshots"))
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import benchmark
+import database
+
+
+@contextmanager
+def count_statements():
+    """Collect every SQL statement any engine runs inside the block"""
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def seed_app(tmp_path):
+    """
+    Factory: seed a fresh database with benchmark.seed_database(**sizes),
+    point the app at it and return (main.app, first Monday seeded).
+    """
+    opened: Dict[str, int] = {"count": 0}
+
+    def seed(**sizes):
+        opened["count"] += 1
+        path = str(tmp_path / f"household-{opened['count']}.db")
+        bind = benchmark.make_engine(path)
+        benchmark.create_schema(bind)
+        first_monday = benchmark.seed_database(bind, **sizes)
+        bind.dispose()
+        return benchmark.load_app(path), first_monday
+
+    yield seed
+    database.engine.dispose()
+
+
+@pytest.fixture
+def empty_app(tmp_path):
+    """The app on a fresh, empty database (schema only)"""
+    path = str(tmp_path / "empty.db")
+    bind = benchmark.make_engine(path)
+    benchmark.create_schema(bind)
+    bind.dispose()
+    yield benchmark.load_app(path)
+    database.engine.dispose()
@@ -0,0 +1,47 @@
+"""
+Bulk week-plan updates: message counts every resolved meal (as it always
+has); created / updated / skipped break down what was actually written.
+"""
+
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import calculations
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+@pytest.fixture
+def client(seed_app):
+    app, _ = seed_app(people=2, ingredients=40, recipes=12, snacks=1, weeks=1)
+    return TestClient(app)
+
+
+def bulk_update(client, week_start, meals):
+    response = client.post("/week-plan/bulk-update", json={"week_start": week_start.isoformat(), "meals": meals})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_message_counts_every_resolved_meal(client):
+    week_start = calculations.get_week_start() + timedelta(weeks=1)
+    meals = [
+        {"day": day, "person": "person 1", "meal_type": "dinner", "recipe_name": "Recipe 3"}
+        for day in DAYS
+    ]
+
+    first = bulk_update(client, week_start, meals)
+    assert first["message"] == "Updated 7 meal selections"
+    assert (first["created"], first["updated"], first["skipped"]) == (7, 0, 0)
+
+    # Same week again, plus one change, an unknown recipe and an unknown person
+    meals[0]["recipe_name"] = "Recipe 6"
+    meals.append({"day": "tue", "person": "person 2", "meal_type": "dinner", "recipe_name": "Nope"})
+    meals.append({"day": "tue", "person": "nobody", "meal_type": "dinner", "recipe_name": "Recipe 3"})
+
+    second = bulk_update(client, week_start, meals)
+    assert second["message"] == "Updated 8 meal selections"
+    assert (second["created"], second["updated"], second["skipped"]) == (1, 1, 7)
+    assert [result["status"] for result in second["results"]].count("skipped") == 7
@@ -0,0 +1,60 @@
+"""
+Exports resume exactly where an interrupted download stopped, including
+part way through a recipe's portions.
+"""
+
+import csv
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(seed_app):
+    app, _ = seed_app(people=3, ingredients=60, recipes=20, snacks=4, weeks=2)
+    return TestClient(app)
+
+
+def ndjson(response):
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_recipes_resume_mid_recipe(client):
+    rows = ndjson(client.get("/export/recipes"))
+
+    # Cut off after the first portion of a recipe that has more
+    cut = next(i for i, row in enumerate(rows) if rows[i + 1]["id"] == row["id"])
+    last = rows[cut]
+
+    resumed = ndjson(client.get("/export/recipes", params={
+        "after_id": last["id"], "after_portion_id": last["portion_id"],
+    }))
+    assert rows[:cut + 1] + resumed == rows
+
+
+def test_recipes_resume_in_csv(client):
+    full = list(csv.DictReader(io.StringIO(client.get("/export/recipes", params={"format": "csv"}).text)))
+    last = full[10]
+
+    response = client.get("/export/recipes", params={
+        "format": "csv", "after_id": last["id"], "after_portion_id": last["portion_id"],
+    })
+    assert full[:11] + list(csv.DictReader(io.StringIO(response.text))) == full
+
+
+def test_week_plan_resumes_by_id(client):
+    rows = ndjson(client.get("/export/week_plan"))
+    resumed = ndjson(client.get("/export/week_plan", params={"after_id": rows[99]["id"]}))
+    assert rows[:100] + resumed == rows
+
+
+@pytest.mark.parametrize("params", [
+    {"after_portion_id": 5},
+    {"after_id": 1, "after_portion_id": 5, "table": "week_plan"},
+])
+def test_after_portion_id_needs_after_id_on_recipes(client, params):
+    table = params.pop("table", "recipes")
+    assert client.get(f"/export/{table}", params=params).status_code == 400
@@ -0,0 +1,123 @@
+"""
+Household databases are brought up to date when first opened (aggregates
+included, once, by migration), and opening one never blocks the others.
+"""
+
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import benchmark
+import database
+from conftest import count_statements
+
+
+@pytest.fixture
+def household_file():
+    """Factory: path of a fresh household database file; closed and removed afterwards"""
+    paths = []
+
+    def make(household_id: str) -> str:
+        path = database.household_path(household_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        paths.append(path)
+        return path
+
+    yield make
+    database.close_households()
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def test_aggregates_are_backfilled_when_a_legacy_household_is_opened(empty_app, household_file):
+    path = household_file("backfill")
+
+    # A file from before migration 4: plans and portions, no aggregates
+    bind = benchmark.make_engine(path)
+    benchmark.create_schema(bind)
+    benchmark.seed_database(bind, people=2, ingredients=60, recipes=30, snacks=5, weeks=2)
+    with bind.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM recipe_vectors")
+        conn.exec_driver_sql("DELETE FROM daily_person_totals")
+        conn.exec_driver_sql("PRAGMA user_version = 3")
+    bind.dispose()
+
+    client = TestClient(empty_app)
+    summary = client.get("/households/backfill/week-totals").json()
+    assert len(summary["week_totals"]) == 2
+    assert all(person["kcal"] > 0 for person in summary["week_totals"])
+    assert summary["week_cost"] > 0
+
+    with database.use_household("backfill"):
+        db = database.session_factory()()
+        try:
+            assert db.query(database.DailyPersonTotals).count() > 0
+        finally:
+            db.close()
+
+
+def test_reopening_a_household_without_history_does_not_rebuild(empty_app, household_file):
+    household_file("quiet")
+    assert database.create_household("quiet", ["Ann"])
+    database.close_households()
+
+    with count_statements() as statements:
+        with database.use_household("quiet"):
+            database.session_factory()
+
+    assert statements, "reopening should at least read user_version"
+    rebuilds = [
+        sql for sql in statements
+        if sql.lstrip().upper().startswith(("DELETE", "INSERT")) and ("recipe_vectors" in sql or "daily_person_totals" in sql)
+    ]
+    assert not rebuilds
+
+
+def test_a_slow_open_does_not_block_other_households(empty_app, household_file, monkeypatch):
+    household_file("cached")
+    household_file("slow")
+    assert database.create_household("cached", ["Ann"])
+    assert database.create_household("slow", ["Bob"])
+    database.close_households()
+
+    with database.use_household("cached"):
+        database.session_factory()
+
+    started, release = threading.Event(), threading.Event()
+    run_migrations = database.run_migrations
+
+    def slow_migrations(bind):
+        if bind.url.database.endswith("slow.db"):
+            started.set()
+            release.wait(10)
+        run_migrations(bind)
+
+    monkeypatch.setattr(database, "run_migrations", slow_migrations)
+
+    def open_slow():
+        with database.use_household("slow"):
+            database.session_factory()
+
+    opener = threading.Thread(target=open_slow)
+    opener.start()
+    try:
+        assert started.wait(5)
+
+        # The cached household is served while "slow" is still migrating
+        done = threading.Event()
+
+        def open_cached():
+            with database.use_household("cached"):
+                database.session_factory()
+            done.set()
+
+        threading.Thread(target=open_cached).start()
+        assert done.wait(2), "cached household waited on another household's open"
+    finally:
+        release.set()
+        opener.join(10)
+
+    assert "slow" in database._households
@@ -0,0 +1,165 @@
+"""
+Bulk import: rows for existing ingredients change only the fields they
+give, in the ingredient's stored base unit, and re-total only the days
+those fields affect.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import aggregates
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+@pytest.fixture
+def client(empty_app):
+    client = TestClient(empty_app)
+    response = client.post("/ingredients", json={
+        "name": "Flour", "unit": "kg", "cost_per_unit": 1.2, "kcal_per_unit": 3640.0,
+        "pack_size": 1.5, "pack_cost": 1.8,
+    })
+    assert response.status_code == 200, response.text
+    return client
+
+
+def import_csv(client, body: str):
+    response = client.post("/import", params={"format": "csv"}, content=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def flour(client):
+    (ingredient,) = client.get("/ingredients").json()
+    return ingredient
+
+
+def test_blank_cells_keep_stored_values(client):
+    report = import_csv(client, (
+        "type,name,unit,cost_per_unit,kcal_per_unit,pack_size,pack_cost\n"
+        "ingredient,Flour,,,3500,,\n"
+    ))
+    assert report["ingredients_updated"] == 1
+    assert report["errors"] == []
+
+    stored = flour(client)
+    assert stored["unit"] == "g"
+    assert stored["kcal_per_unit"] == pytest.approx(3500.0)  # Per g: no unit given, so it's the stored one
+    assert stored["cost_per_unit"] == pytest.approx(0.0012)
+    assert stored["pack_size"] == pytest.approx(1500.0)
+    assert stored["pack_cost"] == pytest.approx(1.8)
+
+
+def test_values_with_a_unit_are_converted(client):
+    report = import_csv(client, "type,name,unit,cost_per_unit\ningredient,Flour,kg,2.0\n")
+    assert report["ingredients_updated"] == 1
+
+    stored = flour(client)
+    assert stored["unit"] == "g"
+    assert stored["cost_per_unit"] == pytest.approx(0.002)
+    assert stored["kcal_per_unit"] == pytest.approx(3.64)
+    assert stored["pack_size"] == pytest.approx(1500.0)
+
+    history = client.get(f"/ingredients/{stored['id']}/prices").json()
+    assert [price["cost_per_unit"] for price in history] == pytest.approx([0.0012, 0.002])
+
+
+def test_unit_in_another_dimension_is_rejected(client):
+    report = import_csv(client, "type,name,unit,cost_per_unit\ningredient,Flour,ml,2.0\n")
+    assert report["ingredients_updated"] == 0
+    assert [error["line"] for error in report["errors"]] == [2]
+    assert flour(client)["cost_per_unit"] == pytest.approx(0.0012)
+
+
+
+def test_repeated_ingredient_is_rejected(client):
+    report = import_csv(client, (
+        "type,name,unit,cost_per_unit\n"
+        "ingredient,Rice,g,0.002\n"
+        "ingredient,rice,g,0.003\n"
+        "ingredient,Flour,,0.002\n"
+        "ingredient,FLOUR,,0.003\n"
+    ))
+    assert report["ingredients_created"] == 1
+    assert report["ingredients_updated"] == 1
+    assert report["errors"] == [
+        {"line": 3, "error": "Ingredient 'rice' already given on line 2"},
+        {"line": 5, "error": "Ingredient 'FLOUR' already given on line 4"},
+    ]
+
+    stored = {ingredient["name"]: ingredient for ingredient in client.get("/ingredients").json()}
+    assert stored["Rice"]["cost_per_unit"] == pytest.approx(0.002)
+    assert stored["Flour"]["cost_per_unit"] == pytest.approx(0.002)
+
+
+
+def test_quoted_fields_may_span_lines(client):
+    report = import_csv(client, (
+        "type,name,unit,cost_per_unit\n"
+        'ingredient,"Crème\nfraîche",ml,0.01\n'
+        "\n"
+        'ingredient,"Salt, ""flaky""",g,0.005\n'
+        "ingredient,Pepper,g,0.02,extra\n"
+        'ingredient,"Sugar\n\n(caster)",g,0.003\n'
+        "ingredient,Rice,,0.002\n"
+    ))
+    assert report["ingredients_created"] == 3
+    assert [error["line"] for error in report["errors"]] == [6, 10]
+
+    names = {ingredient["name"] for ingredient in client.get("/ingredients").json()}
+    assert names == {"Flour", "Crème\nfraîche", 'Salt, "flaky"', "Sugar\n\n(caster)"}
+
+
+def test_inline_portions_import(client):
+    client.post("/people", json={"name": "Ann"})
+    body = (
+        '{"type": "recipe", "name": "Bread", "meal_type": "lunch", "portions": '
+        '[{"ingredient": "Flour", "person": "Ann", "quantity": 0.2, "unit": "kg"}]}\n'
+    )
+    response = client.post("/import", content=body)
+    assert response.json()["portions_created"] == 1
+
+    (recipe,) = client.get("/recipes").json()
+    assert recipe["portions"][0]["quantity"] == pytest.approx(200.0)
+
+
+@pytest.fixture
+def planned_bread(client):
+    """Bread (made of flour) planned for lunch a week ago and today"""
+    person = client.post("/people", json={"name": "Ann"}).json()
+    client.post("/recipes", json={
+        "name": "Bread",
+        "meal_type": "lunch",
+        "portions": [{"ingredient_id": flour(client)["id"], "person_id": person["id"], "quantity": 200}],
+    })
+    today = date.today()
+    for day in (today - timedelta(days=7), today):
+        response = client.post("/week-plan/bulk-update", json={
+            "week_start": (day - timedelta(days=day.weekday())).isoformat(),
+            "meals": [{"day": DAYS[day.weekday()], "person": "ann", "meal_type": "lunch", "recipe_name": "Bread"}],
+        })
+        assert response.status_code == 200, response.text
+    return today - timedelta(days=7), today
+
+
+@pytest.mark.parametrize("body, refreshed", [
+    ("type,name,pack_size\ningredient,Flour,1000\n", "none"),
+    ("type,name,cost_per_unit\ningredient,Flour,2.0\n", "from today"),
+    ("type,name,kcal_per_unit\ningredient,Flour,3500\n", "all"),
+])
+def test_updates_refresh_only_the_days_they_change(client, planned_bread, monkeypatch, body, refreshed):
+    past, today = planned_bread
+    days = []
+    refresh_daily_totals = aggregates.refresh_daily_totals
+
+    def recording(db, dates):
+        dates = set(dates)
+        days.extend(dates)
+        refresh_daily_totals(db, dates)
+
+    monkeypatch.setattr(aggregates, "refresh_daily_totals", recording)
+    assert import_csv(client, body)["ingredients_updated"] == 1
+
+    assert set(days) == {"none": set(), "from today": {today}, "all": {past, today}}[refreshed]
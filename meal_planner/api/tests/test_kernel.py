@@ -0,0 +1,82 @@
+"""
+The NumPy kernel reproduces the row-based calculations from source rows,
+costing every day at the prices in effect that day.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+import benchmark
+import calculations
+import database
+import kernel
+
+FLOAT_NOISE = 1e-6
+
+
+@pytest.fixture
+def priced_household(tmp_path):
+    """A seeded household whose prices change halfway through: (session, first Monday, change day)"""
+    bind = benchmark.make_engine(str(tmp_path / "kernel.db"))
+    benchmark.create_schema(bind)
+    first_monday = benchmark.seed_database(bind, people=3, ingredients=150, recipes=60, snacks=8, weeks=6)
+    changed_on = benchmark.seed_price_changes(bind, first_monday, weeks=6, share=0.5)
+
+    db = database.sessionmaker(bind=bind)()
+    yield db, first_monday, changed_on
+    db.close()
+    bind.dispose()
+
+
+def test_daily_totals_match_the_materialized_totals(priced_household):
+    db, first_monday, changed_on = priced_household
+
+    expected = {
+        (row.date, row.person_id): {key: getattr(row, key) for key in kernel.COLUMNS}
+        for row in db.query(database.DailyPersonTotals).all()
+    }
+    actual = kernel.daily_totals(db)
+
+    assert actual.keys() == expected.keys()
+    for key, values in expected.items():
+        assert actual[key] == pytest.approx(values, abs=FLOAT_NOISE), key
+
+
+def test_days_before_a_price_change_keep_the_old_price(priced_household):
+    db, first_monday, changed_on = priced_household
+    before = changed_on - timedelta(days=1)
+
+    kernel_costs = {key: values["cost"] for key, values in kernel.daily_totals(db, before, changed_on).items()}
+    history_costs = {
+        key: values["cost"]
+        for key, values in benchmark.history_totals(db, [before, changed_on]).items()
+    }
+    assert kernel_costs == pytest.approx(history_costs, abs=FLOAT_NOISE)
+
+    # Priced at today's cost_per_unit instead, the day before would differ
+    current = database.Ingredient.cost_per_unit
+    today_prices = dict(db.query(database.Ingredient.id, current).all())
+    portions = db.query(
+        database.WeekPlan.person_id, database.RecipePortion.ingredient_id, database.RecipePortion.quantity
+    ).join(
+        database.RecipePortion,
+        (database.RecipePortion.recipe_id == database.WeekPlan.recipe_id)
+        & (database.RecipePortion.person_id == database.WeekPlan.person_id)
+    ).filter(database.WeekPlan.date == before).all()
+    at_today_prices = sum(quantity * today_prices[ingredient_id] for _, ingredient_id, quantity in portions)
+    day_cost = sum(cost for (day, _), cost in kernel_costs.items() if day == before)
+    assert day_cost != pytest.approx(at_today_prices, abs=0.01)
+
+
+@pytest.mark.parametrize("week", ["current", "price change"])
+def test_week_summary_matches_calculate_week_summary(priced_household, week):
+    db, first_monday, changed_on = priced_household
+    today = date.today()
+    week_start = calculations.get_week_start() if week == "current" else changed_on - timedelta(days=changed_on.weekday())
+
+    expected = calculations.calculate_week_summary(db, week_start, today)
+    actual = kernel.week_summary(db, week_start, today)
+
+    assert benchmark._matches(expected, actual), (expected, actual)
+    assert actual["week_totals"] and actual["week_cost"] > 0
@@ -0,0 +1,23 @@
+"""
+Startup seeds the default household and starts the precompute worker;
+shutdown stops it and closes household databases.
+"""
+
+from fastapi.testclient import TestClient
+
+import database
+import precompute
+
+
+def test_startup_and_shutdown(empty_app):
+    with TestClient(empty_app) as client:
+        people = [person["name"] for person in client.get("/people").json()]
+        assert people == database.DEFAULT_PEOPLE
+        assert precompute._worker is not None and not precompute._worker.done()
+
+        assert client.post("/households", json={"id": "lifespan", "people": ["Ann"]}).status_code == 201
+        assert client.get("/households/lifespan/people").status_code == 200
+        assert database._households
+
+    assert precompute._worker is None
+    assert not database._households
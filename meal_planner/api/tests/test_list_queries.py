@@ -0,0 +1,56 @@
+"""
+List endpoints run the same number of SQL statements whatever the size of
+the catalogue (no per-recipe or per-portion lookups).
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import count_statements
+
+CATALOGUES = [
+    {"people": 2, "recipes": 20, "ingredients": 50, "weeks": 1},
+    {"people": 6, "recipes": 400, "ingredients": 300, "weeks": 1},
+]
+
+URLS = [
+    "/ingredients",
+    "/recipes",
+    "/recipes?meal_type=dinner",
+    "/recipes?limit=10&offset=5",
+    "/recipes?fields=id,name",
+]
+
+
+def list_statements(seed_app, sizes):
+    """{url: (statements, rows returned)} for one catalogue size"""
+    app, _ = seed_app(**sizes)
+    client = TestClient(app)
+
+    results = {}
+    for url in URLS:
+        with count_statements() as statements:
+            response = client.get(url)
+        assert response.status_code == 200, response.text
+        results[url] = (statements, len(response.json()))
+    return results
+
+
+def test_list_statement_counts_do_not_grow_with_the_catalogue(seed_app):
+    small, large = (list_statements(seed_app, sizes) for sizes in CATALOGUES)
+
+    for url in URLS:
+        small_statements, small_rows = small[url]
+        large_statements, large_rows = large[url]
+        if "limit" not in url:
+            assert large_rows > small_rows, url
+        assert len(small_statements) == len(large_statements), (
+            f"{url}: {len(small_statements)} vs {len(large_statements)} statements\n"
+            + "\n".join(large_statements)
+        )
+
+
+@pytest.mark.parametrize("url", ["/recipes", "/ingredients"])
+def test_list_statements_are_few(seed_app, url):
+    statements, _ = list_statements(seed_app, CATALOGUES[-1])[url]
+    assert len(statements) <= 3, "\n".join(statements)
@@ -0,0 +1,57 @@
+"""
+?profile=1 is off unless MEAL_PLANNER_PROFILING=1, and profiled requests
+never overlap.
+"""
+
+import asyncio
+import os
+
+import httpx
+import pytest
+
+import metrics
+
+
+@pytest.mark.skipif("MEAL_PLANNER_PROFILING" in os.environ, reason="MEAL_PLANNER_PROFILING is set")
+def test_profiling_is_off_by_default(empty_app):
+    assert metrics.PROFILING_ENABLED is False
+
+    async def get():
+        transport = httpx.ASGITransport(app=empty_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ingredients", params={"profile": "1"})
+
+    response = asyncio.run(get())
+    assert response.status_code == 200
+    assert response.json() == []
+    assert "Server-Timing" in response.headers
+
+
+def test_profiled_requests_run_one_at_a_time(empty_app, monkeypatch):
+    monkeypatch.setattr(metrics, "PROFILING_ENABLED", True)
+
+    active = {"now": 0, "most": 0}
+    instrumented = metrics._instrumented
+
+    async def counting(request, call_next, profile):
+        active["now"] += 1
+        active["most"] = max(active["most"], active["now"])
+        try:
+            await asyncio.sleep(0.01)
+            return await instrumented(request, call_next, profile)
+        finally:
+            active["now"] -= 1
+
+    monkeypatch.setattr(metrics, "_instrumented", counting)
+
+    async def profile_many():
+        transport = httpx.ASGITransport(app=empty_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.get("/ingredients", params={"profile": "1"}) for _ in range(4)
+            ])
+
+    responses = asyncio.run(profile_many())
+    assert [response.status_code for response in responses] == [200] * 4
+    assert all("SQL statements" in response.text for response in responses)
+    assert active["most"] == 1
@@ -0,0 +1,34 @@
+"""
+Auto-generated plans always cover Monday to Sunday of the week asked for.
+"""
+
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+
+import calculations
+import database
+
+
+def test_mid_week_start_plans_the_whole_week(seed_app):
+    app, _ = seed_app(people=2, ingredients=80, recipes=60, snacks=2, weeks=1)
+    monday = calculations.get_week_start() + timedelta(weeks=2)
+    wednesday = monday + timedelta(days=2)
+
+    response = TestClient(app).post("/week-plan/auto-generate", json={
+        "week_start": wednesday.isoformat(), "apply": True, "time_limit_ms": 50,
+    })
+    assert response.status_code == 200, response.text
+
+    plan = response.json()
+    assert plan["week_start"] == monday.isoformat()
+    assert plan["applied"]
+    assert len(plan["meals"]) == 2 * 3 * 7
+
+    db = database.SessionLocal()
+    try:
+        dates = [row.date for row in db.query(database.WeekPlan.date).filter(database.WeekPlan.date >= monday)]
+    finally:
+        db.close()
+    assert len(dates) == 2 * 3 * 7
+    assert min(dates) == monday and max(dates) == monday + timedelta(days=6)
@@ -0,0 +1,32 @@
+"""
+Both ways of getting a batch shopping list agree, and neither runs
+per-meal or per-ingredient queries.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+import calculations
+import database
+from conftest import count_statements
+
+
+@pytest.mark.parametrize("weeks_back", [0, 1, 3])
+def test_batch_list_matches_week_summary(seed_app, weeks_back):
+    seed_app(people=4, weeks=4, recipes=60, ingredients=80)
+    week_start = calculations.get_week_start() - timedelta(weeks=weeks_back)
+
+    db = database.SessionLocal()
+    try:
+        summary = calculations.calculate_week_summary(db, week_start, date.today())
+        for batch in ("wed", "sun"):
+            with count_statements() as statements:
+                items = calculations.generate_shopping_list(db, week_start, batch)
+            assert items == summary[f"{batch}_shopping"]
+            assert len(statements) == 1, "\n".join(statements)
+    finally:
+        db.close()
+
+    assert any(item["packs"] for item in summary["wed_shopping"] + summary["sun_shopping"])
+    assert any(item["carried_over"] for item in summary["sun_shopping"])
@@ -0,0 +1,99 @@
+"""
+/summary over ~3 years of history: every day / week / month period adds up
+to the same totals as calculate_daily_totals and calculate_daily_cost for
+its days, including across price changes.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import calculations
+import database
+from calculations import NUTRIENTS
+
+WEEKS = 156
+
+# /summary rounds kcal to whole numbers and the rest to 1 decimal (plus float noise)
+TOLERANCE = {"kcal": 0.5, "protein": 0.05, "carbs": 0.05, "fat": 0.05}
+FLOAT_NOISE = 1e-6
+
+
+def period_of(day: date, group: str) -> str:
+    if group == "day":
+        return day.isoformat()
+    if group == "week":
+        return calculations.get_week_start(day).isoformat()
+    return day.strftime("%Y-%m")
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory):
+    """Three years of plans, with a price change part-way through, and the per-day expectations"""
+    import benchmark
+
+    path = str(tmp_path_factory.mktemp("summary") / "history.db")
+    bind = benchmark.make_engine(path)
+    benchmark.create_schema(bind)
+    first_monday = benchmark.seed_database(bind, people=2, ingredients=60, recipes=30, snacks=3, weeks=WEEKS)
+    bind.dispose()
+
+    app = benchmark.load_app(path)
+    client = TestClient(app)
+    for ingredient_id in range(1, 61, 3):
+        response = client.post(f"/ingredients/{ingredient_id}/prices", json={
+            "cost_per_unit": 0.05, "effective_from": (first_monday + timedelta(weeks=WEEKS // 2)).isoformat(),
+        })
+        assert response.status_code == 200, response.text
+
+    end = first_monday + timedelta(weeks=WEEKS) - timedelta(days=1)
+    days = [first_monday + timedelta(days=n) for n in range((end - first_monday).days + 1)]
+
+    db = database.SessionLocal()
+    try:
+        daily = {day: calculations.calculate_daily_totals(db, day) for day in days}
+        costs = {day: calculations.calculate_daily_cost(db, day) for day in days}
+    finally:
+        db.close()
+
+    yield client, first_monday, end, daily, costs
+    database.engine.dispose()
+
+
+@pytest.mark.parametrize("group", ["day", "week", "month"])
+def test_summary_periods_match_daily_totals(history, group):
+    client, start, end, daily, costs = history
+
+    expected = defaultdict(lambda: defaultdict(lambda: dict.fromkeys(NUTRIENTS, 0.0)))
+    expected_cost = defaultdict(float)
+    days_in = defaultdict(int)
+    for day, people in daily.items():
+        key = period_of(day, group)
+        days_in[key] += 1
+        expected_cost[key] += costs[day]
+        for person, values in people.items():
+            for nutrient in NUTRIENTS:
+                expected[key][person][nutrient] += values[nutrient]
+
+    response = client.get("/summary", params={
+        "start": start.isoformat(), "end": end.isoformat(), "group": group, "shopping": "false",
+    })
+    assert response.status_code == 200, response.text
+    summary = response.json()
+
+    periods = {period["period"]: period for period in summary["periods"]}
+    assert periods.keys() == expected.keys()
+
+    for key, period in periods.items():
+        totals = {row["person"]: row for row in period["totals"]}
+        assert totals.keys() == expected[key].keys(), key
+        for person, values in expected[key].items():
+            for nutrient in NUTRIENTS:
+                assert totals[person][nutrient] == pytest.approx(values[nutrient], abs=TOLERANCE[nutrient] + FLOAT_NOISE), (key, person, nutrient)
+
+        # calculate_daily_cost rounds each day to pennies
+        assert period["cost"] == pytest.approx(expected_cost[key], abs=0.005 * days_in[key] + 0.01), key
+
+    assert summary["total_cost"] == pytest.approx(sum(costs.values()), abs=0.005 * len(costs) + 0.01)
@@ -0,0 +1,156 @@
+"""
+Mixed-unit recipes: ingredients, portions and snacks given in any registry
+unit are stored in the base unit (g, ml, item), and totals and shopping
+lists add them up correctly.
+"""
+
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import calculations
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+@pytest.fixture
+def client(empty_app):
+    return TestClient(empty_app)
+
+
+@pytest.fixture
+def pantry(client):
+    """One person and three ingredients entered in non-base units"""
+    person = client.post("/people", json={"name": "Ann"}).json()
+    oil = client.post("/ingredients", json={
+        "name": "Olive oil", "unit": "ml", "cost_per_unit": 0.01, "kcal_per_unit": 8.0, "fat_per_unit": 0.9,
+    }).json()
+    flour = client.post("/ingredients", json={
+        "name": "Flour", "unit": "kg", "cost_per_unit": 1.2, "kcal_per_unit": 3640.0, "carbs_per_unit": 760.0,
+        "pack_size": 1.5, "pack_cost": 1.8,
+    }).json()
+    eggs = client.post("/ingredients", json={
+        "name": "Eggs", "unit": "dozen", "cost_per_unit": 3.6, "kcal_per_unit": 840.0, "protein_per_unit": 72.0,
+    }).json()
+    return {"person": person, "oil": oil, "flour": flour, "eggs": eggs}
+
+
+@pytest.fixture
+def pancakes(client, pantry):
+    """A dinner recipe whose portions are in a different unit to each ingredient"""
+    person_id = pantry["person"]["id"]
+    response = client.post("/recipes", json={
+        "name": "Pancakes",
+        "meal_type": "dinner",
+        "portions": [
+            {"ingredient_id": pantry["oil"]["id"], "person_id": person_id, "quantity": 2, "unit": "tbsp"},
+            {"ingredient_id": pantry["flour"]["id"], "person_id": person_id, "quantity": 250, "unit": "g"},
+            {"ingredient_id": pantry["eggs"]["id"], "person_id": person_id, "quantity": 3, "unit": "item"},
+        ],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_ingredients_are_stored_in_base_units(pantry):
+    flour, eggs, oil = pantry["flour"], pantry["eggs"], pantry["oil"]
+
+    assert flour["unit"] == "g"
+    assert flour["cost_per_unit"] == pytest.approx(0.0012)
+    assert flour["kcal_per_unit"] == pytest.approx(3.64)
+    assert flour["carbs_per_unit"] == pytest.approx(0.76)
+    assert flour["pack_size"] == pytest.approx(1500.0)
+    assert flour["pack_cost"] == pytest.approx(1.8)
+
+    assert eggs["unit"] == "item"
+    assert eggs["cost_per_unit"] == pytest.approx(0.3)
+    assert eggs["kcal_per_unit"] == pytest.approx(70.0)
+    assert eggs["protein_per_unit"] == pytest.approx(6.0)
+
+    assert oil["unit"] == "ml"
+    assert oil["kcal_per_unit"] == pytest.approx(8.0)
+
+
+def test_portions_are_stored_in_the_ingredient_unit(pantry, pancakes):
+    quantities = {portion["ingredient_id"]: portion["quantity"] for portion in pancakes["portions"]}
+    assert quantities[pantry["oil"]["id"]] == pytest.approx(30.0)  # 2 tbsp
+    assert quantities[pantry["flour"]["id"]] == pytest.approx(250.0)  # g on a kg ingredient
+    assert quantities[pantry["eggs"]["id"]] == pytest.approx(3.0)  # items on a dozen ingredient
+
+
+def test_week_totals_and_shopping_add_up_across_units(client, pantry, pancakes):
+    week_start = calculations.get_week_start() - timedelta(weeks=1)
+    response = client.post("/week-plan/bulk-update", json={
+        "week_start": week_start.isoformat(),
+        "meals": [
+            {"day": day, "person": "ann", "meal_type": "dinner", "recipe_name": "Pancakes"}
+            for day in DAYS
+        ],
+    })
+    assert response.status_code == 200, response.text
+
+    summary = client.get("/week-totals", params={"week_start": week_start.isoformat()}).json()
+
+    # Per dinner: 30 ml x 8 + 250 g x 3.64 + 3 x 70 kcal, 0.30 + 0.30 + 0.90 cost
+    (ann,) = summary["week_totals"]
+    assert ann["kcal"] == pytest.approx(7 * 1360.0)
+    assert ann["protein"] == pytest.approx(7 * 18.0)
+    assert summary["week_cost"] == pytest.approx(7 * 1.5)
+
+    # Wed batch: Wed-Sat dinners; Sun batch: Sun-Tue dinners
+    wed = {item["ingredient"]: item for item in summary["wed_shopping"]}
+    sun = {item["ingredient"]: item for item in summary["sun_shopping"]}
+
+    assert (wed["Flour"]["quantity"], wed["Flour"]["unit"]) == (1.0, "kg")
+    assert wed["Flour"]["packs"] == 1
+    assert wed["Flour"]["leftover"] == pytest.approx(0.5)
+    assert (wed["Olive oil"]["quantity"], wed["Olive oil"]["unit"]) == (120.0, "ml")
+    assert (wed["Eggs"]["quantity"], wed["Eggs"]["unit"]) == (12.0, "item")
+
+    assert (sun["Flour"]["quantity"], sun["Flour"]["unit"]) == (750.0, "g")
+    assert sun["Flour"]["carried_over"] == pytest.approx(500.0)
+    assert sun["Flour"]["packs"] == 1
+    assert (sun["Eggs"]["quantity"], sun["Eggs"]["unit"]) == (9.0, "item")
+    assert summary["wed_spend"] + summary["sun_spend"] == pytest.approx(2 * 1.8 + 7 * (0.3 + 0.9))
+
+
+def test_snack_quantity_is_converted(client, pantry):
+    response = client.post("/snacks", json={
+        "name": "Half dozen eggs", "ingredient_id": pantry["eggs"]["id"], "default_quantity": 0.5, "unit": "dozen",
+    })
+    assert response.status_code == 200, response.text
+    assert response.json()["default_quantity"] == pytest.approx(6.0)
+
+
+def test_update_within_a_dimension_is_converted(client, pantry):
+    flour_id = pantry["flour"]["id"]
+    response = client.put(f"/ingredients/{flour_id}", json={"unit": "kg", "cost_per_unit": 2.0, "pack_size": 1.0})
+    assert response.status_code == 200, response.text
+
+    flour = response.json()
+    assert flour["unit"] == "g"
+    assert flour["cost_per_unit"] == pytest.approx(0.002)
+    assert flour["pack_size"] == pytest.approx(1000.0)
+    assert flour["kcal_per_unit"] == pytest.approx(3.64)  # Not given, so not rescaled
+
+
+def test_update_to_another_dimension_is_rejected(client, pantry, pancakes):
+    flour_id = pantry["flour"]["id"]
+    response = client.put(f"/ingredients/{flour_id}", json={"unit": "ml", "cost_per_unit": 0.5})
+    assert response.status_code == 400
+
+    flour = client.get(f"/ingredients/{flour_id}").json()
+    assert flour["unit"] == "g"
+    assert flour["cost_per_unit"] == pytest.approx(0.0012)
+
+
+def test_portion_in_another_dimension_is_rejected(client, pantry):
+    response = client.post("/recipes", json={
+        "name": "Oily flour",
+        "meal_type": "dinner",
+        "portions": [
+            {"ingredient_id": pantry["flour"]["id"], "person_id": pantry["person"]["id"], "quantity": 1, "unit": "tbsp"},
+        ],
+    })
+    assert response.status_code == 400
@@ -0,0 +1,46 @@
+"""
+The week summary runs a fixed number of SQL statements, however many
+people, days of history and planned meals the household has.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+import calculations
+import database
+from conftest import count_statements
+
+SIZES = [
+    {"people": 2, "weeks": 2, "recipes": 30, "ingredients": 100},
+    {"people": 4, "weeks": 8, "recipes": 90, "ingredients": 300},
+    {"people": 8, "weeks": 26, "recipes": 300, "ingredients": 600},
+]
+
+
+def week_summary_statements(seed_app, sizes, weeks_back: int):
+    """Statements run by calculate_week_summary for a week weeks_back before the current one"""
+    seed_app(**sizes)
+    week_start = calculations.get_week_start() - timedelta(weeks=weeks_back)
+
+    db = database.SessionLocal()
+    try:
+        with count_statements() as statements:
+            summary = calculations.calculate_week_summary(db, week_start, date.today())
+    finally:
+        db.close()
+
+    assert summary["week_totals"], "seeded week should have planned meals"
+    assert summary["wed_shopping"] or summary["sun_shopping"]
+    return statements
+
+
+@pytest.mark.parametrize("weeks_back", [0, 1])
+def test_week_summary_statement_count_is_constant(seed_app, weeks_back):
+    counts = [len(week_summary_statements(seed_app, sizes, weeks_back)) for sizes in SIZES]
+    assert len(set(counts)) == 1, f"statements per size {counts}"
+
+
+def test_week_summary_statement_count_is_small(seed_app):
+    statements = week_summary_statements(seed_app, SIZES[-1], 0)
+    assert len(statements) <= 5, "\n".join(statements)
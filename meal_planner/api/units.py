@@ -0,0 +1,155 @@
+"""
+Unit registry for ingredient quantities.
+- Every known unit maps to a base unit (g, ml or item) and a factor
+- Quantities, per-unit values and pack sizes are stored in the base unit,
+  converted once at write time; sums over them are plain numeric sums
+- display() picks a readable unit for a base quantity (presentation only)
+- Units not in the registry are kept as their own base (e.g. "clove"),
+  so they still add up with themselves but never convert
+"""
+
+from typing import Dict, Optional, Tuple
+
+# Canonical base units
+GRAM = "g"
+MILLILITRE = "ml"
+ITEM = "item"
+
+# {unit: (base unit, base units per unit)}
+UNITS: Dict[str, Tuple[str, float]] = {
+    # Mass
+    "g": (GRAM, 1.0),
+    "mg": (GRAM, 0.001),
+    "kg": (GRAM, 1000.0),
+    "oz": (GRAM, 28.349523125),
+    "lb": (GRAM, 453.59237),
+    # Volume (metric spoons and cups)
+    "ml": (MILLILITRE, 1.0),
+    "cl": (MILLILITRE, 10.0),
+    "dl": (MILLILITRE, 100.0),
+    "l": (MILLILITRE, 1000.0),
+    "tsp": (MILLILITRE, 5.0),
+    "tbsp": (MILLILITRE, 15.0),
+    "cup": (MILLILITRE, 250.0),
+    "fl oz": (MILLILITRE, 28.4130625),
+    "pint": (MILLILITRE, 568.26125),
+    # Count
+    "item": (ITEM, 1.0),
+    "dozen": (ITEM, 12.0),
+}
+
+# Other spellings -> registry unit
+ALIASES = {
+    "gram": "g", "grams": "g", "gr": "g",
+    "milligram": "mg", "milligrams": "mg",
+    "kilogram": "kg", "kilograms": "kg", "kgs": "kg", "kilo": "kg", "kilos": "kg",
+    "ounce": "oz", "ounces": "oz",
+    "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "millilitre": "ml", "millilitres": "ml", "milliliter": "ml", "milliliters": "ml",
+    "centilitre": "cl", "centilitres": "cl", "centiliter": "cl", "centiliters": "cl",
+    "decilitre": "dl", "decilitres": "dl", "deciliter": "dl", "deciliters": "dl",
+    "litre": "l", "litres": "l", "liter": "l", "liters": "l", "ltr": "l",
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsps": "tsp",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsps": "tbsp", "tbs": "tbsp",
+    "cups": "cup",
+    "floz": "fl oz", "fl. oz": "fl oz", "fluid ounce": "fl oz", "fluid ounces": "fl oz",
+    "pints": "pint", "pt": "pint",
+    "items": "item", "each": "item", "ea": "item", "x": "item",
+    "piece": "item", "pieces": "item", "pc": "item", "pcs": "item",
+    "unit": "item", "units": "item",
+}
+
+# Larger display units per base unit, biggest first: (unit, threshold in base units)
+DISPLAY_UNITS = {
+    GRAM: [("kg", 1000.0)],
+    MILLILITRE: [("l", 1000.0)],
+}
+
+# Ingredient fields stored per base unit (divide by the factor) or in base units (multiply)
+PER_UNIT_FIELDS = ("cost_per_unit", "kcal_per_unit", "protein_per_unit", "carbs_per_unit", "fat_per_unit")
+QUANTITY_FIELDS = ("pack_size",)
+
+
+class UnitError(ValueError):
+    """A quantity can't be converted between two units"""
+
+
+# ============================================================================
+# LOOKUPS
+# ============================================================================
+
+def canonical(unit: str) -> str:
+    """Registry spelling of a unit ("Tablespoons" -> "tbsp"); unknown units are just tidied"""
+    name = " ".join(unit.strip().lower().rstrip(".").split())
+    return ALIASES.get(name, name)
+
+
+def resolve(unit: str) -> Tuple[str, float]:
+    """(base unit, base units per unit); unknown units are their own base"""
+    name = canonical(unit)
+    return UNITS.get(name, (name, 1.0))
+
+
+def base_unit(unit: str) -> str:
+    return resolve(unit)[0]
+
+
+def convert(quantity: float, from_unit: str, to_unit: str) -> float:
+    """quantity in from_unit expressed in to_unit (same dimension only)"""
+    from_base, from_factor = resolve(from_unit)
+    to_base, to_factor = resolve(to_unit)
+    if from_base != to_base:
+        raise UnitError(f"Can't convert {from_unit} to {to_unit}")
+    return quantity * from_factor / to_factor
+
+
+# ============================================================================
+# WRITE-TIME NORMALIZATION
+# ============================================================================
+
+def normalize_ingredient(values: Dict, current_unit: Optional[str] = None) -> Dict:
+    """
+    Ingredient fields with the unit replaced by its base unit and the
+    per-unit values and pack size converted to match. values is a full
+    ingredient or a partial update; values given without a unit are in
+    current_unit (the ingredient's stored unit).
+    """
+    unit = values.get("unit") or current_unit
+    if unit is None:
+        return dict(values)
+
+    base, factor = resolve(unit)
+    normalized = dict(values)
+    if "unit" in values:
+        normalized["unit"] = base
+
+    for key in PER_UNIT_FIELDS:
+        if normalized.get(key) is not None:
+            normalized[key] = normalized[key] / factor
+    for key in QUANTITY_FIELDS:
+        if normalized.get(key) is not None:
+            normalized[key] = normalized[key] * factor
+
+    return normalized
+
+
+def normalize_quantity(quantity: float, unit: Optional[str], ingredient_unit: str) -> float:
+    """A portion quantity given in unit (None = the ingredient's own) in the ingredient's base unit"""
+    if unit is None:
+        return quantity
+    return convert(quantity, unit, ingredient_unit)
+
+
+# ============================================================================
+# PRESENTATION
+# ============================================================================
+
+def display(quantity: float, unit: str) -> Tuple[float, str]:
+    """
+    (scale, display unit) for a quantity in a base unit, e.g. 1500 g ->
+    (1000, "kg"). Divide quantities by scale to show them.
+    """
+    for display_unit, threshold in DISPLAY_UNITS.get(unit, ()):
+        if quantity >= threshold:
+            return UNITS[display_unit][1], display_unit
+    return 1.0, unit